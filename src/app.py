@@ -1,15 +1,19 @@
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                              QTabWidget, QPushButton, QLabel, QComboBox,
                              QFileDialog, QSplitter, QMessageBox, QProgressDialog,
-                             QApplication)
-from PyQt5.QtCore import Qt, QTimer
+                             QApplication, QCheckBox, QSpinBox)
+from PyQt5.QtCore import Qt, QRectF
 from PyQt5.QtGui import QFont
 from pathlib import Path
-from typing import Optional, List
+import copy
+import os
+from typing import Dict, Hashable, Optional, List, Tuple
 import numpy as np
 
+from src.decode_cache import DecodeCache
 from src.gif_handler import GifHandler
-from src.overlay_engine import OverlayEngine, OverlayMode, GridOverlay
+from src.overlay_engine import (OverlayEngine, OverlayMode, GridOverlay, CompositeCache,
+                                clip_region)
 from src.metrics import MetricsCalculator, SequenceMetrics, average_sequence_metrics
 from src.style import BRUTALIST_STYLE
 from src.titles import get_random_title
@@ -19,6 +23,8 @@ from src.widgets.frame_strip import FrameStrip
 from src.widgets.overlay_panel import OverlayModePanel, GridOverlayPanel
 from src.widgets.metrics_tab import MetricsTab
 from src.widgets.discovery import DiscoveryDialog
+from src.resize_cache import DEFAULT_RESIZE_FILTER
+from src.workers import GifLoadWorker, PrerenderBuffer, PrerenderWorker, ResizeWorker
 
 
 class GifCompareApp(QMainWindow):
@@ -30,24 +36,51 @@ class GifCompareApp(QMainWindow):
         self.setMinimumSize(1200, 800)
 
         # Core components
-        self.gt_handler = GifHandler()
-        self.pred_handler = GifHandler()
+        # Decoded frames persisted across runs under ~/.cache; opt-in, applied to the next load
+        self._decode_cache = DecodeCache()
+        self._disk_cache_enabled = False
+        self._decode_workers = os.cpu_count() or 1
+        # How loaded frames are held: "palette" index planes, "list" of RGBA arrays,
+        # a contiguous "stack", or "lazy" decoding on access
+        self._frame_storage = "palette"
+        # Resampling of predicted frames to the ground truth size
+        self._resize_filter = DEFAULT_RESIZE_FILTER
+        self._pre_resize = False
+        self._resize_worker: Optional[ResizeWorker] = None
+        self.gt_handler = self._create_handler()
+        self.pred_handler = self._create_handler()
         self.overlay_engine = OverlayEngine()
         self.grid_overlay = GridOverlay()
+        self._composite_cache = CompositeCache()
 
         # State
         self._current_frame = 0
         self._updating = False
-        self._flicker_timer = QTimer(self)
-        self._flicker_timer.timeout.connect(self._on_flicker_tick)
         self._last_directory = str(Path.cwd())
         self._previous_mode = OverlayMode.SIDE_BY_SIDE
+        # Background loading: active worker and the handler it fills, per side
+        self._load_workers: Dict[str, GifLoadWorker] = {}
+        self._pending_handlers: Dict[str, GifHandler] = {}
+        self._retired_workers: List[GifLoadWorker] = []
+        # Playback prerendering: composites rendered ahead of the playhead
+        self._prerender_buffer = PrerenderBuffer(size=8)
+        self._prerender_worker: Optional[PrerenderWorker] = None
+        self._prerender_settings: Optional[tuple] = None
+        # Region of the composite rendered when zoomed in, None for all of it
+        self._render_roi: Optional[Tuple[int, int, int, int]] = None
 
         # Setup
         self.setStyleSheet(BRUTALIST_STYLE)
         self._setup_ui()
         self._connect_signals()
 
+    def _create_handler(self) -> GifHandler:
+        lazy = self._frame_storage == "lazy"
+        return GifHandler(lazy=lazy, storage="list" if lazy else self._frame_storage,
+                          decode_cache=self._decode_cache if self._disk_cache_enabled else None,
+                          decode_workers=self._decode_workers,
+                          resize_filter=self._resize_filter)
+
     def _setup_ui(self):
         central = QWidget()
         self.setCentralWidget(central)
@@ -104,6 +137,45 @@ class GifCompareApp(QMainWindow):
 
         layout.addStretch()
 
+        # Frame storage, applied to the next load
+        layout.addWidget(QLabel("FRAMES:"))
+        self.storage_combo = QComboBox()
+        self.storage_combo.setToolTip(
+            "How loaded frames are kept in memory.\n"
+            "PALETTE keeps GIF frames as palette indices, a quarter of the size\n"
+            "of RGBA; RGBA keeps every decoded frame; STACK keeps them in contiguous\n"
+            "blocks that export and metrics read without copying; LAZY decodes\n"
+            "frames on access and keeps only recently used ones."
+        )
+        self.storage_combo.addItem("PALETTE", "palette")
+        self.storage_combo.addItem("RGBA", "list")
+        self.storage_combo.addItem("STACK", "stack")
+        self.storage_combo.addItem("LAZY", "lazy")
+        self.storage_combo.setCurrentIndex(self.storage_combo.findData(self._frame_storage))
+        self.storage_combo.currentIndexChanged.connect(
+            lambda _: setattr(self, "_frame_storage", self.storage_combo.currentData())
+        )
+        layout.addWidget(self.storage_combo)
+
+        # Disk cache of decoded frames
+        self.disk_cache_check = QCheckBox("DISK CACHE")
+        self.disk_cache_check.setToolTip(
+            f"Keep decoded frames in {self._decode_cache.directory} so files reload instantly")
+        self.disk_cache_check.setChecked(self._disk_cache_enabled)
+        self.disk_cache_check.toggled.connect(self._on_disk_cache_toggled)
+        layout.addWidget(self.disk_cache_check)
+
+        self.cache_size_spin = QSpinBox()
+        self.cache_size_spin.setRange(1, 256)
+        self.cache_size_spin.setSuffix(" GB")
+        self.cache_size_spin.setToolTip("Size cap of the disk cache")
+        self.cache_size_spin.setValue(max(1, self._decode_cache.max_bytes // 1024 ** 3))
+        self.cache_size_spin.setEnabled(self._disk_cache_enabled)
+        self.cache_size_spin.valueChanged.connect(
+            lambda gb: self._decode_cache.set_max_bytes(gb * 1024 ** 3)
+        )
+        layout.addWidget(self.cache_size_spin)
+
         # Discovery button
         self.discover_btn = QPushButton("DISCOVER IN PATH")
         self.discover_btn.clicked.connect(self._open_discovery)
@@ -187,8 +259,17 @@ class GifCompareApp(QMainWindow):
         # Playback
         self.playback_controls.frame_changed.connect(self._on_frame_changed)
         self.frame_slider.frame_changed.connect(self._on_frame_changed)
+        self.playback_controls.playback_started.connect(self._start_prerender)
+        self.playback_controls.playback_stopped.connect(self._stop_prerender)
+        self.playback_controls.frame_ready = self._is_frame_ready
+
+        # Viewport
+        self.viewport_widget.viewport.visible_rect_changed.connect(self._on_visible_rect_changed)
+        self.viewport_widget.viewport.zoom_changed.connect(self._on_visible_rect_changed)
 
         # Frame strips
+        self.gt_strip.thumbnail_source = lambda i: self.gt_handler.get_thumbnail(i)
+        self.pred_strip.thumbnail_source = lambda i: self.pred_handler.get_thumbnail(i)
         self.gt_strip.frame_selected.connect(self._on_frame_changed)
         self.pred_strip.frame_selected.connect(self._on_frame_changed)
         self.gt_strip.frame_deleted.connect(lambda i: self._delete_frame("gt", i))
@@ -198,11 +279,22 @@ class GifCompareApp(QMainWindow):
 
         # Overlay
         self.overlay_panel.mode_changed.connect(self._on_overlay_mode_changed)
+        self.overlay_panel.colormap_changed.connect(self._on_colormap_changed)
+        self.overlay_panel.blend_alpha_changed.connect(self._on_blend_alpha_changed)
+        self.overlay_panel.ssim_options_changed.connect(self._on_ssim_options_changed)
+        self.overlay_panel.resize_filter_changed.connect(self._on_resize_filter_changed)
+        self.overlay_panel.pre_resize_changed.connect(self._on_pre_resize_changed)
+        self.overlay_panel.flicker_interval_changed.connect(self._on_flicker_interval_changed)
         self.grid_panel.settings_changed.connect(self._update_display)
 
         # Metrics
         self.metrics_tab.calculate_btn.clicked.connect(self._calculate_metrics)
 
+    def _on_disk_cache_toggled(self, enabled: bool):
+        """Enable or disable the disk cache for subsequent loads."""
+        self._disk_cache_enabled = enabled
+        self.cache_size_spin.setEnabled(enabled)
+
     def _browse_file(self, target: str):
         path, _ = QFileDialog.getOpenFileName(
             self, f"Select {'Ground Truth' if target == 'gt' else 'Predicted'} GIF",
@@ -218,20 +310,101 @@ class GifCompareApp(QMainWindow):
         if not path or not Path(path).exists():
             return
 
-        handler = self.gt_handler if target == "gt" else self.pred_handler
-        if handler.load(path):
-            self._update_after_load(target)
+        # Picking another file cancels a load still running for this side
+        self._cancel_load(target)
+
+        handler = self._create_handler()
+        worker = GifLoadWorker(handler, path, self)
+        worker.frame_loaded.connect(
+            lambda i, frame, thumb, duration, w=worker:
+                self._on_frame_loaded(w, target, i, frame, thumb, duration)
+        )
+        worker.load_finished.connect(
+            lambda success, w=worker: self._on_load_finished(w, target, success)
+        )
+        self._pending_handlers[target] = handler
+        self._load_workers[target] = worker
+        worker.start()
+
+    def _cancel_load(self, target: str):
+        worker = self._load_workers.pop(target, None)
+        handler = self._pending_handlers.pop(target, None)
+        if worker is not None:
+            worker.requestInterruption()
+            # Keep a reference until the thread has actually exited
+            self._retired_workers.append(worker)
+            worker.finished.connect(lambda w=worker: self._retired_workers.remove(w))
+            if handler is not None and handler not in (self.gt_handler, self.pred_handler):
+                # Never shown; release lazy decoders once the worker is done with it
+                worker.finished.connect(handler.close)
+
+    def _on_frame_loaded(self, worker: GifLoadWorker, target: str, index: int,
+                         entry: object, thumbnail: np.ndarray, duration: int):
+        # Ignore frames still queued from a cancelled load
+        if self._load_workers.get(target) is not worker:
+            return
+
+        handler = self._pending_handlers[target]
+        strip = self.gt_strip if target == "gt" else self.pred_strip
+
+        if index == 0:
+            # First frame replaces the previously loaded file
+            self._stop_prerender()
+            self._stop_pre_resize()
+            if target == "gt":
+                previous, self.gt_handler = self.gt_handler, handler
+            else:
+                previous, self.pred_handler = self.pred_handler, handler
+            previous.close()
+            strip.set_thumbnails([])
+
+        if entry is not None:
+            handler.add_loaded(entry, duration)
+        strip.add_thumbnail(thumbnail)
+
+        max_frames = max(self.gt_handler.get_frame_count(),
+                        self.pred_handler.get_frame_count())
+        self.playback_controls.set_frame_count(max_frames)
+        self.frame_slider.set_frame_count(max_frames)
+
+        if index == 0:
+            self.playback_controls.set_base_interval(duration)
             self._update_path_display()
+            self._update_display()
+            self.viewport_widget.viewport.fit_in_view()
+            self._resume_prerender()
+        elif index == self._current_frame:
+            self._update_display()
+
+    def _on_load_finished(self, worker: GifLoadWorker, target: str, success: bool):
+        if self._load_workers.get(target) is not worker:
+            return
+        del self._load_workers[target]
+        handler = self._pending_handlers.pop(target)
+
+        if success and handler.get_frame_count() > 0:
+            self.playback_controls.set_base_interval(handler.get_average_duration())
+            self._update_display()
+            self._start_pre_resize()
+
+    def closeEvent(self, event):
+        self._stop_prerender()
+        self._stop_pre_resize()
+        self.metrics_tab.shutdown()
+        for worker in list(self._load_workers.values()) + self._retired_workers:
+            worker.requestInterruption()
+            worker.wait()
+        super().closeEvent(event)
 
     def _update_after_load(self, target: str):
         handler = self.gt_handler if target == "gt" else self.pred_handler
         strip = self.gt_strip if target == "gt" else self.pred_strip
 
-        # Update thumbnails
+        # Update thumbnails; lazy handlers make them as they scroll into view
         thumbnails = []
         for i in range(handler.get_frame_count()):
-            thumb = handler.get_thumbnail(i)
-            if thumb is not None:
+            thumb = None if handler.lazy else handler.get_thumbnail(i)
+            if thumb is not None or handler.lazy:
                 thumbnails.append(thumb)
         strip.set_thumbnails(thumbnails)
 
@@ -251,6 +424,7 @@ class GifCompareApp(QMainWindow):
 
         # Fit to view
         self.viewport_widget.viewport.fit_in_view()
+        self._start_pre_resize()
 
     def _update_path_display(self):
         """Update the path display in viewport."""
@@ -264,6 +438,7 @@ class GifCompareApp(QMainWindow):
         self._updating = True
         try:
             self._current_frame = frame
+            self._prerender_buffer.set_playhead(frame, self._frame_count())
             self.playback_controls.set_frame(frame, emit=False)
             self.frame_slider.set_frame(frame)
             self.gt_strip.set_selected(frame)
@@ -275,12 +450,6 @@ class GifCompareApp(QMainWindow):
     def _on_overlay_mode_changed(self, mode: OverlayMode):
         self.overlay_engine.set_mode(mode)
 
-        # Handle flicker mode
-        if mode == OverlayMode.FLICKER:
-            self._flicker_timer.start(200)
-        else:
-            self._flicker_timer.stop()
-
         # Handle checkerboard mode - grid controls checker size
         if mode == OverlayMode.CHECKERBOARD:
             self.grid_panel.setToolTip("Controls checkerboard tile size in this mode")
@@ -293,47 +462,266 @@ class GifCompareApp(QMainWindow):
         self._previous_mode = mode
         self._update_display()
 
-    def _on_flicker_tick(self):
-        self.overlay_engine.toggle_flicker()
+    def _on_colormap_changed(self, name: Optional[str]):
+        self.overlay_engine.set_colormap(name)
         self._update_display()
 
-    def _update_display(self):
-        try:
-            gt_frame = self.gt_handler.get_frame(self._current_frame)
-            pred_frame = self.pred_handler.get_frame(self._current_frame)
+    def _on_blend_alpha_changed(self, alpha: float):
+        self.overlay_engine.set_blend_alpha(alpha)
+        self._update_display()
 
-            if gt_frame is None and pred_frame is None:
-                return
+    def _on_ssim_options_changed(self, per_channel: bool, gaussian: bool):
+        self.overlay_engine.ssim_per_channel = per_channel
+        self.overlay_engine.ssim_gaussian = gaussian
+        self._update_display()
 
-            # Update checkerboard size and thickness from grid panel
-            self.overlay_engine.checker_size = self.grid_panel.get_size()
-            self.overlay_engine.grid_thickness = self.grid_panel.get_thickness()
+    def _on_resize_filter_changed(self, method: str):
+        self._resize_filter = method
+        self._stop_pre_resize()
+        self.overlay_engine.resize_filter = method
+        for handler in [self.gt_handler, self.pred_handler, *self._pending_handlers.values()]:
+            handler.set_resize_filter(method)
+        self._update_display()
+        self._start_pre_resize()
+
+    def _on_pre_resize_changed(self, enabled: bool):
+        self._pre_resize = enabled
+        self._start_pre_resize()
+
+    def _resize_target(self) -> Optional[Tuple[int, int]]:
+        """GT size (width, height) if predicted frames must be resized to it."""
+        if self.gt_handler.get_frame_count() == 0 or self.pred_handler.get_frame_count() == 0:
+            return None
+        size = self.gt_handler.get_size()
+        return size if size != self.pred_handler.get_size() else None
+
+    def _start_pre_resize(self):
+        """Resize the predicted sequence in the background, if enabled and needed."""
+        self._stop_pre_resize()
+        if not self._pre_resize or self._load_workers:
+            return
+        size = self._resize_target()
+        if size is None:
+            return
+        self._resize_worker = ResizeWorker(self.pred_handler, size, self)
+        self._resize_worker.start()
+
+    def _stop_pre_resize(self):
+        worker = self._resize_worker
+        if worker is not None:
+            self._resize_worker = None
+            worker.requestInterruption()
+            worker.wait()
+
+    def _on_flicker_interval_changed(self, interval: int):
+        self.viewport_widget.set_flicker_interval(interval)
+
+    def _frame_count(self) -> int:
+        return max(self.gt_handler.get_frame_count(), self.pred_handler.get_frame_count())
+
+    def _sync_overlay_settings(self):
+        # Update checkerboard size and thickness from grid panel
+        self.overlay_engine.checker_size = self.grid_panel.get_size()
+        self.overlay_engine.grid_thickness = self.grid_panel.get_thickness()
+
+        # Grid overlay is not used in checkerboard mode - it has its own grid
+        if self.overlay_engine.mode != OverlayMode.CHECKERBOARD:
+            self.grid_overlay.set_enabled(self.grid_panel.is_enabled())
+            self.grid_overlay.set_size(self.grid_panel.get_size())
+            self.grid_overlay.set_color(self.grid_panel.get_color())
+            self.grid_overlay.set_opacity(self.grid_panel.get_opacity())
+            self.grid_overlay.set_thickness(self.grid_panel.get_thickness())
+
+    def _settings_key(self, engine: OverlayEngine,
+                      roi: Optional[Tuple[int, int, int, int]]) -> tuple:
+        # The grid is drawn by the viewport, so it never changes a composite
+        return engine.cache_key(), roi
+
+    def _composite_key(self, index: int, engine: OverlayEngine,
+                       roi: Optional[Tuple[int, int, int, int]]) -> Hashable:
+        # Frame ids are never reused, so edits can't produce stale hits
+        return (
+            self.gt_handler.get_frame_id(index),
+            self.pred_handler.get_frame_id(index),
+        ) + self._settings_key(engine, roi)
+
+    def _output_size(self, index: int, engine: OverlayEngine) -> Optional[Tuple[int, int]]:
+        """(width, height) of the full composite of a frame."""
+        gt_frame = self.gt_handler.get_frame(index)
+        pred_frame = self.pred_handler.get_frame(index)
+        if gt_frame is not None and pred_frame is not None:
+            h, w = engine.output_shape(*gt_frame.shape[:2])[:2]
+        elif gt_frame is not None or pred_frame is not None:
+            h, w = (gt_frame if gt_frame is not None else pred_frame).shape[:2]
+        else:
+            return None
+        return w, h
+
+    def _render_composite(self, index: int, engine: OverlayEngine,
+                          roi: Optional[Tuple[int, int, int, int]] = None) -> Optional[np.ndarray]:
+        """Render a frame's composite, or only the region ``roi`` of it."""
+        gt_frame = self.gt_handler.get_frame(index)
+        pred_frame = self.pred_handler.get_frame(index)
+        size = self._output_size(index, engine)
+        if size is None:
+            return None
+        if roi is not None:
+            roi = clip_region(roi, *size)
+
+        # Use whichever frame is available, or composite both
+        if gt_frame is not None and pred_frame is not None:
+            pred_key = self.pred_handler.get_frame_id(index)
+            if pred_frame.shape[:2] != gt_frame.shape[:2]:
+                pred_frame = self.pred_handler.get_resized_frame(
+                    index, (gt_frame.shape[1], gt_frame.shape[0]))
+                pred_key = (pred_key, engine.resize_filter)
+            result = engine.composite(gt_frame, pred_frame, roi=roi,
+                                      gt_key=self.gt_handler.get_frame_id(index),
+                                      pred_key=pred_key)
+        else:
+            frame = gt_frame if gt_frame is not None else pred_frame
+            if roi is not None:
+                x, y, w, h = roi
+                frame = frame[y:y + h, x:x + w]
+            result = frame.copy()
+        return result
+
+    def _update_roi(self, size: Tuple[int, int]) -> bool:
+        """Choose the region to render for the current view; True if it changed.
+
+        When zoomed in far enough that most of the image is off screen,
+        only the visible part plus some padding is rendered.
+        """
+        viewport = self.viewport_widget.viewport
+        width, height = size
+        roi = self._render_roi
+        if viewport.sceneRect() != QRectF(0, 0, width, height):
+            # The view still shows a different image size
+            roi = None
+        else:
+            x, y, w, h = viewport.visible_rect()
+            if w * h * 4 >= width * height:
+                roi = None
+            elif roi is None or not (roi[0] <= x and roi[1] <= y and
+                                     x + w <= roi[0] + roi[2] and y + h <= roi[1] + roi[3]):
+                # Pad by half the view on each side so small pans reuse the tile
+                roi = clip_region((x - w // 2, y - h // 2, w * 2, h * 2), width, height)
+        changed = roi != self._render_roi
+        self._render_roi = roi
+        return changed
+
+    def _on_visible_rect_changed(self):
+        size = self._output_size(self._current_frame, self.overlay_engine)
+        if size is not None and self._update_roi(size):
+            self._update_display()
 
-            # Use whichever frame is available, or composite both
-            if gt_frame is not None and pred_frame is not None:
-                result = self.overlay_engine.composite(gt_frame, pred_frame)
-            elif gt_frame is not None:
-                result = gt_frame.copy()
+    def _update_display(self):
+        try:
+            self._sync_overlay_settings()
+            size = self._output_size(self._current_frame, self.overlay_engine)
+            if size is None:
+                return
+            self._update_roi(size)
+            roi = self._render_roi
+
+            if (self._prerender_worker is not None and
+                    self._settings_key(self.overlay_engine, roi) != self._prerender_settings):
+                # Frames rendered ahead are for the old settings or region
+                self._start_prerender()
+
+            offset = roi[:2] if roi is not None else (0, 0)
+            if self.overlay_engine.mode == OverlayMode.FLICKER:
+                # Both states go to the viewport, which swaps them on its own timer
+                states = []
+                for state in (False, True):
+                    engine = copy.copy(self.overlay_engine)
+                    engine.flicker_state = state
+                    states.append(self._cached_composite(self._current_frame, engine, roi))
+                if states[0] is None:
+                    return
+                self.viewport_widget.set_flicker_images(states[0], states[1], offset, size)
             else:
-                result = pred_frame.copy()
-
-            # Apply grid overlay (not in checkerboard mode - it has its own grid)
-            if self.overlay_engine.mode != OverlayMode.CHECKERBOARD:
-                self.grid_overlay.set_enabled(self.grid_panel.is_enabled())
-                self.grid_overlay.set_size(self.grid_panel.get_size())
-                self.grid_overlay.set_color(self.grid_panel.get_color())
-                self.grid_overlay.set_opacity(self.grid_panel.get_opacity())
-                self.grid_overlay.set_thickness(self.grid_panel.get_thickness())
-                result = self.grid_overlay.apply(result)
-
-            self.viewport_widget.set_image(result)
+                result = self._cached_composite(self._current_frame, self.overlay_engine, roi)
+                if result is None:
+                    return
+                self.viewport_widget.set_image(result, offset, size)
+            self._update_grid()
         except Exception as e:
             print(f"Display error: {e}")
 
+    def _cached_composite(self, index: int, engine: OverlayEngine,
+                          roi: Optional[Tuple[int, int, int, int]]) -> Optional[np.ndarray]:
+        key = self._composite_key(index, engine, roi)
+        result = self._composite_cache.get(key)
+        if result is None:
+            result = self._render_composite(index, engine, roi)
+            if result is not None:
+                self._composite_cache.put(key, result)
+        return result
+
+    def _update_grid(self):
+        """Show the grid overlay as vector lines over the viewport."""
+        grid = self.grid_overlay
+        # Checkerboard mode draws its own grid
+        enabled = grid.enabled and self.overlay_engine.mode != OverlayMode.CHECKERBOARD
+        self.viewport_widget.set_grid(enabled, grid.size, grid.thickness,
+                                      grid.color, grid.opacity)
+
+    def _start_prerender(self):
+        """(Re)start rendering composites ahead of the playhead."""
+        self._stop_prerender()
+        self._sync_overlay_settings()
+        # The worker renders with a snapshot so GUI-side changes can't race it
+        engine = copy.copy(self.overlay_engine)
+        roi = self._render_roi
+        self._prerender_settings = self._settings_key(engine, roi)
+
+        def render(index: int) -> Optional[Tuple[Hashable, np.ndarray]]:
+            key = self._composite_key(index, engine, roi)
+            result = self._render_composite(index, engine, roi)
+            return None if result is None else (key, result)
+
+        self._prerender_buffer.set_playhead(self._current_frame, self._frame_count())
+        self._prerender_worker = PrerenderWorker(self._prerender_buffer, render,
+                                                 self._frame_count, self)
+        self._prerender_worker.start()
+
+    def _stop_prerender(self):
+        worker = self._prerender_worker
+        if worker is not None:
+            self._prerender_worker = None
+            worker.requestInterruption()
+            worker.wait()
+        self._prerender_buffer.clear()
+
+    def _resume_prerender(self):
+        """Restart prerendering if playback is running."""
+        if self.playback_controls.is_playing():
+            self._start_prerender()
+
+    def _is_frame_ready(self, index: int) -> bool:
+        """Whether playback can show a frame without rendering it on the GUI thread."""
+        if self._prerender_worker is None or not self._prerender_worker.isRunning():
+            return True
+        key = self._composite_key(index, self.overlay_engine, self._render_roi)
+        if self._composite_cache.get(key) is not None:
+            return True
+        if self._prerender_buffer.is_failed(index):
+            # The worker skipped it; render (or report) it on the GUI thread
+            return True
+        result = self._prerender_buffer.take(index, key)
+        if result is None:
+            return False
+        self._composite_cache.put(key, result)
+        return True
+
     def _delete_frame(self, target: str, index: int):
         handler = self.gt_handler if target == "gt" else self.pred_handler
+        self._stop_prerender()
+        self._stop_pre_resize()
         if handler.delete_frame(index):
             self._update_after_load(target)
+        self._resume_prerender()
 
     def _add_frame(self, target: str, index: int):
         # Open file dialog to add frame
@@ -348,8 +736,11 @@ class GifCompareApp(QMainWindow):
             frame = np.array(img)
 
             handler = self.gt_handler if target == "gt" else self.pred_handler
+            self._stop_prerender()
+            self._stop_pre_resize()
             handler.insert_frame(index, frame)
             self._update_after_load(target)
+            self._resume_prerender()
 
     def _save_overlay(self):
         if self.gt_handler.get_frame_count() == 0 and self.pred_handler.get_frame_count() == 0:
@@ -365,8 +756,12 @@ class GifCompareApp(QMainWindow):
             return
 
         # Generate overlay frames
+        self._sync_overlay_settings()
         max_frames = max(self.gt_handler.get_frame_count(),
                         self.pred_handler.get_frame_count())
+        paired = min(self.gt_handler.get_frame_count(),
+                     self.pred_handler.get_frame_count())
+        grid = self.grid_overlay if self.overlay_engine.mode != OverlayMode.CHECKERBOARD else None
 
         overlay_frames = []
         durations = []
@@ -374,24 +769,44 @@ class GifCompareApp(QMainWindow):
         progress = QProgressDialog("Generating overlay...", "Cancel", 0, max_frames, self)
         progress.setWindowModality(Qt.WindowModal)
 
-        for i in range(max_frames):
+        # Frame pairs are composited in chunks; the worker pool keeps input and
+        # output buffers per worker plus one set, together about 64 MB
+        workers = self._decode_workers
+        chunk = 1
+        gt_frames = self._batch_frames(self.gt_handler)
+        pred_frames = self._batch_frames(self.pred_handler)
+        if paired > 0:
+            h, w = self.gt_handler.get_frame(0).shape[:2]
+            frame_bytes = 2 * h * w * 4 + int(np.prod(self.overlay_engine.output_shape(h, w)))
+            chunk = max(1, (64 * 1024 ** 2) // ((workers + 1) * frame_bytes))
+            if self.pred_handler.get_frame(0).shape[:2] != (h, w):
+                # Reuses frames already resized for display or pre-resized
+                pred_frames = self.pred_handler.resized_frames((w, h))
+        for frames in self.overlay_engine.composite_sequence(
+                gt_frames, pred_frames,
+                chunk=chunk, workers=workers, grid=grid):
             if progress.wasCanceled():
                 return
-            progress.setValue(i)
+            # Chunks are reused buffers, so keep a copy
+            overlay_frames.extend(frames.copy())
+            progress.setValue(len(overlay_frames))
             QApplication.processEvents()
 
-            gt_frame = self.gt_handler.get_frame(i)
-            pred_frame = self.pred_handler.get_frame(i)
-
-            if gt_frame is not None and pred_frame is not None:
-                result = self.overlay_engine.composite(gt_frame, pred_frame)
-            elif gt_frame is not None:
-                result = gt_frame.copy()
-            else:
-                result = pred_frame.copy()
-
-            result = self.grid_overlay.apply(result)
+        # Past the end of the shorter sequence, show whichever frame exists
+        # at the size of the composites (GT frame size when there is one)
+        size_handler = self.gt_handler if self.gt_handler.get_frame_count() > 0 else self.pred_handler
+        h, w = size_handler.get_frame(0).shape[:2]
+        for i in range(paired, max_frames):
+            frame = self.gt_handler.get_frame(i)
+            is_gt = frame is not None
+            if not is_gt:
+                frame = self.pred_handler.get_frame(i)
+            result = self.overlay_engine.single_frame(frame, (w, h), is_gt)
+            if grid is not None:
+                grid.apply(result, out=result)
             overlay_frames.append(result)
+
+        for i in range(max_frames):
             durations.append(self.gt_handler.get_duration(i) or
                            self.pred_handler.get_duration(i) or 100)
 
@@ -404,6 +819,11 @@ class GifCompareApp(QMainWindow):
         else:
             QMessageBox.warning(self, "Error", "Failed to save GIF")
 
+    def _batch_frames(self, handler: GifHandler):
+        """Frames of a handler for batched processing, as one array when that is free."""
+        stack = handler.get_stack(allow_copy=False)
+        return stack if stack is not None else handler.frames
+
     def _open_discovery(self):
         # Get filenames from current paths
         gt_path = self.gt_combo.currentText()
@@ -447,21 +867,30 @@ class GifCompareApp(QMainWindow):
         progress.setWindowModality(Qt.WindowModal)
 
         all_metrics: List[SequenceMetrics] = []
-        calculator = MetricsCalculator()
+        # One pool for all folders, so workers start (and load LPIPS) once
+        calculator = MetricsCalculator(*self.metrics_tab.worker_settings())
+        loader = self._create_handler()
 
-        for i, (gt_path, pred_path) in enumerate(pairs):
-            if progress.wasCanceled():
-                return
-            progress.setValue(i)
-            QApplication.processEvents()
-
-            gt = GifHandler()
-            pred = GifHandler()
-            if gt.load(gt_path) and pred.load(pred_path):
-                seq_metrics, _ = calculator.calculate_sequence_metrics(
-                    gt.frames, pred.frames
-                )
-                all_metrics.append(seq_metrics)
+        try:
+            for i, (gt_path, pred_path) in enumerate(pairs):
+                if progress.wasCanceled():
+                    return
+                progress.setValue(i)
+                QApplication.processEvents()
+
+                # Stream frame pairs so only a few frames are in memory at once
+                try:
+                    seq_metrics, _ = calculator.calculate_stream_metrics(
+                        loader.iter_frame_pairs(gt_path, pred_path),
+                        self.metrics_tab.selected_metrics()
+                    )
+                except Exception as e:
+                    print(f"Error calculating metrics for {gt_path}: {e}")
+                    continue
+                if seq_metrics.frame_count > 0:
+                    all_metrics.append(seq_metrics)
+        finally:
+            calculator.shutdown()
 
         progress.close()
 
@@ -488,8 +917,8 @@ class GifCompareApp(QMainWindow):
         QApplication.processEvents()
 
         self.metrics_tab.calculate_metrics(
-            self.gt_handler.frames,
-            self.pred_handler.frames
+            self._batch_frames(self.gt_handler),
+            self._batch_frames(self.pred_handler)
         )
 
         progress.close()
@@ -0,0 +1,84 @@
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+def _heat_lut() -> np.ndarray:
+    """Blue -> green -> yellow -> red ramp used by the difference heatmap."""
+    t = np.arange(256, dtype=np.float32) / 255
+    lut = np.zeros((256, 4), dtype=np.uint8)
+    lut[:, 0] = np.clip(t * 4 * 255, 0, 255)
+    lut[:, 1] = np.clip((1 - np.abs(t - 0.5) * 2) * 255, 0, 255)
+    lut[:, 2] = np.clip((1 - t) * 255, 0, 255)
+    lut[:, 3] = 255
+    return lut
+
+
+def _red_green_lut() -> np.ndarray:
+    """Red (0) to green (1) ramp used by the SSIM heatmap."""
+    t = np.arange(256, dtype=np.float32) / 255
+    lut = np.zeros((256, 4), dtype=np.uint8)
+    lut[:, 0] = ((1 - t) * 255).astype(np.uint8)
+    lut[:, 1] = (t * 255).astype(np.uint8)
+    lut[:, 3] = 255
+    return lut
+
+
+def _interpolated_lut(colors: Sequence[Tuple[int, int, int]]) -> np.ndarray:
+    """Build a LUT by linear interpolation between evenly spaced RGB stops."""
+    stops = np.array(colors, dtype=np.float32)
+    positions = np.linspace(0, 255, len(stops))
+    t = np.arange(256)
+    lut = np.empty((256, 4), dtype=np.uint8)
+    for c in range(3):
+        lut[:, c] = np.round(np.interp(t, positions, stops[:, c]))
+    lut[:, 3] = 255
+    return lut
+
+
+# Perceptually uniform maps, sampled at nine evenly spaced points
+_VIRIDIS = [(68, 1, 84), (71, 44, 122), (59, 82, 139), (44, 113, 142), (33, 145, 140),
+            (40, 174, 128), (94, 201, 98), (170, 220, 50), (253, 231, 37)]
+_MAGMA = [(0, 0, 4), (28, 16, 68), (79, 18, 123), (129, 37, 129), (181, 54, 122),
+          (229, 80, 100), (251, 135, 97), (254, 194, 135), (252, 253, 191)]
+
+_COLORMAPS: Dict[str, np.ndarray] = {
+    "heat": _heat_lut(),
+    "red_green": _red_green_lut(),
+    "viridis": _interpolated_lut(_VIRIDIS),
+    "magma": _interpolated_lut(_MAGMA),
+    "gray": _interpolated_lut([(0, 0, 0), (255, 255, 255)]),
+}
+
+
+def register_colormap(name: str, lut: np.ndarray):
+    """Add a colormap given as a (256, 3) or (256, 4) uint8 table."""
+    lut = np.asarray(lut, dtype=np.uint8)
+    if lut.shape not in ((256, 3), (256, 4)):
+        raise ValueError(f"Colormap LUT must be 256x3 or 256x4, got {lut.shape}")
+    if lut.shape[1] == 3:
+        lut = np.concatenate([lut, np.full((256, 1), 255, dtype=np.uint8)], axis=1)
+    _COLORMAPS[name] = np.ascontiguousarray(lut)
+
+
+def colormap_names() -> List[str]:
+    """Names of all registered colormaps."""
+    return list(_COLORMAPS)
+
+
+def get_colormap(name: str) -> np.ndarray:
+    """Return the (256, 4) RGBA LUT of a colormap."""
+    try:
+        return _COLORMAPS[name]
+    except KeyError:
+        raise ValueError(f"Unknown colormap: {name}") from None
+
+
+def apply_colormap(values: np.ndarray, name: str,
+                   out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Map a uint8 array to RGBA (one extra trailing axis) in one gather."""
+    lut = get_colormap(name).view(np.uint32).ravel()
+    if out is None:
+        out = np.empty(values.shape + (4,), dtype=np.uint8)
+    # uint8 values are always in range; "clip" skips numpy's buffered bounds check
+    lut.take(values, out=out.view(np.uint32)[..., 0], mode="clip")
+    return out
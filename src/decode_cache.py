@@ -0,0 +1,250 @@
+import hashlib
+import json
+import os
+import time
+import uuid
+import numpy as np
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple, Union
+
+
+def _unique_suffix() -> str:
+    return f"{os.getpid()}.{uuid.uuid4().hex}"
+
+
+class DecodeCache:
+    """Persistent on-disk cache of decoded GIF frame stacks.
+
+    Decoded sequences are stored as (T, H, W, 4) ``.npy`` files that are
+    memory-mapped on reload, named after a hash of the file's content.
+    Lookups go through a cheap key on the file's path, mtime and size;
+    the content is only hashed when that misses but an entry of the
+    same file size exists, e.g. after the file was copied or touched.
+    The cache is kept under ``max_bytes`` by evicting the least recently
+    used entries.
+    """
+
+    def __init__(self, directory: Optional[Union[str, Path]] = None,
+                 max_bytes: int = 4 * 1024 ** 3):
+        if directory is None:
+            directory = Path.home() / ".cache" / "gif_compare" / "frames"
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+    def set_max_bytes(self, max_bytes: int):
+        """Change the size cap, evicting entries that no longer fit."""
+        self.max_bytes = max_bytes
+        self._evict()
+
+    def key_for(self, path: Union[str, Path]) -> str:
+        """Compute the lookup key of a file from its path, mtime and size."""
+        path = Path(path)
+        stat = path.stat()
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(str(path.resolve()).encode())
+        digest.update(f"{stat.st_mtime_ns}:{stat.st_size}".encode())
+        return digest.hexdigest()
+
+    def content_key(self, path: Union[str, Path]) -> str:
+        """Hash a file's content."""
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _meta_path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _data_path(self, content: str) -> Path:
+        return self.directory / f"{content}.npy"
+
+    def _read_meta(self, meta_path: Path) -> Optional[dict]:
+        try:
+            return json.loads(meta_path.read_text())
+        except (OSError, ValueError):
+            return None
+
+    def _find_content(self, path: Path) -> Optional[dict]:
+        """Match a file against entries of the same size by content."""
+        size = path.stat().st_size
+        if not self.directory.is_dir():
+            return None
+        candidates = {}
+        for meta_path in self.directory.glob("*.json"):
+            meta = self._read_meta(meta_path)
+            if meta is not None and meta.get("file_size") == size:
+                candidates[meta.get("content")] = meta
+        if not candidates:
+            return None
+        return candidates.get(self.content_key(path))
+
+    def load(self, path: Union[str, Path]) -> Optional[Tuple[np.ndarray, List[int]]]:
+        """Return (memory-mapped frame stack, durations) or None on a miss."""
+        path = Path(path)
+        try:
+            key = self.key_for(path)
+            meta_path = self._meta_path(key)
+            meta = self._read_meta(meta_path) if meta_path.exists() else None
+            if meta is None:
+                meta = self._find_content(path)
+                if meta is None:
+                    return None
+                # Remember the file under its new path/mtime
+                self._write_meta(key, meta)
+
+            data_path = self._data_path(meta["content"])
+            if not data_path.exists():
+                meta_path.unlink(missing_ok=True)
+                return None
+            frames = np.load(data_path, mmap_mode="r")
+            if len(frames) != len(meta["durations"]):
+                return None
+            # Mark as recently used
+            now = time.time()
+            os.utime(data_path, (now, now))
+            return frames, list(meta["durations"])
+        except Exception as e:
+            print(f"Error reading decode cache: {e}")
+            return None
+
+    def _write_meta(self, key: str, meta: dict):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Replaced atomically so concurrent writers and readers never see partial JSON
+        tmp_path = self.directory / f"{key}.{_unique_suffix()}.tmp"
+        tmp_path.write_text(json.dumps(meta))
+        os.replace(tmp_path, self._meta_path(key))
+
+    def writer(self, path: Union[str, Path], frame_shape: Tuple[int, ...],
+               count: int) -> Optional["CacheWriter"]:
+        """Start writing a decoded sequence frame by frame; None if it can't be cached."""
+        if count <= 0 or count * int(np.prod(frame_shape)) > self.max_bytes:
+            return None
+        try:
+            return CacheWriter(self, Path(path), tuple(frame_shape), count)
+        except Exception as e:
+            print(f"Error writing decode cache: {e}")
+            return None
+
+    def store(self, path: Union[str, Path], frames: Sequence[np.ndarray],
+              durations: List[int]) -> bool:
+        """Write a decoded sequence to the cache."""
+        if len(frames) == 0:
+            return False
+        shape = frames[0].shape
+        if any(frame.shape != shape for frame in frames):
+            return False
+        writer = self.writer(path, shape, len(frames))
+        if writer is None:
+            return False
+        for frame in frames:
+            writer.write(frame)
+        return writer.commit(durations)
+
+    def _evict(self):
+        """Remove least recently used entries until under the size cap."""
+        entries = []
+        total = 0
+        for data_path in self.directory.glob("*.npy"):
+            if data_path.name.endswith(".tmp.npy"):
+                continue
+            try:
+                stat = data_path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, data_path, stat.st_size))
+            total += stat.st_size
+        if total <= self.max_bytes:
+            return
+
+        metas = {}
+        for meta_path in self.directory.glob("*.json"):
+            meta = self._read_meta(meta_path)
+            if meta is not None:
+                metas.setdefault(meta.get("content"), []).append(meta_path)
+
+        for _, data_path, size in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            try:
+                data_path.unlink(missing_ok=True)
+            except OSError:
+                # Still mapped by an open handler on some platforms
+                continue
+            for meta_path in metas.get(data_path.stem, []):
+                meta_path.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self):
+        """Delete all cache entries."""
+        for path in list(self.directory.glob("*.json")) + list(self.directory.glob("*.npy")):
+            try:
+                path.unlink(missing_ok=True)
+            except OSError:
+                pass
+
+
+class CacheWriter:
+    """Writes one decoded sequence into a ``DecodeCache`` frame by frame.
+
+    Frames go straight to a memory-mapped temporary file, so the sequence
+    is never held in RAM. ``commit`` publishes it; ``abort`` discards it.
+    """
+
+    def __init__(self, cache: DecodeCache, path: Path, frame_shape: Tuple[int, ...],
+                 count: int):
+        self._cache = cache
+        self._path = path
+        self._key = cache.key_for(path)
+        self._count = count
+        self._frame_shape = frame_shape
+        self._written = 0
+        cache.directory.mkdir(parents=True, exist_ok=True)
+        # Unique per writer, so processes or threads caching the same file don't collide
+        self._tmp_path = cache.directory / f"{self._key}.{_unique_suffix()}.tmp.npy"
+        self._stack = np.lib.format.open_memmap(self._tmp_path, mode="w+", dtype=np.uint8,
+                                                shape=(count,) + frame_shape)
+
+    def write(self, frame: np.ndarray) -> bool:
+        """Add the next frame; False (and the write is dropped) if it doesn't fit."""
+        if self._stack is None:
+            return False
+        if self._written >= self._count or frame.shape != self._stack.shape[1:]:
+            self.abort()
+            return False
+        self._stack[self._written] = frame
+        self._written += 1
+        return True
+
+    def commit(self, durations: List[int]) -> bool:
+        """Publish the written frames if the sequence is complete."""
+        if self._stack is None or self._written != self._count or len(durations) != self._count:
+            self.abort()
+            return False
+        try:
+            self._stack.flush()
+            self._stack = None
+            content = self._cache.content_key(self._path)
+            data_path = self._cache._data_path(content)
+            if data_path.exists():
+                self._tmp_path.unlink(missing_ok=True)
+            else:
+                os.replace(self._tmp_path, data_path)
+            self._cache._write_meta(self._key, {
+                "durations": [int(d) for d in durations],
+                "shape": list(self._frame_shape),
+                "content": content,
+                "file_size": self._path.stat().st_size,
+            })
+        except Exception as e:
+            print(f"Error writing decode cache: {e}")
+            self.abort()
+            return False
+
+        self._cache._evict()
+        return True
+
+    def abort(self):
+        """Discard the partially written sequence."""
+        self._stack = None
+        self._tmp_path.unlink(missing_ok=True)
@@ -0,0 +1,219 @@
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Iterator, List, Optional, Sequence, Tuple, Union
+
+
+class FrameStack:
+    """Frame container backed by preallocated (T, H, W, C) uint8 chunks.
+
+    Frames are addressed through an indirection index of (chunk, row)
+    slots, so deleting or inserting frames never moves pixel data.
+    ``get`` hands out zero-copy views into the chunk arrays.
+    """
+
+    def __init__(self, frame_shape: Tuple[int, ...], capacity: int = 0,
+                 chunk_size: int = 64):
+        self.frame_shape = tuple(frame_shape)
+        self.chunk_size = max(1, chunk_size)
+        self._chunks: List[np.ndarray] = []
+        self._order: List[Tuple[int, int]] = []
+        self._free: List[Tuple[int, int]] = []
+        if capacity > 0:
+            self._allocate(capacity)
+
+    @classmethod
+    def from_frames(cls, frames: Sequence[np.ndarray], chunk_size: int = 64) -> "FrameStack":
+        """Build a stack holding copies of the given frames."""
+        stack = cls(frames[0].shape, capacity=len(frames), chunk_size=chunk_size)
+        for frame in frames:
+            stack.append(frame)
+        return stack
+
+    @classmethod
+    def from_array(cls, frames: np.ndarray, chunk_size: int = 64) -> "FrameStack":
+        """Wrap an existing (T, H, W, C) array, e.g. a read-only memmap, without copying."""
+        stack = cls(frames.shape[1:], chunk_size=chunk_size)
+        stack._chunks.append(frames)
+        stack._order = [(0, row) for row in range(len(frames))]
+        return stack
+
+    def _allocate(self, rows: int):
+        chunk = len(self._chunks)
+        self._chunks.append(np.empty((rows,) + self.frame_shape, dtype=np.uint8))
+        # Reversed so pop() hands out rows in ascending order
+        self._free.extend((chunk, row) for row in reversed(range(rows)))
+
+    def _take_slot(self) -> Tuple[int, int]:
+        if not self._free:
+            self._allocate(self.chunk_size)
+        return self._free.pop()
+
+    def _write(self, frame: np.ndarray) -> Tuple[int, int]:
+        if frame.shape != self.frame_shape:
+            raise ValueError(f"Frame shape {frame.shape} does not match "
+                             f"stack frame shape {self.frame_shape}")
+        slot = self._take_slot()
+        self._chunks[slot[0]][slot[1]] = frame
+        return slot
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        for chunk, row in self._order:
+            yield self._chunks[chunk][row]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self._order)))]
+        chunk, row = self._order[index]
+        return self._chunks[chunk][row]
+
+    def __delitem__(self, index: int):
+        slot = self._order.pop(index)
+        # Slots in read-only chunks (memmaps) are never reused
+        if self._chunks[slot[0]].flags.writeable:
+            self._free.append(slot)
+
+    def insert(self, index: int, frame: np.ndarray):
+        self._order.insert(index, self._write(frame))
+
+    def append(self, frame: np.ndarray):
+        self._order.append(self._write(frame))
+
+    def as_array(self, allow_copy: bool = True) -> Optional[np.ndarray]:
+        """Return the sequence as one (T, H, W, C) array.
+
+        This is a view when the frames are stored in order in a single
+        chunk, otherwise a gathered copy, or None if ``allow_copy`` is False.
+        """
+        n = len(self._order)
+        if n == 0:
+            return np.empty((0,) + self.frame_shape, dtype=np.uint8)
+
+        slots = np.array(self._order)
+        chunks, rows = slots[:, 0], slots[:, 1]
+        if (chunks == 0).all() and (rows == np.arange(n)).all():
+            return self._chunks[0][:n]
+        if not allow_copy:
+            return None
+
+        result = np.empty((n,) + self.frame_shape, dtype=np.uint8)
+        for c in np.unique(chunks):
+            mask = chunks == c
+            result[mask] = self._chunks[c][rows[mask]]
+        return result
+
+    def nbytes(self) -> int:
+        """Total bytes allocated, including free slots."""
+        return sum(chunk.nbytes for chunk in self._chunks)
+
+
+def quantize_rgba(frame: np.ndarray) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """Losslessly convert an RGBA frame to (indices, 256x4 palette).
+
+    Returns None when the frame has more than 256 distinct colors.
+    """
+    frame = np.ascontiguousarray(frame)
+    if frame.ndim != 3 or frame.shape[-1] != 4 or frame.dtype != np.uint8:
+        return None
+    packed = frame.view(np.uint32).reshape(frame.shape[:2])
+    colors, inverse = np.unique(packed, return_inverse=True)
+    if len(colors) > 256:
+        return None
+    lut = np.zeros((256, 4), dtype=np.uint8)
+    lut[:len(colors)] = colors.view(np.uint8).reshape(-1, 4)
+    return inverse.reshape(frame.shape[:2]).astype(np.uint8), lut
+
+
+class PaletteFrameStore:
+    """Frame container keeping frames as uint8 index planes plus palettes.
+
+    Uses about a quarter of the memory of RGBA storage. Frames are
+    expanded to RGBA with a single palette lookup when accessed, and the
+    most recent expansions are kept so repeated redraws don't redo it.
+    Frames with more than 256 colors are stored as plain RGBA. Frames
+    can be read from several threads (e.g. prerendering and export).
+    """
+
+    def __init__(self, expand_cache: int = 4):
+        self._entries: List[Union[Tuple[np.ndarray, np.ndarray], np.ndarray]] = []
+        self._expand_cache = max(0, expand_cache)
+        self._expanded: "OrderedDict[int, np.ndarray]" = OrderedDict()
+        self._expanded_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        for i in range(len(self._entries)):
+            yield self[i]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self._entries)))]
+        entry = self._entries[index]
+        if isinstance(entry, np.ndarray):
+            return entry
+
+        # Cache by entry identity so edits never return a stale expansion
+        key = id(entry)
+        with self._expanded_lock:
+            frame = self._expanded.get(key)
+            if frame is not None:
+                self._expanded.move_to_end(key)
+                return frame
+
+        # Expanded outside the lock so other threads aren't held up
+        indices, lut = entry
+        frame = lut[indices]
+        if self._expand_cache:
+            with self._expanded_lock:
+                self._expanded[key] = frame
+                while len(self._expanded) > self._expand_cache:
+                    self._expanded.popitem(last=False)
+        return frame
+
+    def __delitem__(self, index: int):
+        entry = self._entries.pop(index)
+        with self._expanded_lock:
+            self._expanded.pop(id(entry), None)
+
+    def _entry(self, frame: np.ndarray):
+        indexed = quantize_rgba(frame)
+        return indexed if indexed is not None else frame
+
+    def insert(self, index: int, frame: np.ndarray):
+        self._entries.insert(index, self._entry(frame))
+
+    def append(self, frame: np.ndarray):
+        self._entries.append(self._entry(frame))
+
+    def append_indexed(self, indices: np.ndarray, lut: np.ndarray):
+        """Append a frame already in (indices, palette) form."""
+        self._entries.append((indices, lut))
+
+    def append_entry(self, entry: Union[Tuple[np.ndarray, np.ndarray], np.ndarray]):
+        """Append an (indices, palette) pair, or an RGBA frame stored as is."""
+        self._entries.append(tuple(entry) if isinstance(entry, tuple) else entry)
+
+    def get_indexed(self, index: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Return (indices, palette) for a frame, or None if stored as RGBA."""
+        entry = self._entries[index]
+        return None if isinstance(entry, np.ndarray) else entry
+
+    def nbytes(self) -> int:
+        """Bytes used by stored frames; shared palettes are counted once."""
+        total = 0
+        seen = set()
+        for entry in self._entries:
+            if isinstance(entry, np.ndarray):
+                total += entry.nbytes
+                continue
+            indices, lut = entry
+            total += indices.nbytes
+            if id(lut) not in seen:
+                seen.add(id(lut))
+                total += lut.nbytes
+        return total
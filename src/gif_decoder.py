@@ -0,0 +1,591 @@
+import io
+import struct
+import threading
+import numpy as np
+from PIL import Image
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple, Union
+
+from src.frame_store import quantize_rgba
+
+
+# Identity grayscale palette: makes Pillow return raw palette indices
+_IDENTITY_PALETTE = bytes(i for i in range(256) for _ in range(3))
+_IDENTITY_LUT = np.arange(256, dtype=np.uint8)
+
+
+@dataclass
+class GifFrameInfo:
+    """Location and rendering parameters of one frame inside a GIF file."""
+    index: int
+    data_offset: int
+    x: int
+    y: int
+    width: int
+    height: int
+    interlace: bool
+    palette: Optional[bytes]
+    transparency: Optional[int]
+    disposal: int
+    duration: int
+    data_size: int = 0
+
+
+@dataclass
+class GifIndex:
+    """Frame table of a GIF file, built without decoding any pixels."""
+    path: Path
+    size: Tuple[int, int]
+    global_palette: Optional[bytes]
+    background: int
+    frames: List[GifFrameInfo] = field(default_factory=list)
+
+    def durations(self) -> List[int]:
+        return [f.duration for f in self.frames]
+
+
+def _skip_sub_blocks(fp):
+    """Skip a chain of GIF data sub-blocks."""
+    while True:
+        length = fp.read(1)
+        if not length or length[0] == 0:
+            return
+        fp.seek(length[0], 1)
+
+
+def _read_sub_blocks(fp) -> bytes:
+    """Read and concatenate a chain of GIF data sub-blocks."""
+    data = b""
+    while True:
+        length = fp.read(1)
+        if not length or length[0] == 0:
+            return data
+        data += fp.read(length[0])
+
+
+def is_gif_file(path: Union[str, Path]) -> bool:
+    """Check the file signature; other formats need Pillow's generic path."""
+    try:
+        with open(path, "rb") as fp:
+            return fp.read(6) in (b"GIF87a", b"GIF89a")
+    except OSError:
+        return False
+
+
+def index_gif(path: Union[str, Path]) -> GifIndex:
+    """Walk the GIF block structure once and record every frame."""
+    path = Path(path)
+    with open(path, "rb") as fp:
+        header = fp.read(13)
+        if len(header) < 13 or header[:3] != b"GIF":
+            raise ValueError(f"Not a GIF file: {path}")
+
+        width, height = struct.unpack("<HH", header[6:10])
+        flags = header[10]
+        global_palette = None
+        if flags & 0x80:
+            global_palette = fp.read(3 << ((flags & 7) + 1))
+        index = GifIndex(path, (width, height), global_palette, header[11])
+
+        transparency = None
+        duration = None
+        # Pillow keeps the last explicit disposal method for later frames
+        disposal = 0
+        while True:
+            block = fp.read(1)
+            if not block or block == b";":
+                break
+
+            if block == b"!":
+                label = fp.read(1)
+                if label == b"\xf9":
+                    gce = _read_sub_blocks(fp)
+                    if len(gce) >= 4:
+                        if gce[0] & 1:
+                            transparency = gce[3]
+                        duration = struct.unpack("<H", gce[1:3])[0] * 10
+                        if (gce[0] >> 2) & 7:
+                            disposal = (gce[0] >> 2) & 7
+                else:
+                    _skip_sub_blocks(fp)
+            elif block == b",":
+                desc = fp.read(9)
+                if len(desc) < 9:
+                    break
+                x, y, w, h = struct.unpack("<HHHH", desc[:8])
+                local_palette = None
+                if desc[8] & 0x80:
+                    local_palette = fp.read(3 << ((desc[8] & 7) + 1))
+                offset = fp.tell()
+                fp.read(1)  # LZW minimum code size
+                _skip_sub_blocks(fp)
+                data_size = fp.tell() - offset
+                index.frames.append(GifFrameInfo(
+                    index=len(index.frames),
+                    data_offset=offset,
+                    x=x, y=y, width=w, height=h,
+                    interlace=bool(desc[8] & 0x40),
+                    palette=local_palette,
+                    transparency=transparency,
+                    disposal=disposal,
+                    duration=duration if duration is not None else 100,
+                    data_size=data_size,
+                ))
+                transparency = None
+                duration = None
+            else:
+                # Unknown block - treat the rest of the file as garbage
+                break
+
+    return index
+
+
+def read_frame_data(fp, info: GifFrameInfo) -> bytes:
+    """Read the raw LZW code size byte and data sub-blocks of a frame."""
+    fp.seek(info.data_offset)
+    if info.data_size:
+        return fp.read(info.data_size)
+    chunks = [fp.read(1)]
+    while True:
+        length = fp.read(1)
+        if not length:
+            break
+        chunks.append(length)
+        if length[0] == 0:
+            break
+        chunks.append(fp.read(length[0]))
+    return b"".join(chunks)
+
+
+def decode_raster(info: GifFrameInfo, data: bytes) -> np.ndarray:
+    """Decompress a frame's LZW raster into a (h, w) plane of palette indices."""
+    if info.width == 0 or info.height == 0:
+        return np.zeros((info.height, info.width), dtype=np.uint8)
+
+    # Wrap the raster in a minimal single-frame GIF so Pillow's C decoder
+    # does the LZW work without compositing or palette conversion
+    buf = b"".join([
+        b"GIF89a",
+        struct.pack("<HHBBB", info.width, info.height, 0xF7, 0, 0),
+        _IDENTITY_PALETTE,
+        b",",
+        struct.pack("<HHHHB", 0, 0, info.width, info.height,
+                    0x40 if info.interlace else 0),
+        data,
+        b";",
+    ])
+    with Image.open(io.BytesIO(buf)) as img:
+        return np.array(img)
+
+
+def palette_lut(index: GifIndex, info: GifFrameInfo) -> np.ndarray:
+    """Build the 256x4 RGBA lookup table for a frame's palette."""
+    lut = np.zeros((256, 4), dtype=np.uint8)
+    lut[:, 3] = 255
+    palette = info.palette if info.palette is not None else index.global_palette
+    if palette is None:
+        lut[:, :3] = np.arange(256, dtype=np.uint8)[:, None]
+    else:
+        colors = np.frombuffer(palette, dtype=np.uint8)
+        colors = colors[:len(colors) // 3 * 3].reshape(-1, 3)[:256]
+        lut[:len(colors), :3] = colors
+    if info.transparency is not None:
+        lut[info.transparency, 3] = 0
+    return lut
+
+
+def is_single_palette(index: GifIndex) -> bool:
+    """Check whether composited frames can be kept as global palette indices.
+
+    True when no frame has a local palette and transparency is used
+    consistently, so one 256-entry RGBA table describes every frame.
+    """
+    if not index.frames or any(f.palette is not None for f in index.frames):
+        return False
+    first = index.frames[0].transparency
+    if first is None:
+        return True
+    return (all(f.transparency == first for f in index.frames)
+            and index.background != first)
+
+
+def sequence_lut(index: GifIndex) -> np.ndarray:
+    """RGBA table for frames decoded in indexed mode."""
+    return palette_lut(index, index.frames[0])
+
+
+class GifCompositor:
+    """Applies decoded rasters in order, handling GIF disposal methods.
+
+    Pixels are composited as packed uint32 RGBA values so every step is a
+    single gather or masked copy. In indexed mode the canvas holds global
+    palette indices instead; only valid when ``is_single_palette`` holds.
+    """
+
+    def __init__(self, index: GifIndex, indexed: bool = False):
+        self.index = index
+        self.indexed = indexed
+        self.position = -1
+        self._pixels: Optional[np.ndarray] = None
+        self._has_alpha = False
+        # Pending disposal: (y0, y1, x0, x1, fill) where fill is a patch or pixel value
+        self._dispose = None
+
+    def reset(self):
+        self.position = -1
+        self._pixels = None
+        self._dispose = None
+
+    def _extent(self, info: GifFrameInfo) -> Tuple[int, int, int, int]:
+        w, h = self.index.size
+        return (min(info.y, h), min(info.y + info.height, h),
+                min(info.x, w), min(info.x + info.width, w))
+
+    def _lut(self, info: GifFrameInfo) -> np.ndarray:
+        """1-D table mapping palette indices to canvas pixel values."""
+        if self.indexed:
+            return _IDENTITY_LUT
+        lut = palette_lut(self.index, info)
+        if not self._has_alpha:
+            lut[:, 3] = 255
+        return lut.view(np.uint32).ravel()
+
+    def _fill_color(self, info: GifFrameInfo, lut: np.ndarray):
+        """Pixel value used by 'restore to background' disposal."""
+        if info.transparency is not None:
+            return lut[info.transparency]
+        color = lut[self.index.background]
+        if not self.indexed:
+            # The background color is always opaque
+            color = np.array([color]).view(np.uint8)
+            color[3] = 255
+            color = color.view(np.uint32)[0]
+        return color
+
+    def _background_dispose(self, info: GifFrameInfo, lut: np.ndarray):
+        if info.disposal == 2:
+            y0, y1, x0, x1 = self._extent(info)
+            return (y0, y1, x0, x1, self._fill_color(info, lut))
+        return None
+
+    def _canvas(self) -> np.ndarray:
+        if self.indexed:
+            return self._pixels
+        h, w = self._pixels.shape
+        return self._pixels.view(np.uint8).reshape(h, w, 4)
+
+    def apply(self, info: GifFrameInfo, indices: np.ndarray) -> np.ndarray:
+        """Draw the next frame onto the canvas and return the canvas."""
+        y0, y1, x0, x1 = self._extent(info)
+        indices = indices[:y1 - y0, :x1 - x0]
+
+        if info.index == 0 or self._pixels is None:
+            w, h = self.index.size
+            self._has_alpha = info.transparency is not None
+            lut = self._lut(info)
+            fill = lut[info.transparency] if self._has_alpha else lut[0]
+            self._pixels = np.full((h, w), fill, dtype=lut.dtype)
+            if info.disposal == 3 and self._has_alpha:
+                self._dispose = (y0, y1, x0, x1, fill)
+            else:
+                self._dispose = self._background_dispose(info, lut)
+            self._pixels[y0:y1, x0:x1] = lut.take(indices)
+        else:
+            lut = self._lut(info)
+            if self._dispose is not None:
+                dy0, dy1, dx0, dx1, fill = self._dispose
+                self._pixels[dy0:dy1, dx0:dx1] = fill
+
+            if info.disposal == 3:
+                self._dispose = (y0, y1, x0, x1, self._pixels[y0:y1, x0:x1].copy())
+            else:
+                self._dispose = self._background_dispose(info, lut)
+
+            region = self._pixels[y0:y1, x0:x1]
+            if info.transparency is not None:
+                np.copyto(region, lut.take(indices), where=indices != info.transparency)
+            else:
+                region[:] = lut.take(indices)
+
+        self.position = info.index
+        return self._canvas()
+
+    def resume(self, position: int, frame: np.ndarray) -> bool:
+        """Continue compositing after an already decoded frame.
+
+        Not possible after 'restore to previous' frames, whose pending
+        disposal depends on the canvas before the frame was drawn.
+        """
+        info = self.index.frames[position]
+        if info.disposal == 3:
+            return False
+        self._has_alpha = self.index.frames[0].transparency is not None
+        frame = np.ascontiguousarray(frame)
+        if self.indexed:
+            self._pixels = frame.copy()
+        else:
+            self._pixels = frame.view(np.uint32).reshape(frame.shape[:2]).copy()
+        self._dispose = self._background_dispose(info, self._lut(info))
+        self.position = position
+        return True
+
+
+class GifDecoder:
+    """Decodes individual frames of an indexed GIF on request.
+
+    Frames are RGBA arrays, or (h, w) global palette index planes when
+    ``indexed`` is set.
+    """
+
+    def __init__(self, index: GifIndex, indexed: bool = False):
+        self.index = index
+        self.indexed = indexed
+        self._compositor = GifCompositor(index, indexed)
+        self._fp = open(index.path, "rb")
+
+    def __len__(self) -> int:
+        return len(self.index.frames)
+
+    @property
+    def position(self) -> int:
+        """Index of the last frame drawn onto the canvas."""
+        return self._compositor.position
+
+    def read_raster(self, position: int) -> np.ndarray:
+        info = self.index.frames[position]
+        return decode_raster(info, read_frame_data(self._fp, info))
+
+    def resume(self, position: int, frame: np.ndarray) -> bool:
+        return self._compositor.resume(position, frame)
+
+    def decode(self, position: int) -> np.ndarray:
+        """Decode a frame, compositing forward from the current position."""
+        if position <= self._compositor.position:
+            self._compositor.reset()
+        frame = None
+        for i in range(self._compositor.position + 1, position + 1):
+            frame = self._compositor.apply(self.index.frames[i], self.read_raster(i))
+        return frame.copy()
+
+    def close(self):
+        self._fp.close()
+
+
+def decode_frames(index: GifIndex, workers: int = 0,
+                  indexed: bool = False) -> Iterator[np.ndarray]:
+    """Decode every frame of an indexed GIF in order.
+
+    With ``workers`` > 1 the LZW rasters are decompressed on a thread
+    pool (Pillow releases the GIL while decoding) and a sequential pass
+    applies disposal and compositing. The yielded array is the reused
+    canvas; copy it to keep it.
+    """
+    compositor = GifCompositor(index, indexed)
+    for info, raster in _iter_rasters(index, workers):
+        yield compositor.apply(info, raster)
+
+
+def _iter_rasters(index: GifIndex, workers: int) -> Iterator[Tuple[GifFrameInfo, np.ndarray]]:
+    """Yield (frame info, palette index raster) for every frame in order."""
+    with open(index.path, "rb") as fp:
+        if workers <= 1:
+            for info in index.frames:
+                yield info, decode_raster(info, read_frame_data(fp, info))
+            return
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Bound the number of rasters in flight to keep memory flat
+            window = workers * 2
+            pending = deque()
+            for info in index.frames:
+                pending.append((info, executor.submit(decode_raster, info,
+                                                      read_frame_data(fp, info))))
+                if len(pending) >= window:
+                    done_info, future = pending.popleft()
+                    yield done_info, future.result()
+            while pending:
+                done_info, future = pending.popleft()
+                yield done_info, future.result()
+
+
+PaletteEntry = Union[Tuple[np.ndarray, np.ndarray], np.ndarray]
+
+
+def decode_palette_frames(index: GifIndex,
+                          workers: int = 0) -> Iterator[Tuple[np.ndarray, PaletteEntry]]:
+    """Decode every frame as (RGBA canvas, palette entry) for palette storage.
+
+    The entry is (uint8 index plane, 256x4 RGBA palette), built from the
+    frame's own raster and palette: single-palette GIFs are composited
+    in index space, others paste each raster over the previous frame's
+    indices and look up the few pixels that disposal or a palette
+    change left in other colors. Frames whose colors are not all in
+    their palette are quantized, and stored as an RGBA copy if they
+    have more than 256 colors. The canvas is reused; copy it to keep it.
+    """
+    if is_single_palette(index):
+        lut = sequence_lut(index)
+        for indices in decode_frames(index, workers, indexed=True):
+            yield lut[indices], (indices.copy(), lut)
+        return
+
+    compositor = GifCompositor(index)
+    # Last stored frame: (indices, packed palette, RGBA palette)
+    previous: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+    for info, raster in _iter_rasters(index, workers):
+        canvas = compositor.apply(info, raster)
+        packed = canvas.view(np.uint32).reshape(canvas.shape[:2])
+        lut = compositor._lut(info)
+
+        if previous is not None and np.array_equal(previous[1], lut):
+            # Shared palette objects are counted once by PaletteFrameStore
+            indices, lut, rgba_lut = previous[0].copy(), previous[1], previous[2]
+        else:
+            indices = np.zeros(packed.shape, dtype=np.uint8)
+            rgba_lut = lut.view(np.uint8).reshape(-1, 4)
+        y0, y1, x0, x1 = compositor._extent(info)
+        raster = raster[:y1 - y0, :x1 - x0]
+        if info.transparency is not None:
+            np.copyto(indices[y0:y1, x0:x1], raster, where=raster != info.transparency)
+        else:
+            indices[y0:y1, x0:x1] = raster
+
+        if _repair_indices(indices, packed, lut):
+            previous = (indices, lut, rgba_lut)
+            yield canvas, (indices, rgba_lut)
+            continue
+
+        previous = None
+        quantized = quantize_rgba(canvas)
+        yield canvas, quantized if quantized is not None else canvas.copy()
+
+
+def _repair_indices(indices: np.ndarray, packed: np.ndarray, lut: np.ndarray) -> bool:
+    """Fix indices whose color differs from the canvas; False if a color isn't in ``lut``."""
+    wrong = lut.take(indices) != packed
+    if not wrong.any():
+        return True
+    order = np.argsort(lut, kind="stable")
+    colors = packed[wrong]
+    found = order[np.searchsorted(lut[order], colors).clip(max=len(lut) - 1)]
+    if not (lut[found] == colors).all():
+        return False
+    indices[wrong] = found
+    return True
+
+
+class LazyFrameSequence:
+    """List-like frame container that decodes GIF frames on demand.
+
+    Decoded frames are kept in a bounded LRU cache. Sequential access
+    schedules the next few frames for decoding on a background thread.
+    """
+
+    def __init__(self, decoder: GifDecoder, cache_size: int = 32, prefetch: int = 4):
+        self._decoder = decoder
+        self._cache_size = max(1, cache_size)
+        self._prefetch = max(0, prefetch)
+        # Entries are source frame indices or inserted arrays
+        self._order: List[Union[int, np.ndarray]] = list(range(len(decoder)))
+        self._cache: "OrderedDict[int, np.ndarray]" = OrderedDict()
+        # Guards the cache and the prefetch state (executor, pending job, last position)
+        self._cache_lock = threading.Lock()
+        self._decode_lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = None
+        self._last_position = -1
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __iter__(self):
+        for i in range(len(self._order)):
+            yield self[i]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self._order)))]
+        entry = self._order[index]
+        if isinstance(entry, np.ndarray):
+            return entry
+        with self._cache_lock:
+            if entry == self._last_position + 1 and self._prefetch:
+                self._schedule_prefetch(entry)
+            self._last_position = entry
+        return self._get(entry)
+
+    def __delitem__(self, index: int):
+        del self._order[index]
+
+    def insert(self, index: int, frame: np.ndarray):
+        self._order.insert(index, frame)
+
+    def append(self, frame: np.ndarray):
+        self._order.append(frame)
+
+    def _cached(self, position: int) -> Optional[np.ndarray]:
+        with self._cache_lock:
+            frame = self._cache.get(position)
+            if frame is not None:
+                self._cache.move_to_end(position)
+            return frame
+
+    def _store(self, position: int, frame: np.ndarray):
+        with self._cache_lock:
+            self._cache[position] = frame
+            self._cache.move_to_end(position)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+
+    def _get(self, position: int) -> np.ndarray:
+        frame = self._cached(position)
+        if frame is not None:
+            return frame
+        with self._decode_lock:
+            # Another thread may have decoded it while we waited
+            frame = self._cached(position)
+            if frame is not None:
+                return frame
+            self._seek_near(position)
+            frame = self._decoder.decode(position)
+        self._store(position, frame)
+        return frame
+
+    def _seek_near(self, position: int):
+        """Resume from the closest cached frame when that beats the decoder."""
+        start = self._decoder.position if self._decoder.position < position else -1
+        with self._cache_lock:
+            candidates = sorted((p for p in self._cache if start < p < position), reverse=True)
+            snapshot = [(p, self._cache[p]) for p in candidates]
+        for p, frame in snapshot:
+            if self._decoder.resume(p, frame):
+                return
+
+    def _schedule_prefetch(self, position: int):
+        """Queue decoding of the frames after ``position``; called with ``_cache_lock`` held."""
+        if self._pending is not None and not self._pending.done():
+            return
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        last = min(position + self._prefetch, len(self._decoder) - 1)
+        self._pending = self._executor.submit(self._prefetch_range, position + 1, last)
+
+    def _prefetch_range(self, first: int, last: int):
+        for position in range(first, last + 1):
+            self._get(position)
+
+    def close(self):
+        """Stop the prefetch thread and release the file handle."""
+        with self._cache_lock:
+            executor, self._executor = self._executor, None
+            self._pending = None
+        # Outside the lock: the prefetch thread needs it to finish
+        if executor is not None:
+            executor.shutdown(wait=True)
+        with self._decode_lock:
+            self._decoder.close()
+        with self._cache_lock:
+            self._cache.clear()
@@ -1,21 +1,95 @@
+import itertools
 import numpy as np
 from PIL import Image
 import imageio
 from pathlib import Path
-from typing import List, Tuple, Optional
+from typing import Any, Callable, Iterator, List, Sequence, Tuple, Optional, Union
+
+from src.decode_cache import DecodeCache
+from src.frame_store import FrameStack, PaletteFrameStore
+from src.gif_decoder import (GifDecoder, LazyFrameSequence, decode_frames,
+                             decode_palette_frames, index_gif, is_gif_file)
+from src.resize_cache import DEFAULT_RESIZE_FILTER, ResizeCache
+
+# Process-wide frame ids, never reused, so caches keyed on them can't go stale
+_frame_ids = itertools.count()
 
 
 class GifHandler:
-    """Handles loading, manipulating, and saving GIF files."""
+    """Handles loading, manipulating, and saving GIF files.
+
+    With ``lazy=True`` only the frame table is read on load; frames are
+    decoded when first requested and kept in a bounded LRU cache.
+    With ``storage="stack"`` frames are held in preallocated contiguous
+    chunks (see ``FrameStack``) instead of a list of separate arrays.
+    With ``storage="palette"`` frames are kept as uint8 index planes plus
+    palettes and expanded to RGBA only when accessed.
+    A ``DecodeCache`` makes reopening a file a memory-map of the
+    previously decoded frames instead of a full decode.
+    With ``decode_workers`` > 1 frame rasters are decompressed in parallel.
+    Frames resized to another sequence's size are kept in a ``ResizeCache``
+    using the ``resize_filter`` resampling filter.
+    """
 
-    def __init__(self):
-        self.frames: List[np.ndarray] = []
+    def __init__(self, lazy: bool = False, cache_size: int = 32, prefetch: int = 4,
+                 storage: str = "list", decode_cache: Optional[DecodeCache] = None,
+                 decode_workers: int = 0, resize_filter: str = DEFAULT_RESIZE_FILTER):
+        self.frames: Union[List[np.ndarray], LazyFrameSequence, FrameStack,
+                           PaletteFrameStore] = []
         self.durations: List[int] = []
+        self.frame_ids: List[int] = []
         self.path: Optional[Path] = None
         self.original_size: Tuple[int, int] = (0, 0)
+        self.lazy = lazy
+        self.cache_size = cache_size
+        self.prefetch = prefetch
+        self.storage = storage
+        self.decode_cache = decode_cache
+        self.decode_workers = decode_workers
+        self.resize_cache = ResizeCache(resize_filter)
 
     def load(self, path: str) -> bool:
         """Load a GIF file and extract all frames."""
+        loaded = self._load(path)
+        self.frame_ids = [next(_frame_ids) for _ in range(len(self.frames))]
+        return loaded
+
+    def _load(self, path: str) -> bool:
+        self.close()
+
+        if self.decode_cache is not None and self._load_cached(path):
+            return True
+
+        if not is_gif_file(path):
+            # Other formats go through Pillow's generic frame reader
+            loaded = self._load_rgba(path)
+        elif self.lazy:
+            return self._load_lazy(path)
+        elif self.storage == "palette":
+            loaded = self._load_palette(path)
+        elif self.decode_workers > 1:
+            loaded = self._load_parallel(path)
+        else:
+            loaded = self._load_rgba(path)
+
+        if loaded and self.decode_cache is not None:
+            self.decode_cache.store(path, self.frames, self.durations)
+        return loaded
+
+    def _load_cached(self, path: str) -> bool:
+        """Map previously decoded frames from the decode cache."""
+        cached = self.decode_cache.load(path)
+        if cached is None:
+            return False
+        stack, durations = cached
+        self.path = Path(path)
+        self.frames = FrameStack.from_array(stack)
+        self.durations = durations
+        self.original_size = (stack.shape[2], stack.shape[1])
+        return len(self.frames) > 0
+
+    def _load_rgba(self, path: str) -> bool:
+        """Decode all frames to RGBA arrays."""
         try:
             self.path = Path(path)
             self.frames = []
@@ -24,12 +98,19 @@ class GifHandler:
             # Use PIL for better duration handling
             pil_img = Image.open(path)
             self.original_size = pil_img.size
+            if self.storage == "stack":
+                w, h = pil_img.size
+                self.frames = FrameStack((h, w, 4), capacity=getattr(pil_img, "n_frames", 1))
 
             try:
                 while True:
                     # Convert to RGBA for consistent processing
                     frame = pil_img.convert("RGBA")
-                    self.frames.append(np.array(frame))
+                    if isinstance(self.frames, FrameStack):
+                        # Copied straight into the preallocated slot
+                        self.frames.append(np.asarray(frame))
+                    else:
+                        self.frames.append(np.array(frame))
                     # Get duration in ms, default to 100ms
                     duration = pil_img.info.get("duration", 100)
                     self.durations.append(duration)
@@ -42,12 +123,284 @@ class GifHandler:
             print(f"Error loading GIF: {e}")
             return False
 
+    def _load_lazy(self, path: str) -> bool:
+        """Index the GIF without decoding; frames are decoded on access."""
+        try:
+            self.path = Path(path)
+            self.frames = []
+            self.durations = []
+
+            index = index_gif(path)
+            self.original_size = index.size
+            self.durations = index.durations()
+            self.frames = LazyFrameSequence(GifDecoder(index), self.cache_size, self.prefetch)
+            return len(self.frames) > 0
+        except Exception as e:
+            print(f"Error loading GIF: {e}")
+            return False
+
+    def _load_palette(self, path: str) -> bool:
+        """Decode all frames into palette-indexed storage."""
+        try:
+            self.path = Path(path)
+            self.frames = []
+            self.durations = []
+
+            index = index_gif(path)
+            self.original_size = index.size
+            self.durations = index.durations()
+
+            frames = PaletteFrameStore()
+            for _, entry in decode_palette_frames(index, self.decode_workers):
+                frames.append_entry(entry)
+
+            self.frames = frames
+            return len(self.frames) > 0
+        except Exception as e:
+            print(f"Error loading GIF: {e}")
+            return False
+
+    def _load_parallel(self, path: str) -> bool:
+        """Decode all frames to RGBA, decompressing rasters on a worker pool."""
+        try:
+            self.path = Path(path)
+            self.frames = []
+            self.durations = []
+
+            index = index_gif(path)
+            self.original_size = index.size
+            self.durations = index.durations()
+
+            if self.storage == "stack":
+                w, h = index.size
+                frames = FrameStack((h, w, 4), capacity=len(index.frames))
+                for frame in decode_frames(index, self.decode_workers):
+                    frames.append(frame)
+            else:
+                frames = [frame.copy() for frame in decode_frames(index, self.decode_workers)]
+
+            self.frames = frames
+            return len(self.frames) > 0
+        except Exception as e:
+            print(f"Error loading GIF: {e}")
+            return False
+
+    def iter_load(self, path: str) -> Iterator[Tuple[Optional[np.ndarray], Any, int]]:
+        """Load a file progressively, for use on a worker thread.
+
+        First resets the handler to the frame container its mode selects:
+        an empty one, or for lazy and decode-cache loads a complete one.
+        Then yields (frame, entry, duration) per frame, where ``frame`` is
+        only valid until the next item. Entries that aren't None must be
+        passed to ``add_loaded`` in order; the handler is not modified
+        after the first item, so it can be shared once that arrives.
+        Lazy loads without a decode cache decode nothing up front, and
+        yield None frames.
+        """
+        self.close()
+        self.path = Path(path)
+        self.durations = []
+        self.frame_ids = []
+
+        if self.decode_cache is not None and self._load_cached(path):
+            self.frame_ids = [next(_frame_ids) for _ in range(len(self.frames))]
+            for frame, duration in zip(self.frames, self.durations):
+                yield frame, None, duration
+            return
+
+        if self.lazy and is_gif_file(path):
+            index = index_gif(path)
+            self.original_size = index.size
+            self.durations = index.durations()
+            self.frames = LazyFrameSequence(GifDecoder(index), self.cache_size, self.prefetch)
+            self.frame_ids = [next(_frame_ids) for _ in range(len(self.frames))]
+            if self.decode_cache is None:
+                # Frames (and thumbnails) are decoded on access
+                for duration in self.durations:
+                    yield None, None, duration
+                return
+            # One full pass to fill the decode cache, which also feeds thumbnails
+            for frame, duration in self.iter_timed_frames(path, store_in_cache=True):
+                yield frame, None, duration
+            return
+
+        palette = self.storage == "palette" and is_gif_file(path)
+        count, size, items = self._decode_file(path, palette)
+        self.original_size = size
+        if self.storage == "stack":
+            w, h = size
+            self.frames = FrameStack((h, w, 4), capacity=count)
+        elif palette:
+            self.frames = PaletteFrameStore()
+        else:
+            self.frames = []
+        yield from self._write_cache(path, count, items)
+
+    def add_loaded(self, entry: Any, duration: int):
+        """Append a frame entry yielded by ``iter_load``."""
+        if isinstance(self.frames, PaletteFrameStore):
+            self.frames.append_entry(entry)
+        else:
+            self.frames.append(entry)
+        self.durations.append(duration)
+        self.frame_ids.append(next(_frame_ids))
+
+    def iter_frames(self, path: Optional[str] = None) -> Iterator[np.ndarray]:
+        """Yield RGBA frames one at a time.
+
+        Without a path the loaded frames are yielded. With a path the file
+        is streamed instead of loaded: each frame is decoded, yielded and
+        dropped, so memory stays at a few frames regardless of length.
+        """
+        if path is None:
+            yield from self.frames
+            return
+        for frame, _ in self.iter_timed_frames(path):
+            yield frame
+
+    def iter_timed_frames(self, path: str,
+                          store_in_cache: bool = False) -> Iterator[Tuple[np.ndarray, int]]:
+        """Stream (frame, duration) pairs from a file.
+
+        The handler itself is not modified, so this can run on a worker
+        thread. With ``store_in_cache`` a complete decode is also written
+        to the decode cache as it streams.
+        """
+        if self.decode_cache is not None:
+            cached = self.decode_cache.load(path)
+            if cached is not None:
+                yield from zip(cached[0], cached[1])
+                return
+
+        count, _, items = self._decode_file(path)
+        if store_in_cache:
+            items = self._write_cache(path, count, items)
+        for frame, _, duration in items:
+            yield frame, duration
+
+    def _write_cache(self, path: str, count: int,
+                     items: Iterator[Tuple[np.ndarray, Any, int]]
+                     ) -> Iterator[Tuple[np.ndarray, Any, int]]:
+        """Pass (frame, entry, duration) items through, writing a complete decode to the decode cache."""
+        if self.decode_cache is None:
+            yield from items
+            return
+
+        writer = None
+        durations = []
+        complete = False
+        try:
+            for frame, entry, duration in items:
+                if not durations:
+                    writer = self.decode_cache.writer(path, frame.shape, count)
+                if writer is not None and not writer.write(frame):
+                    writer = None
+                durations.append(duration)
+                yield frame, entry, duration
+            complete = True
+        finally:
+            if writer is not None:
+                if complete:
+                    writer.commit(durations)
+                else:
+                    writer.abort()
+
+    def _decode_file(self, path: str, palette: bool = False
+                     ) -> Tuple[int, Tuple[int, int], Iterator[Tuple[np.ndarray, Any, int]]]:
+        """Open a file for decoding.
+
+        Returns (frame count, (width, height), iterator of (frame, entry,
+        duration)). The entry is a fresh RGBA copy of the frame, or with
+        ``palette`` (GIFs only) a ``PaletteFrameStore`` entry, in which
+        case the frame is only valid until the next item.
+        """
+        if is_gif_file(path):
+            index = index_gif(path)
+            items = self._iter_gif_palette(index) if palette else self._iter_gif(index)
+            return len(index.frames), index.size, items
+        with Image.open(path) as pil_img:
+            count = getattr(pil_img, "n_frames", 1)
+            size = pil_img.size
+        return count, size, self._iter_pillow(path)
+
+    def _iter_gif(self, index) -> Iterator[Tuple[np.ndarray, Any, int]]:
+        for frame, info in zip(decode_frames(index, self.decode_workers), index.frames):
+            frame = frame.copy()
+            yield frame, frame, info.duration
+
+    def _iter_gif_palette(self, index) -> Iterator[Tuple[np.ndarray, Any, int]]:
+        for (frame, entry), info in zip(decode_palette_frames(index, self.decode_workers),
+                                        index.frames):
+            yield frame, entry, info.duration
+
+    def _iter_pillow(self, path: str) -> Iterator[Tuple[np.ndarray, Any, int]]:
+        with Image.open(path) as pil_img:
+            try:
+                while True:
+                    frame = np.array(pil_img.convert("RGBA"))
+                    yield frame, frame, pil_img.info.get("duration", 100)
+                    pil_img.seek(pil_img.tell() + 1)
+            except EOFError:
+                pass
+
+    def iter_frame_pairs(self, gt_path: str,
+                         pred_path: str) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Stream (gt, pred) frame pairs from two files, up to the shorter one."""
+        return zip(self.iter_frames(gt_path), self.iter_frames(pred_path))
+
+    def close(self):
+        """Release decoder resources held by lazily loaded frames."""
+        if isinstance(self.frames, LazyFrameSequence):
+            self.frames.close()
+        self.frames = []
+
     def get_frame(self, index: int) -> Optional[np.ndarray]:
         """Get a specific frame by index."""
         if 0 <= index < len(self.frames):
             return self.frames[index]
         return None
 
+    def get_frame_id(self, index: int) -> Optional[int]:
+        """Get the unique id of a frame; edits never reuse ids."""
+        if 0 <= index < len(self.frame_ids):
+            return self.frame_ids[index]
+        return None
+
+    def get_resized_frame(self, index: int, size: Tuple[int, int]) -> Optional[np.ndarray]:
+        """Get a frame resized to ``size`` = (width, height), cached per frame."""
+        frame = self.get_frame(index)
+        if frame is None:
+            return None
+        return self.resize_cache.get(self.frame_ids[index], frame, size)
+
+    def resized_frames(self, size: Tuple[int, int]) -> "ResizedFrames":
+        """All frames as a sequence resized to ``size`` on access."""
+        return ResizedFrames(self, size)
+
+    def set_resize_filter(self, method: str):
+        """Set the resampling filter used by ``get_resized_frame``."""
+        self.resize_cache.set_method(method)
+
+    def pre_resize(self, size: Tuple[int, int],
+                   should_stop: Optional[Callable[[], bool]] = None) -> int:
+        """Resize frames into the resize cache ahead of use.
+
+        Stops early when ``should_stop`` returns True or the cache is
+        full, so frames resized first are never evicted by later ones.
+        Returns the number of frames now cached.
+        """
+        w, h = size
+        frame_bytes = w * h * 4
+        count = 0
+        for index in range(self.get_frame_count()):
+            if should_stop is not None and should_stop():
+                break
+            if not self.resize_cache.has_room(frame_bytes):
+                break
+            self.get_resized_frame(index, size)
+            count += 1
+        return count
+
     def get_frame_count(self) -> int:
         """Return total number of frames."""
         return len(self.frames)
@@ -69,14 +422,20 @@ class GifHandler:
         if 0 <= index < len(self.frames) and len(self.frames) > 1:
             del self.frames[index]
             del self.durations[index]
+            del self.frame_ids[index]
             return True
         return False
 
     def insert_frame(self, index: int, frame: np.ndarray, duration: int = 100) -> bool:
         """Insert a frame at the given index."""
         if 0 <= index <= len(self.frames):
-            self.frames.insert(index, frame)
+            try:
+                self.frames.insert(index, frame)
+            except ValueError as e:
+                print(f"Error inserting frame: {e}")
+                return False
             self.durations.insert(index, duration)
+            self.frame_ids.insert(index, next(_frame_ids))
             return True
         return False
 
@@ -84,6 +443,7 @@ class GifHandler:
         """Append a frame to the end."""
         self.frames.append(frame)
         self.durations.append(duration)
+        self.frame_ids.append(next(_frame_ids))
 
     def save(self, path: str, frames: Optional[List[np.ndarray]] = None,
              durations: Optional[List[int]] = None) -> bool:
@@ -122,24 +482,60 @@ class GifHandler:
             return (self.frames[0].shape[1], self.frames[0].shape[0])
         return self.original_size
 
+    def get_stack(self, allow_copy: bool = True) -> Optional[np.ndarray]:
+        """Return all frames as one (T, H, W, 4) array for batched processing.
+
+        With ``allow_copy=False`` only a zero-copy view is returned, which
+        exists for ``FrameStack`` storage with frames in order (including
+        decode cache hits); otherwise None.
+        """
+        if isinstance(self.frames, FrameStack):
+            return self.frames.as_array(allow_copy)
+        if not allow_copy:
+            return None
+        if not self.frames:
+            w, h = self.original_size
+            return np.empty((0, h, w, 4), dtype=np.uint8)
+        return np.stack(list(self.frames))
+
     def resize_frames(self, target_size: Tuple[int, int]) -> List[np.ndarray]:
         """Resize all frames to target size."""
-        resized = []
-        for frame in self.frames:
-            img = Image.fromarray(frame)
-            img = img.resize(target_size, Image.Resampling.LANCZOS)
-            resized.append(np.array(img))
-        return resized
+        return [self.get_resized_frame(i, target_size) for i in range(self.get_frame_count())]
 
     def get_thumbnail(self, index: int, size: Tuple[int, int] = (64, 64)) -> Optional[np.ndarray]:
         """Get a thumbnail of a specific frame."""
         frame = self.get_frame(index)
         if frame is not None:
-            img = Image.fromarray(frame)
-            img.thumbnail(size, Image.Resampling.LANCZOS)
-            # Paste onto a fixed-size background
-            thumb = Image.new("RGBA", size, (40, 40, 40, 255))
-            offset = ((size[0] - img.width) // 2, (size[1] - img.height) // 2)
-            thumb.paste(img, offset)
-            return np.array(thumb)
+            return make_thumbnail(frame, size)
         return None
+
+
+class ResizedFrames(Sequence):
+    """Read-only view of a handler's frames at another size, via its resize cache."""
+
+    def __init__(self, handler: GifHandler, size: Tuple[int, int]):
+        self._handler = handler
+        self.size = tuple(size)
+
+    def __len__(self) -> int:
+        return self._handler.get_frame_count()
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self._handler.get_resized_frame(index, self.size)
+
+
+def make_thumbnail(frame: np.ndarray, size: Tuple[int, int] = (64, 64)) -> np.ndarray:
+    """Scale a frame to fit a fixed-size thumbnail."""
+    img = Image.fromarray(frame)
+    img.thumbnail(size, Image.Resampling.LANCZOS)
+    # Paste onto a fixed-size background
+    thumb = Image.new("RGBA", size, (40, 40, 40, 255))
+    offset = ((size[0] - img.width) // 2, (size[1] - img.height) // 2)
+    thumb.paste(img, offset)
+    return np.array(thumb)
@@ -1,41 +1,215 @@
+import multiprocessing
+import os
+import threading
 import numpy as np
 import warnings
-from typing import Dict, List, Optional, Tuple
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
 from dataclasses import dataclass
-from skimage.metrics import structural_similarity as ssim
-from skimage.metrics import peak_signal_noise_ratio as psnr
+from functools import cached_property
+
+from src.ssim_map import SSIMMapKernel
+
+
+METRIC_NAMES = ("psnr", "ssim", "ms_ssim", "lpips", "mse", "mae")
+# Metrics that import torch (and, for LPIPS, load a network)
+TORCH_METRICS = frozenset({"ms_ssim", "lpips"})
+
+
+def metric_set(metrics: Optional[Iterable[str]] = None) -> FrozenSet[str]:
+    """Validate a metric selection; None selects every metric."""
+    if metrics is None:
+        return frozenset(METRIC_NAMES)
+    selected = frozenset(metrics)
+    unknown = selected.difference(METRIC_NAMES)
+    if unknown:
+        raise ValueError(f"Unknown metrics: {', '.join(sorted(unknown))}")
+    return selected
 
 
 @dataclass
 class FrameMetrics:
-    """Metrics for a single frame."""
+    """Metrics for a single frame; metrics that weren't selected are None."""
     frame_index: int
-    psnr: float
-    ssim: float
-    ms_ssim: float
-    lpips: float
-    mse: float
-    mae: float
+    psnr: Optional[float]
+    ssim: Optional[float]
+    ms_ssim: Optional[float]
+    lpips: Optional[float]
+    mse: Optional[float]
+    mae: Optional[float]
+    # True when the frame is too small for MS-SSIM and ms_ssim holds SSIM
+    ms_ssim_fallback: bool = False
+
+
+# Rough bytes of AlexNet LPIPS working memory per input pixel of a frame
+# pair (both inputs, layer activations, normalized features and diffs)
+LPIPS_BYTES_PER_PIXEL = 160
+LPIPS_MAX_BATCH = 32
+
+# MS-SSIM needs the smaller side above (window - 1) * 2^4 for its five scales
+MS_SSIM_MIN_SIZE = 161
+# Rough bytes of MS-SSIM working memory per input pixel of a frame pair
+MS_SSIM_BYTES_PER_PIXEL = 120
+MS_SSIM_MAX_BATCH = 32
+
+# Frame pairs per task when metrics run on a worker pool; with LPIPS or
+# MS-SSIM selected a task holds one of their batches instead
+PARALLEL_CHUNK = 4
+
+
+def available_memory(device=None) -> Optional[int]:
+    """Free bytes on a torch device (or in system RAM for CPU), None if unknown."""
+    if device is not None and getattr(device, "type", None) == "cuda":
+        try:
+            import torch
+            free, _ = torch.cuda.mem_get_info(device)
+            return int(free)
+        except Exception:
+            return None
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
 
 
 @dataclass
 class SequenceMetrics:
-    """Aggregated metrics for entire sequence."""
-    psnr: float
-    ssim: float
-    ms_ssim: float
-    lpips: float
-    mse: float
-    mae: float
+    """Aggregated metrics for entire sequence; metrics that weren't selected are None."""
+    psnr: Optional[float]
+    ssim: Optional[float]
+    ms_ssim: Optional[float]
+    lpips: Optional[float]
+    mse: Optional[float]
+    mae: Optional[float]
     frame_count: int
+    # Frames whose ms_ssim is single-scale SSIM; excluded from the MS-SSIM average
+    ms_ssim_fallback_frames: int = 0
+
+
+def to_grayscale(img: np.ndarray) -> np.ndarray:
+    """Convert image to grayscale."""
+    if img.ndim == 2:
+        return img
+    if img.shape[-1] == 4:
+        img = img[:, :, :3]
+    return (0.299 * img[:, :, 0] + 0.587 * img[:, :, 1] + 0.114 * img[:, :, 2]).astype(np.uint8)
+
+
+def to_rgb(img: np.ndarray) -> np.ndarray:
+    """Ensure image is RGB."""
+    if img.ndim == 2:
+        return np.stack([img, img, img], axis=-1)
+    if img.shape[-1] == 4:
+        return img[:, :, :3]
+    return img
+
+
+class FramePair:
+    """A ground truth / prediction pair with the conversions metrics share.
+
+    Each view is computed on first use and kept, so running every metric
+    on the pair converts each frame once.
+    """
+
+    def __init__(self, gt: np.ndarray, pred: np.ndarray):
+        self.gt = gt
+        self.pred = pred
+
+    @cached_property
+    def gt_rgb(self) -> np.ndarray:
+        return to_rgb(self.gt)
+
+    @cached_property
+    def pred_rgb(self) -> np.ndarray:
+        return to_rgb(self.pred)
+
+    @cached_property
+    def gray_planes(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Grayscale of both frames as (1, H, W) float32 planes."""
+        return (to_grayscale(self.gt)[None].astype(np.float32),
+                to_grayscale(self.pred)[None].astype(np.float32))
+
+    @cached_property
+    def errors(self) -> Tuple[float, float]:
+        """(MSE, MAE) over the RGB channels on a [0, 1] scale, from one difference pass."""
+        gt, pred = self.gt, self.pred
+        if gt.shape != pred.shape:
+            # e.g. RGBA against RGB: compare the RGB views
+            gt, pred = self.gt_rgb, self.pred_rgb
+            if gt.shape != pred.shape:
+                raise ValueError(f"Frame shapes differ: {gt.shape} vs {pred.shape}")
+        # Subtracting whole contiguous frames beats strided RGB views;
+        # alpha is zeroed instead of sliced off
+        diff = np.subtract(gt, pred, dtype=np.float32)
+        count = diff.size
+        if diff.ndim == 3 and diff.shape[-1] == 4:
+            diff[..., 3] = 0
+            count = count // 4 * 3
+        flat = diff.ravel()
+        squared = float(np.dot(flat, flat))
+        absolute = float(np.abs(flat, out=flat).sum(dtype=np.float64))
+        return squared / count / 255.0 ** 2, absolute / count / 255.0
+
+    @property
+    def mse(self) -> float:
+        return self.errors[0]
+
+    @property
+    def mae(self) -> float:
+        return self.errors[1]
+
+    @property
+    def psnr(self) -> float:
+        """PSNR derived from the MSE; infinite for identical frames."""
+        mse = self.mse
+        return float("inf") if mse == 0 else float(10 * np.log10(1.0 / mse))
 
 
 class MetricsCalculator:
-    """Calculate image quality metrics between ground truth and predicted frames."""
+    """Calculate image quality metrics between ground truth and predicted frames.
+
+    With ``workers`` > 1 sequence metrics are computed on a pool of
+    threads, or of processes with ``processes``. The pool is created on
+    first use and kept until ``shutdown``; each worker has its own
+    calculator, so the LPIPS model is loaded once per worker.
+    """
 
-    def __init__(self):
+    def __init__(self, workers: int = 0, processes: bool = False):
         self._lpips_model = None
         self._device = None
+        self._ms_ssim_module = None
+        self._ssim_kernel = SSIMMapKernel(cache_size=0)
+        self.workers = workers
+        self.processes = processes
+        self._executor: Optional[Executor] = None
+
+    def set_workers(self, workers: int, processes: Optional[bool] = None):
+        """Change the pool size or kind; the current pool is shut down if it changes."""
+        if processes is None:
+            processes = self.processes
+        if workers != self.workers or processes != self.processes:
+            self.shutdown()
+            self.workers = workers
+            self.processes = processes
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.processes:
+                # Spawned, as forking a process running Qt or torch threads isn't safe
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                    initializer=_init_worker)
+        return self._executor
+
+    def shutdown(self):
+        """Stop the worker pool, if one was started."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
 
     def _get_lpips_model(self):
         """Lazy load LPIPS model."""
@@ -56,144 +230,377 @@ class MetricsCalculator:
         return self._lpips_model
 
     def _to_grayscale(self, img: np.ndarray) -> np.ndarray:
-        """Convert image to grayscale."""
-        if img.ndim == 2:
-            return img
-        if img.shape[-1] == 4:
-            img = img[:, :, :3]
-        return (0.299 * img[:, :, 0] + 0.587 * img[:, :, 1] + 0.114 * img[:, :, 2]).astype(np.uint8)
+        return to_grayscale(img)
 
     def _to_rgb(self, img: np.ndarray) -> np.ndarray:
-        """Ensure image is RGB."""
-        if img.ndim == 2:
-            return np.stack([img, img, img], axis=-1)
-        if img.shape[-1] == 4:
-            return img[:, :, :3]
-        return img
+        return to_rgb(img)
 
     def calculate_psnr(self, gt: np.ndarray, pred: np.ndarray) -> float:
         """Calculate Peak Signal-to-Noise Ratio."""
+        return self._pair_psnr(FramePair(gt, pred))
+
+    def calculate_ssim(self, gt: np.ndarray, pred: np.ndarray) -> float:
+        """Calculate Structural Similarity Index."""
+        return self._pair_ssim(FramePair(gt, pred))
+
+    def _pair_psnr(self, pair: FramePair) -> float:
         try:
-            gt_rgb = self._to_rgb(gt)
-            pred_rgb = self._to_rgb(pred)
-            return float(psnr(gt_rgb, pred_rgb, data_range=255))
+            return pair.psnr
         except Exception:
             return 0.0
 
-    def calculate_ssim(self, gt: np.ndarray, pred: np.ndarray) -> float:
-        """Calculate Structural Similarity Index."""
+    def _pair_ssim(self, pair: FramePair) -> float:
+        # Same value as skimage's structural_similarity on the grayscale frames
+        try:
+            gt_planes, pred_planes = pair.gray_planes
+            if gt_planes.shape != pred_planes.shape:
+                raise ValueError("Input images must have the same dimensions.")
+            return self._ssim_kernel.mean_ssim(gt_planes, pred_planes)
+        except Exception:
+            return 0.0
+
+    def _pair_mse(self, pair: FramePair) -> float:
+        try:
+            return pair.mse
+        except Exception:
+            return 0.0
+
+    def _pair_mae(self, pair: FramePair) -> float:
         try:
-            gt_gray = self._to_grayscale(gt)
-            pred_gray = self._to_grayscale(pred)
-            return float(ssim(gt_gray, pred_gray, data_range=255))
+            return pair.mae
         except Exception:
             return 0.0
 
     def calculate_ms_ssim(self, gt: np.ndarray, pred: np.ndarray) -> float:
-        """Calculate Multi-Scale Structural Similarity Index."""
+        """Calculate Multi-Scale Structural Similarity Index.
+
+        Frames too small for MS-SSIM get single-scale SSIM; use
+        ``calculate_ms_ssim_batch`` to find out when that happened.
+        """
+        values, _ = self.calculate_ms_ssim_batch([gt], [pred])
+        return values[0]
+
+    def _get_ms_ssim_module(self):
+        """Lazy load the MS-SSIM module; its Gaussian window is built once and reused."""
+        if self._ms_ssim_module is None:
+            from pytorch_msssim import MS_SSIM
+            self._ms_ssim_module = MS_SSIM(data_range=1.0, size_average=False, channel=3)
+        return self._ms_ssim_module
+
+    def ms_ssim_batch_size(self, height: int, width: int) -> int:
+        """Frame pairs per MS-SSIM call that fit in a quarter of free memory."""
+        free = available_memory()
+        if free is None:
+            return 8
+        per_pair = max(1, height * width * MS_SSIM_BYTES_PER_PIXEL)
+        return int(max(1, min(MS_SSIM_MAX_BATCH, free // 4 // per_pair)))
+
+    def calculate_ms_ssim_batch(self, gt_frames: Sequence[np.ndarray],
+                                pred_frames: Sequence[np.ndarray],
+                                batch_size: Optional[int] = None,
+                                ssim_values: Optional[Sequence[float]] = None
+                                ) -> Tuple[List[float], List[bool]]:
+        """Calculate MS-SSIM for frame pairs, evaluating chunks in one call.
+
+        Returns the values and, per pair, whether it fell back to
+        single-scale SSIM because the frame is too small for MS-SSIM
+        (or MS-SSIM is unavailable). Fallbacks reuse ``ssim_values``
+        when the caller already has them.
+        """
+        count = min(len(gt_frames), len(pred_frames))
+        values = [0.0] * count
+        fallback = [True] * count
+
+        # Same-size pairs large enough for all five scales go in batches
+        eligible = [i for i in range(count)
+                    if gt_frames[i].shape[:2] == pred_frames[i].shape[:2]
+                    and min(gt_frames[i].shape[:2]) >= MS_SSIM_MIN_SIZE]
+        groups: Dict[Tuple[int, int], List[int]] = {}
+        for i in eligible:
+            groups.setdefault(gt_frames[i].shape[:2], []).append(i)
         try:
             import torch
-            from pytorch_msssim import ms_ssim
 
-            gt_rgb = self._to_rgb(gt).astype(np.float32) / 255.0
-            pred_rgb = self._to_rgb(pred).astype(np.float32) / 255.0
+            module = self._get_ms_ssim_module()
+            for shape, indices in groups.items():
+                size = batch_size or self.ms_ssim_batch_size(*shape)
+                for start in range(0, len(indices), size):
+                    chunk = indices[start:start + size]
+                    gt_t = self._ms_ssim_tensor([gt_frames[i] for i in chunk])
+                    pred_t = self._ms_ssim_tensor([pred_frames[i] for i in chunk])
+                    with torch.no_grad():
+                        scores = module(gt_t, pred_t)
+                    for i, score in zip(chunk, scores.flatten().tolist()):
+                        values[i] = float(score)
+                        fallback[i] = False
+        except Exception:
+            pass
 
-            # Convert to torch tensors (B, C, H, W)
-            gt_t = torch.from_numpy(gt_rgb).permute(2, 0, 1).unsqueeze(0)
-            pred_t = torch.from_numpy(pred_rgb).permute(2, 0, 1).unsqueeze(0)
+        for i in range(count):
+            if fallback[i]:
+                values[i] = (ssim_values[i] if ssim_values is not None
+                             else self.calculate_ssim(gt_frames[i], pred_frames[i]))
+        return values, fallback
 
-            # MS-SSIM requires minimum size
-            min_dim = min(gt_t.shape[2], gt_t.shape[3])
-            if min_dim < 160:
-                # Fall back to regular SSIM for small images
-                return self.calculate_ssim(gt, pred)
+    def _ms_ssim_tensor(self, frames: Sequence[np.ndarray]):
+        """Stack frames into one (N, 3, H, W) float tensor in [0, 1]."""
+        import torch
 
-            return float(ms_ssim(gt_t, pred_t, data_range=1.0))
-        except Exception:
-            return self.calculate_ssim(gt, pred)
+        rgb = np.stack([to_rgb(frame) for frame in frames])
+        return torch.from_numpy(rgb).permute(0, 3, 1, 2).float().div_(255.0)
 
     def calculate_lpips(self, gt: np.ndarray, pred: np.ndarray) -> float:
         """Calculate Learned Perceptual Image Patch Similarity."""
+        return self.calculate_lpips_batch([gt], [pred])[0]
+
+    def lpips_batch_size(self, height: int, width: int) -> int:
+        """Frame pairs per LPIPS forward pass that fit in a quarter of free memory."""
+        free = available_memory(self._device)
+        if free is None:
+            return 8
+        per_pair = max(1, height * width * LPIPS_BYTES_PER_PIXEL)
+        return int(max(1, min(LPIPS_MAX_BATCH, free // 4 // per_pair)))
+
+    def _lpips_tensor(self, frames: Sequence[np.ndarray]):
+        """Stack frames into one (N, 3, H, W) float tensor in [-1, 1] on the model's device."""
+        import torch
+
+        rgb = np.stack([to_rgb(frame) for frame in frames])
+        # Scaled on the device, after the uint8 copy
+        tensor = torch.from_numpy(rgb).to(self._device).permute(0, 3, 1, 2).float()
+        return tensor.mul_(2 / 255.0).sub_(1)
+
+    def calculate_lpips_batch(self, gt_frames: Sequence[np.ndarray],
+                              pred_frames: Sequence[np.ndarray],
+                              batch_size: Optional[int] = None) -> List[float]:
+        """Calculate LPIPS for frame pairs with batched forward passes.
+
+        Same-size pairs are stacked into (N, 3, H, W) tensors of up to
+        ``batch_size`` pairs, by default chosen from free memory. A batch
+        that runs out of memory is retried at half the size.
+        """
+        count = min(len(gt_frames), len(pred_frames))
+        results = [0.0] * count
+        if count == 0:
+            return results
         try:
             import torch
 
             model = self._get_lpips_model()
             if model is None:
-                return 0.0
-
-            gt_rgb = self._to_rgb(gt).astype(np.float32) / 255.0
-            pred_rgb = self._to_rgb(pred).astype(np.float32) / 255.0
-
-            # Normalize to [-1, 1]
-            gt_rgb = gt_rgb * 2 - 1
-            pred_rgb = pred_rgb * 2 - 1
-
-            # Convert to torch tensors (B, C, H, W)
-            gt_t = torch.from_numpy(gt_rgb).permute(2, 0, 1).unsqueeze(0).float().to(self._device)
-            pred_t = torch.from_numpy(pred_rgb).permute(2, 0, 1).unsqueeze(0).float().to(self._device)
-
-            with torch.no_grad():
-                result = model(gt_t, pred_t)
-            return float(result.item())
+                return results
+
+            shape = gt_frames[0].shape[:2]
+            if any(gt.shape[:2] != shape or pred.shape[:2] != shape
+                   for gt, pred in zip(gt_frames, pred_frames)):
+                # Mixed sizes can't share a tensor
+                if count == 1:
+                    return results
+                return [self.calculate_lpips_batch([gt], [pred])[0]
+                        for gt, pred in zip(gt_frames, pred_frames)]
+
+            if batch_size is None:
+                batch_size = self.lpips_batch_size(*shape)
+            start = 0
+            while start < count:
+                stop = min(start + batch_size, count)
+                try:
+                    with torch.no_grad():
+                        distances = model(self._lpips_tensor(gt_frames[start:stop]),
+                                          self._lpips_tensor(pred_frames[start:stop]))
+                except RuntimeError as e:
+                    if batch_size == 1 or "out of memory" not in str(e).lower():
+                        raise
+                    if self._device.type == "cuda":
+                        torch.cuda.empty_cache()
+                    batch_size = max(1, batch_size // 2)
+                    continue
+                results[start:stop] = [float(d) for d in distances.flatten().tolist()]
+                start = stop
         except Exception:
-            return 0.0
+            pass
+        return results
 
     def calculate_mse(self, gt: np.ndarray, pred: np.ndarray) -> float:
         """Calculate Mean Squared Error."""
-        try:
-            gt_rgb = self._to_rgb(gt).astype(np.float32) / 255.0
-            pred_rgb = self._to_rgb(pred).astype(np.float32) / 255.0
-            return float(np.mean((gt_rgb - pred_rgb) ** 2))
-        except Exception:
-            return 0.0
+        return self._pair_mse(FramePair(gt, pred))
 
     def calculate_mae(self, gt: np.ndarray, pred: np.ndarray) -> float:
         """Calculate Mean Absolute Error."""
-        try:
-            gt_rgb = self._to_rgb(gt).astype(np.float32) / 255.0
-            pred_rgb = self._to_rgb(pred).astype(np.float32) / 255.0
-            return float(np.mean(np.abs(gt_rgb - pred_rgb)))
-        except Exception:
-            return 0.0
+        return self._pair_mae(FramePair(gt, pred))
 
-    def calculate_frame_metrics(self, gt: np.ndarray, pred: np.ndarray,
-                                 frame_index: int) -> FrameMetrics:
-        """Calculate all metrics for a single frame pair."""
+    def _pair_metrics(self, pair: FramePair, frame_index: int,
+                      selected: FrozenSet[str]) -> FrameMetrics:
+        """Selected non-neural metrics of a pair; LPIPS and MS-SSIM are filled in by the caller."""
         return FrameMetrics(
             frame_index=frame_index,
-            psnr=self.calculate_psnr(gt, pred),
-            ssim=self.calculate_ssim(gt, pred),
-            ms_ssim=self.calculate_ms_ssim(gt, pred),
-            lpips=self.calculate_lpips(gt, pred),
-            mse=self.calculate_mse(gt, pred),
-            mae=self.calculate_mae(gt, pred)
+            psnr=self._pair_psnr(pair) if "psnr" in selected else None,
+            ssim=self._pair_ssim(pair) if "ssim" in selected else None,
+            ms_ssim=None,
+            lpips=None,
+            mse=self._pair_mse(pair) if "mse" in selected else None,
+            mae=self._pair_mae(pair) if "mae" in selected else None
         )
 
-    def calculate_sequence_metrics(self, gt_frames: List[np.ndarray],
-                                    pred_frames: List[np.ndarray]) -> Tuple[SequenceMetrics, List[FrameMetrics]]:
-        """Calculate metrics for entire sequence."""
+    def calculate_frame_metrics(self, gt: np.ndarray, pred: np.ndarray, frame_index: int,
+                                metrics: Optional[Iterable[str]] = None) -> FrameMetrics:
+        """Calculate the selected metrics (default: all) for a single frame pair."""
+        selected = metric_set(metrics)
+        pair = FramePair(gt, pred)
+        result = self._pair_metrics(pair, frame_index, selected)
+        if "ms_ssim" in selected:
+            ssim_values = [result.ssim] if result.ssim is not None else None
+            ms_ssim_values, ms_ssim_fallback = self.calculate_ms_ssim_batch(
+                [pair.gt_rgb], [pair.pred_rgb], ssim_values=ssim_values)
+            result.ms_ssim = ms_ssim_values[0]
+            result.ms_ssim_fallback = ms_ssim_fallback[0]
+        if "lpips" in selected:
+            result.lpips = self.calculate_lpips(pair.gt_rgb, pair.pred_rgb)
+        return result
+
+    def calculate_sequence_metrics(self, gt_frames: Iterable[np.ndarray],
+                                   pred_frames: Iterable[np.ndarray],
+                                   metrics: Optional[Iterable[str]] = None
+                                   ) -> Tuple[SequenceMetrics, List[FrameMetrics]]:
+        """Calculate the selected metrics (default: all) for entire sequence."""
+        return self.calculate_stream_metrics(zip(gt_frames, pred_frames), metrics)
+
+    def calculate_stream_metrics(self, pairs: Iterable[Tuple[np.ndarray, np.ndarray]],
+                                 metrics: Optional[Iterable[str]] = None
+                                 ) -> Tuple[SequenceMetrics, List[FrameMetrics]]:
+        """Calculate metrics from (gt, pred) frame pairs, consumed one at a time.
+
+        Only the pairs of the current batch are kept, so streamed pairs
+        (see GifHandler.iter_frame_pairs) are freed once their batch is
+        computed. LPIPS and MS-SSIM run once per batch of pairs, and
+        every metric works from one FramePair per frame. Metrics left
+        out of ``metrics`` are not computed, and without LPIPS or
+        MS-SSIM torch is never imported. With a worker pool, chunks of
+        pairs are computed in parallel and results keep frame order.
+        """
+        selected = metric_set(metrics)
+        if self.workers > 1:
+            frame_metrics = self._parallel_frame_metrics(pairs, selected)
+        else:
+            frame_metrics = self._serial_frame_metrics(pairs, selected)
+        return self._sequence_metrics(frame_metrics, selected), frame_metrics
+
+    def _parallel_frame_metrics(self, pairs: Iterable[Tuple[np.ndarray, np.ndarray]],
+                                selected: FrozenSet[str]) -> List[FrameMetrics]:
+        """Fan chunks of pairs out to the worker pool, collecting results in order."""
+        executor = self._get_executor()
+        neural = selected & TORCH_METRICS
+        frame_metrics: List[FrameMetrics] = []
+        # Bound the chunks in flight to keep memory flat on long streams
+        window = self.workers * 2
+        pending = deque()
+        chunk: List[Tuple[np.ndarray, np.ndarray]] = []
+        chunk_size = None
+        start = 0
+        for pair in pairs:
+            if chunk_size is None:
+                chunk_size = (self._neural_batch_size(*pair[0].shape[:2], neural)
+                              if neural else PARALLEL_CHUNK)
+            chunk.append(pair)
+            if len(chunk) < chunk_size:
+                continue
+            pending.append(executor.submit(_chunk_metrics, chunk, start, selected))
+            start += len(chunk)
+            chunk = []
+            if len(pending) >= window:
+                frame_metrics.extend(pending.popleft().result())
+        if chunk:
+            pending.append(executor.submit(_chunk_metrics, chunk, start, selected))
+        while pending:
+            frame_metrics.extend(pending.popleft().result())
+        return frame_metrics
+
+    def _serial_frame_metrics(self, pairs: Iterable[Tuple[np.ndarray, np.ndarray]],
+                              selected: FrozenSet[str]) -> List[FrameMetrics]:
+        neural = selected & TORCH_METRICS
         frame_metrics = []
-        min_frames = min(len(gt_frames), len(pred_frames))
-
-        for i in range(min_frames):
-            metrics = self.calculate_frame_metrics(gt_frames[i], pred_frames[i], i)
-            frame_metrics.append(metrics)
-
+        pending: List[Tuple[FrameMetrics, FramePair]] = []
+        batch_size = None
+
+        def flush():
+            gts = [p[1].gt_rgb for p in pending]
+            preds = [p[1].pred_rgb for p in pending]
+            if "lpips" in selected:
+                lpips_values = self.calculate_lpips_batch(gts, preds, batch_size)
+                for (result, _), value in zip(pending, lpips_values):
+                    result.lpips = value
+            if "ms_ssim" in selected:
+                ssim_values = [p[0].ssim for p in pending] if "ssim" in selected else None
+                ms_ssim_values, ms_ssim_fallback = self.calculate_ms_ssim_batch(
+                    gts, preds, batch_size, ssim_values=ssim_values)
+                for (result, _), value, fallback in zip(pending, ms_ssim_values, ms_ssim_fallback):
+                    result.ms_ssim = value
+                    result.ms_ssim_fallback = fallback
+            pending.clear()
+
+        for i, (gt, pred) in enumerate(pairs):
+            pair = FramePair(gt, pred)
+            result = self._pair_metrics(pair, i, selected)
+            frame_metrics.append(result)
+            if not neural:
+                continue
+            if batch_size is None:
+                batch_size = self._neural_batch_size(*gt.shape[:2], neural)
+            pending.append((result, pair))
+            if len(pending) >= batch_size:
+                flush()
+        if pending:
+            flush()
+        return frame_metrics
+
+    def _neural_batch_size(self, height: int, width: int, neural: FrozenSet[str]) -> int:
+        """Frame pairs per batch that suits every selected LPIPS/MS-SSIM metric."""
+        sizes = []
+        if "lpips" in neural:
+            sizes.append(self.lpips_batch_size(height, width))
+        if "ms_ssim" in neural:
+            sizes.append(self.ms_ssim_batch_size(height, width))
+        return min(sizes)
+
+    def _sequence_metrics(self, frame_metrics: List[FrameMetrics],
+                          selected: FrozenSet[str]) -> SequenceMetrics:
         if not frame_metrics:
-            return SequenceMetrics(0, 0, 0, 0, 0, 0, 0), []
-
-        # Average metrics
-        seq_metrics = SequenceMetrics(
-            psnr=np.mean([m.psnr for m in frame_metrics]),
-            ssim=np.mean([m.ssim for m in frame_metrics]),
-            ms_ssim=np.mean([m.ms_ssim for m in frame_metrics]),
-            lpips=np.mean([m.lpips for m in frame_metrics]),
-            mse=np.mean([m.mse for m in frame_metrics]),
-            mae=np.mean([m.mae for m in frame_metrics]),
-            frame_count=min_frames
+            return SequenceMetrics(0, 0, 0, 0, 0, 0, 0)
+
+        def mean(name: str, frames: List[FrameMetrics]) -> Optional[float]:
+            if name not in selected:
+                return None
+            return np.mean([getattr(m, name) for m in frames])
+
+        # Average metrics; MS-SSIM only over frames that have it, unless none do
+        ms_ssim_frames = [m for m in frame_metrics if not m.ms_ssim_fallback] or frame_metrics
+        return SequenceMetrics(
+            psnr=mean("psnr", frame_metrics),
+            ssim=mean("ssim", frame_metrics),
+            ms_ssim=mean("ms_ssim", ms_ssim_frames),
+            lpips=mean("lpips", frame_metrics),
+            mse=mean("mse", frame_metrics),
+            mae=mean("mae", frame_metrics),
+            frame_count=len(frame_metrics),
+            ms_ssim_fallback_frames=sum(m.ms_ssim_fallback for m in frame_metrics)
         )
 
-        return seq_metrics, frame_metrics
+
+# Calculator of the current pool worker (thread or process), set up by _init_worker
+_worker_state = threading.local()
+
+
+def _init_worker():
+    _worker_state.calculator = MetricsCalculator()
+
+
+def _chunk_metrics(pairs: List[Tuple[np.ndarray, np.ndarray]], start: int,
+                   selected: FrozenSet[str]) -> List[FrameMetrics]:
+    """Metrics of a chunk of pairs on a pool worker, indexed from ``start``."""
+    frame_metrics = _worker_state.calculator._serial_frame_metrics(pairs, selected)
+    for metrics in frame_metrics:
+        metrics.frame_index += start
+    return frame_metrics
 
 
 def average_sequence_metrics(metrics_list: List[SequenceMetrics]) -> SequenceMetrics:
@@ -201,12 +608,18 @@ def average_sequence_metrics(metrics_list: List[SequenceMetrics]) -> SequenceMet
     if not metrics_list:
         return SequenceMetrics(0, 0, 0, 0, 0, 0, 0)
 
+    def mean(name: str) -> Optional[float]:
+        # Over the sequences that computed the metric
+        values = [getattr(m, name) for m in metrics_list if getattr(m, name) is not None]
+        return np.mean(values) if values else None
+
     return SequenceMetrics(
-        psnr=np.mean([m.psnr for m in metrics_list]),
-        ssim=np.mean([m.ssim for m in metrics_list]),
-        ms_ssim=np.mean([m.ms_ssim for m in metrics_list]),
-        lpips=np.mean([m.lpips for m in metrics_list]),
-        mse=np.mean([m.mse for m in metrics_list]),
-        mae=np.mean([m.mae for m in metrics_list]),
-        frame_count=int(np.mean([m.frame_count for m in metrics_list]))
+        psnr=mean("psnr"),
+        ssim=mean("ssim"),
+        ms_ssim=mean("ms_ssim"),
+        lpips=mean("lpips"),
+        mse=mean("mse"),
+        mae=mean("mae"),
+        frame_count=int(np.mean([m.frame_count for m in metrics_list])),
+        ms_ssim_fallback_frames=sum(m.ms_ssim_fallback_frames for m in metrics_list)
     )
@@ -1,6 +1,14 @@
+import threading
 import numpy as np
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from enum import Enum
-from typing import Tuple, Optional
+from typing import Callable, Dict, Hashable, Iterator, List, Sequence, Tuple, Optional
+
+from src.colormaps import apply_colormap
+from src.resize_cache import DEFAULT_RESIZE_FILTER, resize_frame
+from src.ssim_map import SSIMMapKernel
 
 
 class OverlayMode(Enum):
@@ -14,8 +22,97 @@ class OverlayMode(Enum):
     SIDE_BY_SIDE = "side_by_side"
 
 
+# Colormap used by each heatmap mode unless one is selected
+DEFAULT_COLORMAPS = {
+    OverlayMode.DIFFERENCE: "heat",
+    OverlayMode.SSIM_MAP: "red_green",
+}
+
+# Extra pixels around a region for the SSIM window (at most 11x11)
+SSIM_MARGIN = 8
+
+# Input forms a renderer can ask for: RGBA uint8, 8-bit luma, RGBA float32 in 0-1
+INPUT_KINDS = ("rgba", "gray", "float")
+
+# Checkerboard grid and predicted-tile marker colors, packed as RGBA uint32
+_CHECKER_GRID_COLOR = np.array([80, 80, 80, 255], dtype=np.uint8).view(np.uint32)[0]
+_CHECKER_DOT_COLOR = np.array([255, 80, 255, 255], dtype=np.uint8).view(np.uint32)[0]
+
+
+def clip_region(roi: Tuple[int, int, int, int], width: int,
+                height: int) -> Tuple[int, int, int, int]:
+    """Clip an (x, y, width, height) region to an image of the given size."""
+    x, y, w, h = roi
+    x0, y0 = min(max(x, 0), width), min(max(y, 0), height)
+    x1, y1 = min(max(x + w, x0), width), min(max(y + h, y0), height)
+    return x0, y0, x1 - x0, y1 - y0
+
+
+def _scale_div_255(values: np.ndarray, factor: int, out: np.ndarray, tmp: np.ndarray):
+    """round(values * factor / 255) for uint8 values and factor, in uint16 ``out``.
+
+    Uses t = v * f + 128; (t + (t >> 8)) >> 8, which is exact for 8-bit inputs.
+    """
+    np.multiply(values, factor, out=out, dtype=np.uint16)
+    out += 128
+    np.right_shift(out, 8, out=tmp)
+    out += tmp
+    out >>= 8
+
+
+@dataclass(frozen=True)
+class OverlayRenderer:
+    """How an overlay mode renders a pair of frames.
+
+    ``render(engine, gt, pred, out, gt_key)`` receives both inputs in the
+    ``inputs`` form, as (..., H, W) arrays (plus a channel axis for RGBA
+    and float), and returns the RGBA composite, written into ``out``
+    when it is given. Without ``out`` it may return an input itself.
+    """
+    render: Callable[..., np.ndarray]
+    inputs: str = "rgba"
+    # Output width as a multiple of the input width
+    width_factor: int = 1
+    # Only renders one frame at a time, never a stack
+    framewise: bool = False
+    # Neighbourhood needed around a region for it to match the full render
+    margin: int = 0
+    # Settings of the engine the output depends on, for cache keys
+    settings: Callable[["OverlayEngine"], tuple] = lambda engine: ()
+    # Renders (x, y, w, h) of the output from full frames; overrides the margin
+    render_region: Optional[Callable[..., np.ndarray]] = None
+
+
+_RENDERERS: Dict[Hashable, OverlayRenderer] = {}
+
+
+def register_overlay_mode(mode: Hashable, renderer: OverlayRenderer):
+    """Add or replace the renderer of a mode, e.g. a new string-named mode."""
+    if renderer.inputs not in INPUT_KINDS:
+        raise ValueError(f"Unknown renderer input kind: {renderer.inputs}")
+    _RENDERERS[mode] = renderer
+
+
+def overlay_modes() -> List[Hashable]:
+    """All registered overlay modes."""
+    return list(_RENDERERS)
+
+
+def get_overlay_renderer(mode: Hashable) -> OverlayRenderer:
+    """Return the renderer registered for a mode."""
+    try:
+        return _RENDERERS[mode]
+    except KeyError:
+        raise ValueError(f"Unknown overlay mode: {mode}") from None
+
+
 class OverlayEngine:
-    """Engine for compositing two frames with various overlay modes."""
+    """Engine for compositing two frames with various overlay modes.
+
+    Modes are looked up in the renderer registry. Each input frame is
+    converted to the form its renderer needs at most once: conversions
+    of frames passed with a key are kept for the next few calls.
+    """
 
     def __init__(self):
         self.mode = OverlayMode.SIDE_BY_SIDE
@@ -25,45 +122,262 @@ class OverlayEngine:
         # Colors for dual-color mode (RGB)
         self.gt_color = (0, 255, 0)  # Green for ground truth
         self.pred_color = (255, 0, 255)  # Magenta for predicted
-
-    def set_mode(self, mode: OverlayMode):
-        """Set the overlay mode."""
+        # Weight of the predicted frame in blend mode
+        self.blend_alpha = 0.5
+        # SSIM map options: RGB channels averaged instead of luma, Gaussian window
+        self.ssim_per_channel = False
+        self.ssim_gaussian = False
+        self._ssim_kernel = SSIMMapKernel()
+        # Resampling filter used when the predicted frame is a different size
+        self.resize_filter = DEFAULT_RESIZE_FILTER
+        # Heatmap colormap name; None uses the mode's default
+        self.colormap: Optional[str] = None
+        # Checkerboard masks per (h, w, checker_size, grid_thickness); shared by shallow copies
+        self._checker_layouts: "OrderedDict[tuple, Tuple[np.ndarray, np.ndarray, np.ndarray]]" = OrderedDict()
+        self._checker_layouts_lock = threading.Lock()
+        # Converted inputs per (frame key, kind, shape); shared by shallow copies
+        self._inputs: "OrderedDict[Hashable, np.ndarray]" = OrderedDict()
+        self._inputs_lock = threading.Lock()
+
+    def set_mode(self, mode: Hashable):
+        """Set the overlay mode; any registered mode is accepted."""
+        get_overlay_renderer(mode)
         self.mode = mode
 
+    def set_colormap(self, name: Optional[str]):
+        """Set the heatmap colormap, or None for each mode's default."""
+        self.colormap = name
+
+    def set_blend_alpha(self, alpha: float):
+        """Set the weight of the predicted frame in blend mode (0-1)."""
+        self.blend_alpha = max(0.0, min(1.0, alpha))
+
+    def _colormap_for(self, mode: OverlayMode) -> str:
+        return self.colormap or DEFAULT_COLORMAPS[mode]
+
     def toggle_flicker(self):
         """Toggle flicker state for flicker mode."""
         self.flicker_state = not self.flicker_state
 
-    def composite(self, gt_frame: np.ndarray, pred_frame: np.ndarray) -> np.ndarray:
-        """Composite two frames based on current mode."""
+    def cache_key(self) -> tuple:
+        """Settings that affect the composite of a given frame pair."""
+        return (
+            self.mode,
+            get_overlay_renderer(self.mode).settings(self),
+            self.resize_filter,
+        )
+
+    def composite(self, gt_frame: np.ndarray, pred_frame: np.ndarray,
+                  out: Optional[np.ndarray] = None,
+                  roi: Optional[Tuple[int, int, int, int]] = None,
+                  gt_key: Optional[Hashable] = None,
+                  pred_key: Optional[Hashable] = None) -> np.ndarray:
+        """Composite two frames based on current mode.
+
+        With ``roi`` = (x, y, width, height) in output coordinates, only
+        that region is rendered and returned, matching the same region
+        of the full composite. Renders into ``out`` when given; it must
+        be an RGBA uint8 array of the output (or region) size. Without
+        ``out``, passthrough modes return an input frame itself, so the
+        result must not be modified.
+        ``gt_key`` and ``pred_key`` identify the frames so conversions
+        and statistics derived from them (SSIM moments) can be reused.
+        A predicted frame of another size is resized with
+        ``resize_filter`` on every call; pass one from
+        ``GifHandler.get_resized_frame`` to reuse cached resizes.
+        """
         # Ensure both frames are same size and RGBA
-        gt = self._ensure_rgba(gt_frame)
-        pred = self._ensure_rgba(pred_frame)
+        gt = self._input(gt_frame, "rgba", gt_key)
+        pred = self._input(pred_frame, "rgba", pred_key)
 
         # Resize pred to match gt if needed
         if gt.shape != pred.shape:
-            from PIL import Image
-            pred_img = Image.fromarray(pred)
-            pred_img = pred_img.resize((gt.shape[1], gt.shape[0]), Image.Resampling.LANCZOS)
-            pred = np.array(pred_img)
-
-        if self.mode == OverlayMode.NORMAL:
-            return self._composite_normal(gt, pred)
-        elif self.mode == OverlayMode.DUAL_COLOR:
-            return self._composite_dual_color(gt, pred)
-        elif self.mode == OverlayMode.DIFFERENCE:
-            return self._composite_difference(gt, pred)
-        elif self.mode == OverlayMode.SSIM_MAP:
-            return self._composite_ssim_map(gt, pred)
-        elif self.mode == OverlayMode.BLEND:
-            return self._composite_blend(gt, pred)
-        elif self.mode == OverlayMode.FLICKER:
-            return self._composite_flicker(gt, pred)
-        elif self.mode == OverlayMode.CHECKERBOARD:
-            return self._composite_checkerboard(gt, pred)
-        elif self.mode == OverlayMode.SIDE_BY_SIDE:
-            return self._composite_side_by_side(gt, pred)
-        return gt
+            pred = self._resize(pred, gt.shape[0], gt.shape[1])
+            pred_key = None
+
+        if roi is not None:
+            return self._render_region(gt, pred, roi, out, gt_key, pred_key)
+        return self._render(gt, pred, out, gt_key, pred_key)
+
+    def _render_region(self, gt: np.ndarray, pred: np.ndarray,
+                       roi: Tuple[int, int, int, int],
+                       out: Optional[np.ndarray] = None,
+                       gt_key: Optional[Hashable] = None,
+                       pred_key: Optional[Hashable] = None) -> np.ndarray:
+        renderer = get_overlay_renderer(self.mode)
+        full_h, full_w = gt.shape[:2]
+        out_h, out_w = self.output_shape(full_h, full_w)[:2]
+        region = clip_region(roi, out_w, out_h)
+        if renderer.render_region is not None:
+            return renderer.render_region(self, gt, pred, region, out)
+
+        # Tiles include the neighbourhood edge pixels depend on
+        x, y, w, h = region
+        margin = renderer.margin
+        x0, y0 = max(x - margin, 0), max(y - margin, 0)
+        x1, y1 = min(x + w + margin, full_w), min(y + h + margin, full_h)
+        if gt_key is not None:
+            gt_key = (gt_key, x0, y0, x1, y1)
+        if pred_key is not None:
+            pred_key = (pred_key, x0, y0, x1, y1)
+        gt_tile = gt[y0:y1, x0:x1]
+        pred_tile = pred[y0:y1, x0:x1]
+        if margin == 0:
+            return self._render(gt_tile, pred_tile, out, gt_key, pred_key)
+
+        tile = self._render(gt_tile, pred_tile, None, gt_key, pred_key)[y - y0:y - y0 + h, x - x0:x - x0 + w]
+        if out is None:
+            return tile
+        result = self._output((h, w, 4), out)
+        np.copyto(result, tile)
+        return result
+
+    def output_shape(self, h: int, w: int) -> Tuple[int, int, int]:
+        """Shape of the composite of two (h, w) frames in the current mode."""
+        return h, w * get_overlay_renderer(self.mode).width_factor, 4
+
+    def single_frame(self, frame: np.ndarray, size: Tuple[int, int],
+                     is_gt: bool = True) -> np.ndarray:
+        """Show one frame alone at the composite size of (w, h) frames.
+
+        For frames past the end of the shorter sequence. The frame is
+        resized to ``size`` and placed where its sequence appears in
+        wide modes (left for ground truth, right for predicted); the
+        rest is transparent.
+        """
+        w, h = size
+        frame = self._convert(frame, "rgba")
+        if frame.shape[:2] != (h, w):
+            frame = self._resize(frame, h, w)
+        result = np.zeros(self.output_shape(h, w), dtype=np.uint8)
+        x = 0 if is_gt else result.shape[1] - w
+        result[:, x:x + w] = frame
+        return result
+
+    def composite_sequence(self, gt_stack: Sequence[np.ndarray], pred_stack: Sequence[np.ndarray],
+                           chunk: int = 16, workers: int = 0,
+                           grid: Optional["GridOverlay"] = None) -> Iterator[np.ndarray]:
+        """Composite two frame sequences a chunk at a time.
+
+        Yields (n, H, W, 4) arrays of up to ``chunk`` frames, in order,
+        for the length of the shorter sequence. Chunks are reused
+        buffers that are only valid until the next one is requested.
+        Most modes process a whole chunk with broadcasting; with
+        ``workers`` > 1 chunks are rendered on a thread pool, as numpy
+        releases the GIL. ``grid`` is applied to every frame if given.
+        """
+        count = min(len(gt_stack), len(pred_stack))
+        if count == 0:
+            return
+        chunk = max(1, chunk)
+        h, w = self._convert(gt_stack[0], "rgba").shape[:2]
+        if self.mode == OverlayMode.CHECKERBOARD:
+            # Build the shared masks before threads use them
+            self._checker_layout(h, w)
+        if grid is not None and grid.enabled:
+            grid._layer(*self.output_shape(h, w)[:2], (0, 0))
+
+        starts = list(range(0, count, chunk))
+        # One set of buffers per chunk in flight, plus the one the caller holds
+        buffers: List[Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]] = [None] * (max(1, workers) + 1)
+
+        def render(k: int) -> np.ndarray:
+            slot = k % len(buffers)
+            if buffers[slot] is None:
+                buffers[slot] = (np.empty((chunk, h, w, 4), dtype=np.uint8),
+                                 np.empty((chunk, h, w, 4), dtype=np.uint8),
+                                 np.empty((chunk,) + self.output_shape(h, w), dtype=np.uint8))
+            gt_buf, pred_buf, out_buf = buffers[slot]
+            start = starts[k]
+            stop = min(start + chunk, count)
+            return self._composite_chunk(self._gather(gt_stack, start, stop, gt_buf),
+                                         self._gather(pred_stack, start, stop, pred_buf),
+                                         out_buf[:stop - start], grid)
+
+        if workers <= 1:
+            for k in range(len(starts)):
+                yield render(k)
+            return
+
+        executor = ThreadPoolExecutor(max_workers=workers)
+        pending = deque()
+        try:
+            for k in range(len(starts)):
+                pending.append(executor.submit(render, k))
+                if len(pending) >= workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _gather(self, stack: Sequence[np.ndarray], start: int, stop: int,
+                buffer: np.ndarray) -> np.ndarray:
+        """Frames start:stop as one RGBA array of the buffer's frame size."""
+        h, w = buffer.shape[1:3]
+        if isinstance(stack, np.ndarray) and stack.shape[1:] == (h, w, 4):
+            # Already a (T, H, W, 4) array, e.g. a memory-mapped stack
+            return stack[start:stop]
+        for i in range(start, stop):
+            frame = self._convert(stack[i], "rgba")
+            if frame.shape[:2] != (h, w):
+                frame = self._resize(frame, h, w)
+            buffer[i - start] = frame
+        return buffer[:stop - start]
+
+    def _composite_chunk(self, gt: np.ndarray, pred: np.ndarray, out: np.ndarray,
+                         grid: Optional["GridOverlay"]) -> np.ndarray:
+        if get_overlay_renderer(self.mode).framewise:
+            for i in range(len(out)):
+                self._render(gt[i], pred[i], out[i])
+        else:
+            self._render(gt, pred, out)
+        if grid is not None:
+            grid.apply(out, out=out)
+        return out
+
+    def _render(self, gt: np.ndarray, pred: np.ndarray,
+                out: Optional[np.ndarray] = None,
+                gt_key: Optional[Hashable] = None,
+                pred_key: Optional[Hashable] = None) -> np.ndarray:
+        """Dispatch to the current mode. Inputs are same-shape RGBA arrays."""
+        renderer = get_overlay_renderer(self.mode)
+        return renderer.render(self, self._input(gt, renderer.inputs, gt_key),
+                               self._input(pred, renderer.inputs, pred_key), out, gt_key)
+
+    def _input(self, frame: np.ndarray, kind: str,
+               key: Optional[Hashable] = None) -> np.ndarray:
+        """A frame in the form ``kind``, reusing the conversion of a keyed frame."""
+        if (kind == "rgba" and frame.ndim >= 3 and frame.shape[-1] == 4 and
+                frame.dtype == np.uint8 and frame.strides[-2:] == (4, 1)):
+            # Packed RGBA pixels (rows may be strided, e.g. a region) need no conversion
+            return frame
+        if key is None:
+            return self._convert(frame, kind)
+
+        key = (key, kind, frame.shape)
+        with self._inputs_lock:
+            converted = self._inputs.get(key)
+            if converted is not None:
+                self._inputs.move_to_end(key)
+                return converted
+        converted = self._convert(frame, kind)
+        with self._inputs_lock:
+            self._inputs[key] = converted
+            while len(self._inputs) > 8:
+                self._inputs.popitem(last=False)
+        return converted
+
+    def _convert(self, frame: np.ndarray, kind: str) -> np.ndarray:
+        rgba = self._ensure_rgba(frame)
+        if kind == "gray":
+            return self._luminance(rgba)
+        if kind == "float":
+            return np.multiply(rgba, np.float32(1 / 255), dtype=np.float32)
+        return rgba
+
+    def _resize(self, frame: np.ndarray, h: int, w: int) -> np.ndarray:
+        return resize_frame(frame, (w, h), self.resize_filter)
 
     def _ensure_rgba(self, frame: np.ndarray) -> np.ndarray:
         """Ensure frame is RGBA format."""
@@ -81,136 +395,267 @@ class OverlayEngine:
             rgba[:, :, :3] = frame
             rgba[:, :, 3] = 255
             return rgba
-        return frame.copy()
-
-    def _composite_normal(self, gt: np.ndarray, pred: np.ndarray) -> np.ndarray:
-        """Show predicted on top of ground truth."""
-        return pred.copy()
-
-    def _composite_dual_color(self, gt: np.ndarray, pred: np.ndarray) -> np.ndarray:
-        """Tint ground truth and predicted with different colors."""
-        # Convert to grayscale luminance
-        gt_gray = 0.299 * gt[:, :, 0] + 0.587 * gt[:, :, 1] + 0.114 * gt[:, :, 2]
-        pred_gray = 0.299 * pred[:, :, 0] + 0.587 * pred[:, :, 1] + 0.114 * pred[:, :, 2]
-
-        result = np.zeros_like(gt)
-        # Apply colors
-        for i, c in enumerate(self.gt_color):
-            result[:, :, i] = np.clip(result[:, :, i] + (gt_gray * c / 255), 0, 255)
-        for i, c in enumerate(self.pred_color):
-            result[:, :, i] = np.clip(result[:, :, i] + (pred_gray * c / 255), 0, 255)
-        result[:, :, 3] = 255
-        return result.astype(np.uint8)
-
-    def _composite_difference(self, gt: np.ndarray, pred: np.ndarray) -> np.ndarray:
-        """Show difference heatmap between frames."""
-        # Calculate absolute difference
-        diff = np.abs(gt[:, :, :3].astype(np.float32) - pred[:, :, :3].astype(np.float32))
-        diff_gray = np.mean(diff, axis=2)
-
-        # Normalize to 0-1
-        max_diff = diff_gray.max() if diff_gray.max() > 0 else 1
-        diff_norm = diff_gray / max_diff
-
-        # Apply heatmap colormap (blue -> green -> yellow -> red)
-        result = np.zeros_like(gt)
-        result[:, :, 0] = np.clip(diff_norm * 4 * 255, 0, 255)  # Red
-        result[:, :, 1] = np.clip((1 - np.abs(diff_norm - 0.5) * 2) * 255, 0, 255)  # Green
-        result[:, :, 2] = np.clip((1 - diff_norm) * 255, 0, 255)  # Blue
-        result[:, :, 3] = 255
-        return result.astype(np.uint8)
-
-    def _composite_ssim_map(self, gt: np.ndarray, pred: np.ndarray) -> np.ndarray:
-        """Show local SSIM as heatmap. Green=similar, red=different."""
-        from skimage.metrics import structural_similarity as ssim
-
-        # Convert to grayscale
-        gt_gray = (0.299 * gt[:, :, 0] + 0.587 * gt[:, :, 1] + 0.114 * gt[:, :, 2]).astype(np.uint8)
-        pred_gray = (0.299 * pred[:, :, 0] + 0.587 * pred[:, :, 1] + 0.114 * pred[:, :, 2]).astype(np.uint8)
+        # Modes never write to their inputs, so RGBA frames are used as-is
+        return np.ascontiguousarray(frame)
+
+    # Mode implementations take (..., H, W, 4) arrays so they also work on
+    # whole chunks of frames, and render into ``out`` when it is given.
+
+    def _output(self, shape: Tuple[int, ...], out: Optional[np.ndarray]) -> np.ndarray:
+        if out is None:
+            return np.empty(shape, dtype=np.uint8)
+        if out.shape != shape or out.dtype != np.uint8:
+            raise ValueError(f"Output buffer {out.shape} {out.dtype} does not match "
+                             f"composite shape {shape}")
+        return out
+
+    def _composite_normal(self, gt: np.ndarray, pred: np.ndarray,
+                          out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Show predicted on top of ground truth (the predicted frame itself without ``out``)."""
+        if out is None:
+            return pred
+        result = self._output(pred.shape, out)
+        np.copyto(result, pred)
+        return result
 
-        # Compute SSIM with local map
-        try:
-            _, ssim_map = ssim(gt_gray, pred_gray, data_range=255, full=True)
-        except Exception:
-            # Fallback if SSIM fails
-            return self._composite_difference(gt, pred)
-
-        # ssim_map values are -1 to 1, normalize to 0-1
-        ssim_norm = (ssim_map + 1) / 2
-        ssim_norm = np.clip(ssim_norm, 0, 1)
-
-        # Apply heatmap: green=1 (identical), red=0 (different)
-        result = np.zeros_like(gt)
-        result[:, :, 0] = ((1 - ssim_norm) * 255).astype(np.uint8)  # Red
-        result[:, :, 1] = (ssim_norm * 255).astype(np.uint8)  # Green
-        result[:, :, 2] = 0  # Blue
-        result[:, :, 3] = 255
+    def _luminance(self, frame: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Rec. 601 luma in 8.8 fixed point: (77 R + 150 G + 29 B + 128) >> 8."""
+        acc = np.multiply(frame[..., 0], 77, dtype=np.uint16)
+        tmp = np.multiply(frame[..., 1], 150, dtype=np.uint16)
+        acc += tmp
+        np.multiply(frame[..., 2], 29, out=tmp, dtype=np.uint16)
+        acc += tmp
+        acc += 128
+        acc >>= 8
+        if out is None:
+            out = np.empty(frame.shape[:-1], dtype=np.uint8)
+        np.copyto(out, acc, casting="unsafe")
+        return out
+
+    def _composite_dual_color(self, gt_gray: np.ndarray, pred_gray: np.ndarray,
+                              out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Tint ground truth and predicted luma with different colors."""
+        result = self._output(gt_gray.shape + (4,), out)
+
+        # gray * color / 255 per frame, each rounded exactly, so the sum is within 1 of float
+        acc = np.empty(gt_gray.shape, dtype=np.uint16)
+        term = np.empty(gt_gray.shape, dtype=np.uint16)
+        tmp = np.empty(gt_gray.shape, dtype=np.uint16)
+        for i in range(3):
+            _scale_div_255(gt_gray, int(self.gt_color[i]), acc, tmp)
+            _scale_div_255(pred_gray, int(self.pred_color[i]), term, tmp)
+            acc += term
+            np.minimum(acc, 255, out=acc)
+            np.copyto(result[..., i], acc, casting="unsafe")
+        result[..., 3] = 255
         return result
 
-    def _composite_blend(self, gt: np.ndarray, pred: np.ndarray) -> np.ndarray:
-        """Blend both frames at 50% opacity each."""
-        result = (gt.astype(np.float32) * 0.5 + pred.astype(np.float32) * 0.5)
-        result[:, :, 3] = 255
-        return result.astype(np.uint8)
+    def _difference_total(self, gt: np.ndarray, pred: np.ndarray) -> np.ndarray:
+        """Sum of absolute channel differences (proportional to the mean)."""
+        # Whole pixels are compared; strided channel slices are much slower
+        hi = np.maximum(gt, pred)
+        hi -= np.minimum(gt, pred)
+        total = hi[..., 0].astype(np.uint16)
+        total += hi[..., 1]
+        total += hi[..., 2]
+        return total
+
+    def _composite_difference(self, gt: np.ndarray, pred: np.ndarray,
+                              out: Optional[np.ndarray] = None,
+                              peak: Optional[int] = None) -> np.ndarray:
+        """Show difference heatmap between frames.
+
+        Each frame is normalized to its largest difference, or to ``peak``
+        when given (e.g. the whole frame's peak when rendering a region).
+        """
+        total = self._difference_total(gt, pred)
+
+        # Normalize through a per-frame lookup table instead of a division per pixel
+        index = np.empty(total.shape, dtype=np.uint8)
+        frames = total.reshape((-1,) + total.shape[-2:])
+        indices = index.reshape(frames.shape)
+        steps = np.arange(3 * 255 + 1, dtype=np.uint32) * 255
+        for frame, frame_index in zip(frames, indices):
+            frame_peak = peak if peak is not None else int(frame.max())
+            scale = (steps // max(frame_peak, 1)).astype(np.uint8)
+            scale.take(frame, out=frame_index, mode="clip")
+        return apply_colormap(index, self._colormap_for(OverlayMode.DIFFERENCE),
+                              self._output(gt.shape, out))
+
+    def _composite_ssim_map(self, gt: np.ndarray, pred: np.ndarray,
+                            out: Optional[np.ndarray] = None,
+                            gt_key: Optional[Hashable] = None) -> np.ndarray:
+        """Show local SSIM as heatmap. Green=similar, red=different."""
+        ssim_map = self._ssim_kernel.ssim_map(gt, pred, self.ssim_per_channel,
+                                              self.ssim_gaussian, gt_key)
+
+        # ssim_map values are -1 to 1, quantize to 0-255 in place
+        ssim_map += 1
+        ssim_map *= 127.5
+        np.clip(ssim_map, 0, 255, out=ssim_map)
+
+        # Default heatmap: green=255 (identical), red=0 (different)
+        return apply_colormap(ssim_map.astype(np.uint8), self._colormap_for(OverlayMode.SSIM_MAP),
+                              self._output(gt.shape, out))
+
+    def _composite_blend(self, gt: np.ndarray, pred: np.ndarray,
+                         out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Blend both frames, weighting predicted by ``blend_alpha``."""
+        result = self._output(gt.shape, out)
+        weight = int(round(self.blend_alpha * 256))
+
+        # (gt * (256 - a) + pred * a + 128) >> 8 in uint16
+        acc = np.multiply(gt, 256 - weight, dtype=np.uint16)
+        tmp = np.multiply(pred, weight, dtype=np.uint16)
+        acc += tmp
+        acc += 128
+        acc >>= 8
+        np.copyto(result, acc, casting="unsafe")
+        result[..., 3] = 255
+        return result
 
-    def _composite_flicker(self, gt: np.ndarray, pred: np.ndarray) -> np.ndarray:
-        """Alternate between frames (toggle with flicker_state)."""
-        return gt.copy() if self.flicker_state else pred.copy()
+    def _composite_flicker(self, gt: np.ndarray, pred: np.ndarray,
+                           out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Alternate between frames (toggle with flicker_state); no copy without ``out``."""
+        frame = gt if self.flicker_state else pred
+        if out is None:
+            return frame
+        result = self._output(gt.shape, out)
+        np.copyto(result, frame)
+        return result
 
-    def _composite_checkerboard(self, gt: np.ndarray, pred: np.ndarray) -> np.ndarray:
+    def _checker_layout(self, h: int, w: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Masks of predicted tiles, grid lines and marker dots for a frame size."""
+        size = self.checker_size
+        thickness = self.grid_thickness
+        key = (h, w, size, thickness)
+        with self._checker_layouts_lock:
+            layout = self._checker_layouts.get(key)
+            if layout is not None:
+                self._checker_layouts.move_to_end(key)
+                return layout
+
+        ys = np.arange(h)
+        xs = np.arange(w)
+        pred_mask = ((ys[:, None] // size + xs[None, :] // size) % 2) == 1
+
+        # Grid lines matching checker size
+        grid_mask = ((ys % size) < thickness)[:, None] | ((xs % size) < thickness)[None, :]
+
+        # Magenta dot in the top-left corner of every predicted tile
+        dot_size = max(3, size // 10)
+        dot_y = (ys >= 2) & ((ys - 2) % size < dot_size)
+        dot_x = (xs >= 2) & ((xs - 2) % size < dot_size)
+        tile_y = (ys - 2) // size
+        tile_x = (xs - 2) // size
+        dot_mask = (dot_y[:, None] & dot_x[None, :] &
+                    ((tile_y[:, None] + tile_x[None, :]) % 2 == 1))
+
+        layout = (pred_mask, grid_mask, dot_mask)
+        with self._checker_layouts_lock:
+            self._checker_layouts[key] = layout
+            while len(self._checker_layouts) > 4:
+                self._checker_layouts.popitem(last=False)
+        return layout
+
+    def _composite_checkerboard(self, gt: np.ndarray, pred: np.ndarray,
+                                out: Optional[np.ndarray] = None,
+                                layout: Optional[Tuple[np.ndarray, ...]] = None) -> np.ndarray:
         """Show alternating checkerboard pattern of both frames with matching grid."""
-        h, w = gt.shape[:2]
-        result = np.zeros_like(gt)
-
-        # Create checkerboard mask
-        y_indices = np.arange(h) // self.checker_size
-        x_indices = np.arange(w) // self.checker_size
-        yy, xx = np.meshgrid(y_indices, x_indices, indexing='ij')
-        mask = (yy + xx) % 2 == 0
-
-        # Apply mask
-        for c in range(4):
-            result[:, :, c] = np.where(mask, gt[:, :, c], pred[:, :, c])
-
-        # Draw grid lines matching checker size
-        grid_color = np.array([80, 80, 80, 255], dtype=np.uint8)
-        # Vertical lines
-        for x in range(0, w, self.checker_size):
-            x_end = min(x + self.grid_thickness, w)
-            result[:, x:x_end, :] = grid_color
-        # Horizontal lines
-        for y in range(0, h, self.checker_size):
-            y_end = min(y + self.grid_thickness, h)
-            result[y:y_end, :, :] = grid_color
-
-        # Mark predicted tiles with magenta dot in corner
-        dot_size = max(3, self.checker_size // 10)
-        magenta = np.array([255, 80, 255, 255], dtype=np.uint8)
-
-        for ty in range(int(np.ceil(h / self.checker_size))):
-            for tx in range(int(np.ceil(w / self.checker_size))):
-                if (ty + tx) % 2 == 1:  # Predicted tile
-                    # Draw dot in top-left corner of tile
-                    y_start = ty * self.checker_size + 2
-                    x_start = tx * self.checker_size + 2
-                    y_end = min(y_start + dot_size, h)
-                    x_end = min(x_start + dot_size, w)
-                    if y_start < h and x_start < w:
-                        result[y_start:y_end, x_start:x_end, :] = magenta
-
+        h, w = gt.shape[-3:-1]
+        pred_mask, grid_mask, dot_mask = layout or self._checker_layout(h, w)
+
+        # Select whole RGBA pixels at once through uint32 views
+        result = self._output(gt.shape, out)
+        packed = result.view(np.uint32)[..., 0]
+        np.copyto(packed, gt.view(np.uint32)[..., 0])
+        np.copyto(packed, pred.view(np.uint32)[..., 0], where=pred_mask)
+        np.copyto(packed, _CHECKER_GRID_COLOR, where=grid_mask)
+        np.copyto(packed, _CHECKER_DOT_COLOR, where=dot_mask)
         return result
 
-    def _composite_side_by_side(self, gt: np.ndarray, pred: np.ndarray) -> np.ndarray:
+    def _composite_side_by_side(self, gt: np.ndarray, pred: np.ndarray,
+                                out: Optional[np.ndarray] = None) -> np.ndarray:
         """Show ground truth and predicted side by side."""
-        h, w = gt.shape[:2]
-        # Create result with double width
-        result = np.zeros((h, w * 2, 4), dtype=np.uint8)
+        h, w = gt.shape[-3:-1]
+        # Result with double width
+        result = self._output(gt.shape[:-3] + self.output_shape(h, w), out)
         # Left side: ground truth
-        result[:, :w, :] = gt
+        result[..., :w, :] = gt
         # Right side: predicted
-        result[:, w:, :] = pred
+        result[..., w:, :] = pred
+        return result
+
+    def _side_by_side_region(self, gt: np.ndarray, pred: np.ndarray,
+                             region: Tuple[int, int, int, int],
+                             out: Optional[np.ndarray] = None) -> np.ndarray:
+        x, y, w, h = region
+        full_w = gt.shape[1]
+        result = self._output((h, w, 4), out)
+        # Columns left of the seam come from gt, the rest from pred
+        split = min(max(full_w - x, 0), w)
+        result[:, :split] = gt[y:y + h, x:x + split]
+        result[:, split:] = pred[y:y + h, x + split - full_w:x + w - full_w]
         return result
 
+    def _checkerboard_region(self, gt: np.ndarray, pred: np.ndarray,
+                             region: Tuple[int, int, int, int],
+                             out: Optional[np.ndarray] = None) -> np.ndarray:
+        x, y, w, h = region
+        # Crop the full-frame masks so tiles stay aligned to the frame
+        layout = tuple(mask[y:y + h, x:x + w] for mask in self._checker_layout(*gt.shape[:2]))
+        return self._composite_checkerboard(gt[y:y + h, x:x + w], pred[y:y + h, x:x + w],
+                                            out, layout)
+
+    def _difference_region(self, gt: np.ndarray, pred: np.ndarray,
+                           region: Tuple[int, int, int, int],
+                           out: Optional[np.ndarray] = None) -> np.ndarray:
+        x, y, w, h = region
+        # Normalize to the whole frame's peak so colors don't shift while panning
+        peak = int(self._difference_total(gt, pred).max())
+        return self._composite_difference(gt[y:y + h, x:x + w], pred[y:y + h, x:x + w],
+                                          out, peak)
+
+
+def _heatmap_settings(mode: OverlayMode) -> Callable[[OverlayEngine], tuple]:
+    return lambda engine: (engine._colormap_for(mode),)
+
+
+for _mode, _renderer in [
+    (OverlayMode.NORMAL, OverlayRenderer(
+        lambda engine, gt, pred, out, gt_key: engine._composite_normal(gt, pred, out))),
+    (OverlayMode.DUAL_COLOR, OverlayRenderer(
+        lambda engine, gt, pred, out, gt_key: engine._composite_dual_color(gt, pred, out),
+        inputs="gray",
+        settings=lambda engine: (engine.gt_color, engine.pred_color))),
+    (OverlayMode.DIFFERENCE, OverlayRenderer(
+        lambda engine, gt, pred, out, gt_key: engine._composite_difference(gt, pred, out),
+        settings=_heatmap_settings(OverlayMode.DIFFERENCE),
+        render_region=OverlayEngine._difference_region)),
+    (OverlayMode.SSIM_MAP, OverlayRenderer(
+        OverlayEngine._composite_ssim_map,
+        framewise=True,
+        # The SSIM window reaches this far around each pixel (at most 11x11)
+        margin=SSIM_MARGIN,
+        settings=lambda engine: (engine._colormap_for(OverlayMode.SSIM_MAP),
+                                 engine.ssim_per_channel, engine.ssim_gaussian))),
+    (OverlayMode.BLEND, OverlayRenderer(
+        lambda engine, gt, pred, out, gt_key: engine._composite_blend(gt, pred, out),
+        settings=lambda engine: (engine.blend_alpha,))),
+    (OverlayMode.FLICKER, OverlayRenderer(
+        lambda engine, gt, pred, out, gt_key: engine._composite_flicker(gt, pred, out),
+        settings=lambda engine: (engine.flicker_state,))),
+    (OverlayMode.CHECKERBOARD, OverlayRenderer(
+        lambda engine, gt, pred, out, gt_key: engine._composite_checkerboard(gt, pred, out),
+        settings=lambda engine: (engine.checker_size, engine.grid_thickness),
+        render_region=OverlayEngine._checkerboard_region)),
+    (OverlayMode.SIDE_BY_SIDE, OverlayRenderer(
+        lambda engine, gt, pred, out, gt_key: engine._composite_side_by_side(gt, pred, out),
+        width_factor=2,
+        render_region=OverlayEngine._side_by_side_region)),
+]:
+    register_overlay_mode(_mode, _renderer)
+
 
 class GridOverlay:
     """Overlay a grid on top of an image."""
@@ -221,29 +666,94 @@ class GridOverlay:
         self.color = (128, 128, 128)
         self.opacity = 0.5
         self.thickness = 1
-
-    def apply(self, frame: np.ndarray) -> np.ndarray:
-        """Apply grid overlay to frame."""
+        # Line pixels and their blend terms per frame size, origin and settings;
+        # used from render threads
+        self._layers: "OrderedDict[tuple, Tuple[np.ndarray, np.ndarray, np.ndarray]]" = OrderedDict()
+        self._layers_lock = threading.Lock()
+
+    def _layer(self, h: int, w: int,
+               origin: Tuple[int, int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Flat indices of the line pixels, with per-pixel scale and premultiplied color."""
+        ox, oy = origin[0] % self.size, origin[1] % self.size
+        key = (h, w, ox, oy, self.size, self.thickness, tuple(self.color[:3]), self.opacity)
+        with self._layers_lock:
+            layer = self._layers.get(key)
+            if layer is not None:
+                self._layers.move_to_end(key)
+                return layer
+
+        # A pixel is on a line when its image coordinate is within
+        # ``thickness`` of a multiple of ``size``
+        on_row = (np.arange(h) + oy) % self.size < self.thickness
+        on_col = (np.arange(w) + ox) % self.size < self.thickness
+        index = np.flatnonzero(on_row[:, None] | on_col[None, :])
+        crossing = (on_row[:, None] & on_col[None, :]).ravel()[index]
+
+        # Crossings are covered by both lines, so weigh them 1 - (1 - a)^2
+        weight = int(round(self.opacity * 256))
+        crossing_weight = 256 - (((256 - weight) ** 2 + 128) >> 8)
+        weights = np.where(crossing, crossing_weight, weight).astype(np.uint16)
+
+        # 8.8 fixed point: (pixel * (256 - a) + color * a + 128) >> 8, alpha kept
+        scale = np.empty((len(index), 4), dtype=np.uint16)
+        scale[:, :3] = (256 - weights)[:, None]
+        scale[:, 3] = 256
+        term = np.zeros((len(index), 4), dtype=np.uint16)
+        term[:, :3] = weights[:, None] * np.array(self.color[:3], dtype=np.uint16) + 128
+
+        layer = (index, scale, term)
+        with self._layers_lock:
+            self._layers[key] = layer
+            while len(self._layers) > 8:
+                self._layers.popitem(last=False)
+        return layer
+
+    def apply(self, frame: np.ndarray, origin: Tuple[int, int] = (0, 0),
+              out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Apply grid overlay to a frame or a (T, H, W, 4) stack of frames.
+
+        ``origin`` is the (x, y) position of the frame within the full
+        image when it is a region, so lines stay aligned to the image.
+        Only the line pixels are read and blended, with one integer
+        blend against a cached layer. Draws into ``out`` when given,
+        which may be ``frame`` itself.
+        """
         if not self.enabled:
-            return frame
-
-        result = frame.copy().astype(np.float32)
-        h, w = frame.shape[:2]
-        alpha = self.opacity
-
-        # Draw vertical lines
-        for x in range(0, w, self.size):
-            x_end = min(x + self.thickness, w)
-            for c in range(3):
-                result[:, x:x_end, c] = result[:, x:x_end, c] * (1 - alpha) + self.color[c] * alpha
-
-        # Draw horizontal lines
-        for y in range(0, h, self.size):
-            y_end = min(y + self.thickness, h)
-            for c in range(3):
-                result[y:y_end, :, c] = result[y:y_end, :, c] * (1 - alpha) + self.color[c] * alpha
+            if out is None:
+                return frame
+            if out is not frame:
+                np.copyto(out, frame)
+            return out
+
+        if out is None:
+            result = np.ascontiguousarray(frame).copy()
+        else:
+            result = out
+            if out is not frame:
+                np.copyto(result, frame)
+        # Pixels are handled whole as uint32, which needs packed frames
+        target = result if result.flags.c_contiguous else np.ascontiguousarray(result)
+
+        h, w = target.shape[-3:-1]
+        index, scale, term = self._layer(h, w, origin)
+        pixels = target.view(np.uint32).reshape(target.shape[:-3] + (h * w,))
+        lines = pixels.take(index, axis=-1)
+        channels = lines.view(np.uint8).reshape(lines.shape + (4,))
+        acc = np.multiply(channels, scale, dtype=np.uint16)
+        acc += term
+        acc >>= 8
+        np.copyto(channels, acc, casting="unsafe")
+        pixels[..., index] = lines
+
+        if target is not result:
+            np.copyto(result, target)
+        return result
 
-        return result.astype(np.uint8)
+    def cache_key(self) -> tuple:
+        """Settings that affect the grid drawn on a frame."""
+        if not self.enabled:
+            return (False,)
+        return (True, self.size, self.color, self.opacity, self.thickness)
 
     def set_enabled(self, enabled: bool):
         self.enabled = enabled
@@ -259,3 +769,34 @@ class GridOverlay:
 
     def set_thickness(self, thickness: int):
         self.thickness = max(1, thickness)
+
+
+class CompositeCache:
+    """Memory-bounded LRU cache of rendered composites."""
+
+    def __init__(self, max_bytes: int = 256 * 1024 ** 2):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+
+    def get(self, key: Hashable) -> Optional[np.ndarray]:
+        image = self._entries.get(key)
+        if image is not None:
+            self._entries.move_to_end(key)
+        return image
+
+    def put(self, key: Hashable, image: np.ndarray):
+        if image.nbytes > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old.nbytes
+        self._entries[key] = image
+        self._bytes += image.nbytes
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.nbytes
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
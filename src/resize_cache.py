@@ -0,0 +1,100 @@
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Tuple
+
+from PIL import Image
+
+
+# Resampling filters offered for matching prediction frames to the GT size
+RESIZE_FILTERS: Dict[str, Image.Resampling] = {
+    "nearest": Image.Resampling.NEAREST,  # pixel-exact blocks, no new colors
+    "area": Image.Resampling.BOX,         # averages covered pixels when shrinking
+    "lanczos": Image.Resampling.LANCZOS,
+}
+DEFAULT_RESIZE_FILTER = "lanczos"
+
+
+def resize_filter_names() -> List[str]:
+    """Names of the available resampling filters."""
+    return list(RESIZE_FILTERS)
+
+
+def resize_frame(frame: np.ndarray, size: Tuple[int, int],
+                 method: str = DEFAULT_RESIZE_FILTER) -> np.ndarray:
+    """Resize a frame to ``size`` = (width, height) with the named filter."""
+    try:
+        resample = RESIZE_FILTERS[method]
+    except KeyError:
+        raise ValueError(f"Unknown resize filter: {method}") from None
+    img = Image.fromarray(frame)
+    return np.asarray(img.resize(size, resample))
+
+
+class ResizeCache:
+    """Thread-safe, memory-bounded LRU cache of resized frames.
+
+    Entries are keyed on (frame id, size, filter). Frame ids are never
+    reused, so edited frames can't return stale results and changing
+    the filter simply misses.
+    """
+
+    def __init__(self, method: str = DEFAULT_RESIZE_FILTER,
+                 max_bytes: int = 512 * 1024 ** 2):
+        if method not in RESIZE_FILTERS:
+            raise ValueError(f"Unknown resize filter: {method}")
+        self.method = method
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def set_method(self, method: str):
+        """Switch the resampling filter, dropping frames resized with the old one."""
+        if method not in RESIZE_FILTERS:
+            raise ValueError(f"Unknown resize filter: {method}")
+        if method != self.method:
+            self.method = method
+            self.clear()
+
+    def has_room(self, nbytes: int) -> bool:
+        """Whether ``nbytes`` more fit without evicting anything."""
+        with self._lock:
+            return self._bytes + nbytes <= self.max_bytes
+
+    def get(self, frame_id: Hashable, frame: np.ndarray,
+            size: Tuple[int, int]) -> np.ndarray:
+        """Return ``frame`` resized to ``size`` = (width, height), resizing on a miss."""
+        if frame.shape[1::-1] == tuple(size):
+            return frame
+        method = self.method
+        key = (frame_id, tuple(size), method)
+        with self._lock:
+            resized = self._entries.get(key)
+            if resized is not None:
+                self._entries.move_to_end(key)
+                return resized
+
+        # Resized outside the lock so other threads aren't held up
+        resized = resize_frame(frame, size, method)
+        resized.flags.writeable = False
+        self._put(key, resized)
+        return resized
+
+    def _put(self, key: Hashable, image: np.ndarray):
+        if image.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._entries[key] = image
+            self._bytes += image.nbytes
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
@@ -0,0 +1,228 @@
+import threading
+import time
+import numpy as np
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Hashable, Optional, Tuple
+
+from scipy.ndimage import gaussian_filter1d, uniform_filter1d
+
+
+# Same constants and windows as skimage.metrics.structural_similarity
+K1 = 0.01
+K2 = 0.03
+DATA_RANGE = 255.0
+UNIFORM_WINDOW = 7
+GAUSSIAN_SIGMA = 1.5
+GAUSSIAN_TRUNCATE = 3.5
+GAUSSIAN_WINDOW = 11
+
+# Normalized taps of the Gaussian window, as built by ndimage
+_GAUSSIAN_WEIGHTS = np.exp(-0.5 * (np.arange(GAUSSIAN_WINDOW) - GAUSSIAN_WINDOW // 2) ** 2
+                           / GAUSSIAN_SIGMA ** 2)
+_GAUSSIAN_WEIGHTS = (_GAUSSIAN_WEIGHTS / _GAUSSIAN_WEIGHTS.sum()).astype(np.float32)
+
+
+@dataclass
+class SSIMMoments:
+    """Local statistics of one image: planes, windowed mean and variance."""
+    planes: np.ndarray  # (C, H, W) float32
+    mu: np.ndarray
+    var: np.ndarray
+
+
+def to_planes(frame: np.ndarray, per_channel: bool = False) -> np.ndarray:
+    """Convert an RGB(A) frame to (C, H, W) float32: luma, or one plane per RGB channel."""
+    if per_channel:
+        return np.ascontiguousarray(frame[:, :, :3].transpose(2, 0, 1), dtype=np.float32)
+    planes = np.empty((1,) + frame.shape[:2], dtype=np.float32)
+    gray = planes[0]
+    np.multiply(frame[:, :, 0], np.float32(0.299), out=gray)
+    gray += np.float32(0.587) * frame[:, :, 1]
+    gray += np.float32(0.114) * frame[:, :, 2]
+    return planes
+
+
+class SSIMMapKernel:
+    """Local SSIM maps from separable float32 filters.
+
+    Matches ``structural_similarity(full=True)`` with its default uniform
+    7x7 window, or its ``gaussian_weights=True`` window. The moments of
+    the ground truth side are cached per ``gt_key``, so comparing
+    several predictions (or redrawing) against the same frame only
+    filters the predicted image and the cross term.
+    """
+
+    def __init__(self, cache_size: int = 8):
+        self._cache_size = max(0, cache_size)
+        self._moments: "OrderedDict[Hashable, SSIMMoments]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _filter(self, planes: np.ndarray, gaussian: bool) -> np.ndarray:
+        """Windowed mean along both image axes, in two 1-D passes."""
+        if gaussian:
+            weights = _GAUSSIAN_WEIGHTS
+            rows = gaussian_filter1d(planes, GAUSSIAN_SIGMA, axis=-1, mode="reflect",
+                                     truncate=GAUSSIAN_TRUNCATE)
+        else:
+            weights = None
+            rows = uniform_filter1d(planes, UNIFORM_WINDOW, axis=-1, mode="reflect")
+
+        # Down the columns, summing shifted rows is much faster than
+        # ndimage's strided pass ("symmetric" is ndimage's "reflect")
+        size = GAUSSIAN_WINDOW if gaussian else UNIFORM_WINDOW
+        h = rows.shape[-2]
+        padded = np.pad(rows, ((0, 0), (size // 2, size // 2), (0, 0)), mode="symmetric")
+        if weights is None:
+            np.copyto(rows, padded[:, :h])
+            for k in range(1, size):
+                rows += padded[:, k:k + h]
+            rows *= np.float32(1 / size)
+        else:
+            np.multiply(padded[:, :h], weights[0], out=rows)
+            term = np.empty_like(rows)
+            for k in range(1, size):
+                np.multiply(padded[:, k:k + h], weights[k], out=term)
+                rows += term
+        return rows
+
+    def _cov_norm(self, gaussian: bool) -> np.float32:
+        # Sample covariance, as skimage's default use_sample_covariance=True
+        n = (GAUSSIAN_WINDOW if gaussian else UNIFORM_WINDOW) ** 2
+        return np.float32(n / (n - 1))
+
+    def moments(self, planes: np.ndarray, gaussian: bool = False) -> SSIMMoments:
+        """Compute the windowed mean and variance of (C, H, W) planes."""
+        mu = self._filter(planes, gaussian)
+        var = self._filter(planes * planes, gaussian)
+        var -= mu * mu
+        var *= self._cov_norm(gaussian)
+        return SSIMMoments(planes, mu, var)
+
+    def _gt_moments(self, gt: np.ndarray, per_channel: bool, gaussian: bool,
+                    gt_key: Optional[Hashable]) -> SSIMMoments:
+        if gt_key is None or self._cache_size == 0:
+            return self.moments(to_planes(gt, per_channel), gaussian)
+        key = (gt_key, gt.shape, per_channel, gaussian)
+        with self._lock:
+            moments = self._moments.get(key)
+            if moments is not None:
+                self._moments.move_to_end(key)
+                return moments
+        moments = self.moments(to_planes(gt, per_channel), gaussian)
+        with self._lock:
+            self._moments[key] = moments
+            while len(self._moments) > self._cache_size:
+                self._moments.popitem(last=False)
+        return moments
+
+    def ssim_map(self, gt: np.ndarray, pred: np.ndarray, per_channel: bool = False,
+                 gaussian: bool = False, gt_key: Optional[Hashable] = None) -> np.ndarray:
+        """Return the (H, W) float32 SSIM map of two RGB(A) frames.
+
+        With ``per_channel`` the map is the mean of the R, G and B maps,
+        otherwise it is computed on luma. ``gt_key`` identifies the
+        ground truth frame (and region) for moment caching.
+        """
+        x = self._gt_moments(gt, per_channel, gaussian, gt_key)
+        y = self.moments(to_planes(pred, per_channel), gaussian)
+        return self._combine(x, y, gaussian).mean(axis=0)
+
+    def mean_ssim(self, gt_planes: np.ndarray, pred_planes: np.ndarray,
+                  gaussian: bool = False) -> float:
+        """Mean SSIM of two (C, H, W) float32 plane stacks.
+
+        Matches the scalar ``structural_similarity`` returns for one
+        plane: the map is averaged without its half-window border, and
+        planes smaller than the window raise ValueError.
+        """
+        window = GAUSSIAN_WINDOW if gaussian else UNIFORM_WINDOW
+        if min(gt_planes.shape[-2:]) < window:
+            raise ValueError(f"Planes of {gt_planes.shape[-2:]} are smaller "
+                             f"than the {window}x{window} SSIM window")
+        x = self.moments(gt_planes, gaussian)
+        y = self.moments(pred_planes, gaussian)
+        pad = (window - 1) // 2
+        ssim = self._combine(x, y, gaussian)[:, pad:-pad, pad:-pad]
+        return float(ssim.mean(dtype=np.float64))
+
+    def _combine(self, x: SSIMMoments, y: SSIMMoments, gaussian: bool) -> np.ndarray:
+        """Per-plane (C, H, W) SSIM maps from the moments of both images."""
+        cov_norm = self._cov_norm(gaussian)
+        c1 = np.float32((K1 * DATA_RANGE) ** 2)
+        c2 = np.float32((K2 * DATA_RANGE) ** 2)
+
+        # Covariance: cov_norm * (E[xy] - mu_x mu_y)
+        mu_xy = x.mu * y.mu
+        cov = self._filter(x.planes * y.planes, gaussian)
+        cov -= mu_xy
+        cov *= cov_norm
+
+        # Numerator: (2 mu_x mu_y + C1)(2 cov + C2)
+        mu_xy *= 2
+        mu_xy += c1
+        cov *= 2
+        cov += c2
+        numerator = mu_xy
+        numerator *= cov
+
+        # Denominator: (mu_x^2 + mu_y^2 + C1)(var_x + var_y + C2)
+        denominator = x.mu * x.mu
+        denominator += y.mu * y.mu
+        denominator += c1
+        var_sum = np.add(x.var, y.var, out=cov)
+        var_sum += c2
+        denominator *= var_sum
+
+        numerator /= denominator
+        return numerator
+
+    def clear(self):
+        with self._lock:
+            self._moments.clear()
+
+
+def benchmark(size: Tuple[int, int] = (720, 1280), repeats: int = 5) -> Dict[str, float]:
+    """Time the kernel against skimage on random frames; returns seconds and max error."""
+    from skimage.metrics import structural_similarity
+
+    rng = np.random.default_rng(0)
+    h, w = size
+    gt = rng.integers(0, 256, (h, w, 4), dtype=np.uint8)
+    noise = rng.integers(-20, 21, (h, w, 4))
+    pred = np.clip(gt.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+    gt_gray = to_planes(gt)[0].astype(np.float64)
+    pred_gray = to_planes(pred)[0].astype(np.float64)
+    kernel = SSIMMapKernel()
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        _, reference = structural_similarity(gt_gray, pred_gray, data_range=DATA_RANGE, full=True)
+    skimage_time = (time.perf_counter() - start) / repeats
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        kernel.ssim_map(gt, pred)
+    kernel_time = (time.perf_counter() - start) / repeats
+
+    kernel.ssim_map(gt, pred, gt_key="benchmark")
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = kernel.ssim_map(gt, pred, gt_key="benchmark")
+    cached_time = (time.perf_counter() - start) / repeats
+
+    return {
+        "skimage": skimage_time,
+        "kernel": kernel_time,
+        "kernel_cached_gt": cached_time,
+        "max_abs_error": float(np.abs(result - reference).max()),
+    }
+
+
+if __name__ == "__main__":
+    for size in [(256, 256), (720, 1280), (2160, 3840)]:
+        results = benchmark(size)
+        print(f"{size[1]}x{size[0]}: skimage {results['skimage'] * 1000:.1f} ms, "
+              f"kernel {results['kernel'] * 1000:.1f} ms, "
+              f"cached GT {results['kernel_cached_gt'] * 1000:.1f} ms, "
+              f"max error {results['max_abs_error']:.2e}")
@@ -1,9 +1,11 @@
 from PyQt5.QtWidgets import (QWidget, QHBoxLayout, QVBoxLayout, QScrollArea,
                              QPushButton, QLabel, QFileDialog, QFrame)
-from PyQt5.QtCore import Qt, pyqtSignal
-from PyQt5.QtGui import QPixmap, QImage, QPainter, QPen, QColor
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
+from PyQt5.QtGui import QPixmap, QPainter, QPen, QColor
 import numpy as np
-from typing import List, Optional
+from typing import Callable, List, Optional
+
+from src.widgets.viewport import array_to_qimage
 
 
 class FrameThumbnail(QLabel):
@@ -14,6 +16,7 @@ class FrameThumbnail(QLabel):
     def __init__(self, index: int, parent=None):
         super().__init__(parent)
         self.index = index
+        self.has_image = False
         self._selected = False
         self.setFixedSize(64, 64)
         self.setAlignment(Qt.AlignCenter)
@@ -24,21 +27,11 @@ class FrameThumbnail(QLabel):
         if image is None:
             return
 
-        image = np.ascontiguousarray(image)
-        h, w = image.shape[:2]
-
-        if image.shape[-1] == 4:
-            fmt = QImage.Format_RGBA8888
-            bytes_per_line = w * 4
-        else:
-            fmt = QImage.Format_RGB888
-            bytes_per_line = w * 3
-
-        qimg = QImage(image.tobytes(), w, h, bytes_per_line, fmt)
-        pixmap = QPixmap.fromImage(qimg).scaled(
+        pixmap = QPixmap.fromImage(array_to_qimage(image)).scaled(
             60, 60, Qt.KeepAspectRatio, Qt.SmoothTransformation
         )
         self.setPixmap(pixmap)
+        self.has_image = True
 
     def set_selected(self, selected: bool):
         """Set selection state."""
@@ -65,6 +58,12 @@ class FrameStrip(QWidget):
         self._label = label
         self._thumbnails: List[FrameThumbnail] = []
         self._selected_index = 0
+        # Provides images for thumbnails added without one, once they scroll into view
+        self.thumbnail_source: Optional[Callable[[int], Optional[np.ndarray]]] = None
+        self._fill_timer = QTimer(self)
+        self._fill_timer.setSingleShot(True)
+        self._fill_timer.setInterval(0)
+        self._fill_timer.timeout.connect(self._fill_visible)
         self._setup_ui()
 
     def _setup_ui(self):
@@ -112,6 +111,9 @@ class FrameStrip(QWidget):
         self.scroll_layout.addStretch()
 
         self.scroll_area.setWidget(self.scroll_widget)
+        # valueChanged passes the position, which QTimer.start would take as an interval
+        self.scroll_area.horizontalScrollBar().valueChanged.connect(
+            lambda _: self._fill_timer.start())
         layout.addWidget(self.scroll_area)
 
     def set_thumbnails(self, thumbnails: List[np.ndarray]):
@@ -134,6 +136,42 @@ class FrameStrip(QWidget):
 
         if self._thumbnails:
             self.set_selected(min(self._selected_index, len(self._thumbnails) - 1))
+        self._fill_timer.start()
+
+    def add_thumbnail(self, image: np.ndarray):
+        """Append one thumbnail, e.g. while frames are still loading."""
+        i = len(self._thumbnails)
+        thumb = FrameThumbnail(i)
+        thumb.set_image(image)
+        thumb.clicked.connect(self._on_thumb_clicked)
+        self._thumbnails.append(thumb)
+        self.scroll_layout.insertWidget(i, thumb)
+
+        self.total_label.setText(f"TOTAL: {len(self._thumbnails)}")
+
+        if i == self._selected_index:
+            thumb.set_selected(True)
+        if not thumb.has_image:
+            self._fill_timer.start()
+
+    def _fill_visible(self):
+        """Fill thumbnails in view that have no image from ``thumbnail_source``."""
+        if self.thumbnail_source is None or not self._thumbnails:
+            return
+        # Thumbnails are fixed-size, so the visible ones follow from the scroll position
+        margin = self.scroll_layout.contentsMargins().left()
+        left = self.scroll_area.horizontalScrollBar().value() - margin
+        right = left + self.scroll_area.viewport().width()
+        pitch = self._thumbnails[0].width() + self.scroll_layout.spacing()
+        first = max(0, left // pitch)
+        last = min(len(self._thumbnails) - 1, right // pitch)
+        for thumb in self._thumbnails[first:last + 1]:
+            if not thumb.has_image:
+                thumb.set_image(self.thumbnail_source(thumb.index))
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._fill_timer.start()
 
     def update_thumbnail(self, index: int, image: np.ndarray):
         """Update a single thumbnail."""
@@ -1,14 +1,22 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTableWidget,
                              QTableWidgetItem, QGroupBox, QLabel, QPushButton,
-                             QCheckBox, QHeaderView, QFileDialog, QProgressDialog)
+                             QCheckBox, QHeaderView, QFileDialog, QProgressDialog,
+                             QSpinBox)
 from PyQt5.QtCore import Qt, pyqtSignal, QThread
 from PyQt5.QtGui import QPainter, QPen, QColor
 import numpy as np
-from typing import List, Optional
+import os
+from typing import FrozenSet, List, Optional, Tuple
 import json
 import csv
 
-from src.metrics import MetricsCalculator, FrameMetrics, SequenceMetrics
+from src.metrics import (MetricsCalculator, FrameMetrics, SequenceMetrics, METRIC_NAMES,
+                         TORCH_METRICS)
+
+
+def _format(value: Optional[float], spec: str) -> str:
+    """Format a metric value, or "--" when it wasn't computed."""
+    return "--" if value is None else format(value, spec)
 
 
 class MetricsGraph(QWidget):
@@ -199,6 +207,30 @@ class MetricsTab(QWidget):
 
         export_layout.addStretch()
 
+        # Metrics to compute; LPIPS and MS-SSIM need torch and are the slow ones
+        export_layout.addWidget(QLabel("COMPUTE:"))
+        self._compute_checks = {}
+        for name in METRIC_NAMES:
+            check = QCheckBox(name.upper())
+            check.setChecked(True)
+            if name in TORCH_METRICS:
+                check.setToolTip("Needs torch; slow on large sequences")
+            self._compute_checks[name] = check
+            export_layout.addWidget(check)
+
+        # Frames are spread over a pool of this many threads (or processes)
+        export_layout.addWidget(QLabel("WORKERS:"))
+        self.workers_spin = QSpinBox()
+        self.workers_spin.setRange(1, max(64, os.cpu_count() or 1))
+        # Serial by default: a thread pool loads one LPIPS model per thread
+        self.workers_spin.setValue(1)
+        export_layout.addWidget(self.workers_spin)
+
+        self.processes_check = QCheckBox("PROCESSES")
+        self.processes_check.setToolTip("Use worker processes instead of threads; "
+                                        "each loads its own LPIPS model")
+        export_layout.addWidget(self.processes_check)
+
         self.calculate_btn = QPushButton("CALCULATE METRICS")
         self.calculate_btn.clicked.connect(self._request_calculate)
         export_layout.addWidget(self.calculate_btn)
@@ -216,52 +248,74 @@ class MetricsTab(QWidget):
         # This will be connected by the main app
         pass
 
-    def calculate_metrics(self, gt_frames: List[np.ndarray], pred_frames: List[np.ndarray]):
-        """Calculate metrics for given frames."""
+    def selected_metrics(self) -> FrozenSet[str]:
+        """Metrics ticked under COMPUTE."""
+        return frozenset(name for name, check in self._compute_checks.items()
+                         if check.isChecked())
+
+    def worker_settings(self) -> Tuple[int, bool]:
+        """(workers, processes) for metric calculators."""
+        return self.workers_spin.value(), self.processes_check.isChecked()
+
+    def calculate_metrics(self, gt_frames: List[np.ndarray], pred_frames: List[np.ndarray],
+                          metrics: Optional[FrozenSet[str]] = None):
+        """Calculate metrics for given frames; defaults to the metrics ticked under COMPUTE."""
+        if metrics is None:
+            metrics = self.selected_metrics()
+        self._calculator.set_workers(*self.worker_settings())
         self._sequence_metrics, self._frame_metrics = \
-            self._calculator.calculate_sequence_metrics(gt_frames, pred_frames)
+            self._calculator.calculate_sequence_metrics(gt_frames, pred_frames, metrics)
         self._update_display()
 
     def _update_display(self):
         """Update UI with calculated metrics."""
         if self._sequence_metrics:
-            self.psnr_label.setText(f"PSNR: {self._sequence_metrics.psnr:.2f} dB")
-            self.ssim_label.setText(f"SSIM: {self._sequence_metrics.ssim:.4f}")
-            self.ms_ssim_label.setText(f"MS-SSIM: {self._sequence_metrics.ms_ssim:.4f}")
-            self.lpips_label.setText(f"LPIPS: {self._sequence_metrics.lpips:.4f}")
-            self.mse_label.setText(f"MSE: {self._sequence_metrics.mse:.6f}")
-            self.mae_label.setText(f"MAE: {self._sequence_metrics.mae:.6f}")
+            self.set_sequence_metrics(self._sequence_metrics)
 
         # Update table
         self.table.setRowCount(len(self._frame_metrics))
         for i, fm in enumerate(self._frame_metrics):
             self.table.setItem(i, 0, QTableWidgetItem(f"{fm.frame_index:04d}"))
-            self.table.setItem(i, 1, QTableWidgetItem(f"{fm.psnr:.2f}"))
-            self.table.setItem(i, 2, QTableWidgetItem(f"{fm.ssim:.4f}"))
-            self.table.setItem(i, 3, QTableWidgetItem(f"{fm.ms_ssim:.4f}"))
-            self.table.setItem(i, 4, QTableWidgetItem(f"{fm.lpips:.4f}"))
-            self.table.setItem(i, 5, QTableWidgetItem(f"{fm.mse:.6f}"))
-            self.table.setItem(i, 6, QTableWidgetItem(f"{fm.mae:.6f}"))
-
-        # Update graph
+            self.table.setItem(i, 1, QTableWidgetItem(_format(fm.psnr, ".2f")))
+            self.table.setItem(i, 2, QTableWidgetItem(_format(fm.ssim, ".4f")))
+            ms_ssim_item = QTableWidgetItem(_format(fm.ms_ssim, ".4f")
+                                            + ("*" if fm.ms_ssim_fallback else ""))
+            if fm.ms_ssim_fallback:
+                ms_ssim_item.setToolTip("Frame too small for MS-SSIM; value is single-scale SSIM")
+            self.table.setItem(i, 3, ms_ssim_item)
+            self.table.setItem(i, 4, QTableWidgetItem(_format(fm.lpips, ".4f")))
+            self.table.setItem(i, 5, QTableWidgetItem(_format(fm.mse, ".6f")))
+            self.table.setItem(i, 6, QTableWidgetItem(_format(fm.mae, ".6f")))
+
+        # Update graph with the metrics that were computed
         self.graph.clear()
         if self._frame_metrics:
-            self.graph.set_data("psnr", [m.psnr for m in self._frame_metrics])
-            self.graph.set_data("ssim", [m.ssim for m in self._frame_metrics])
-            self.graph.set_data("ms_ssim", [m.ms_ssim for m in self._frame_metrics])
-            self.graph.set_data("lpips", [m.lpips for m in self._frame_metrics])
-            self.graph.set_data("mse", [m.mse for m in self._frame_metrics])
-            self.graph.set_data("mae", [m.mae for m in self._frame_metrics])
+            for name in METRIC_NAMES:
+                values = [getattr(m, name) for m in self._frame_metrics]
+                if None not in values:
+                    self.graph.set_data(name, values)
 
     def set_sequence_metrics(self, metrics: SequenceMetrics):
         """Set sequence metrics directly (for averaging)."""
         self._sequence_metrics = metrics
-        self.psnr_label.setText(f"PSNR: {metrics.psnr:.2f} dB")
-        self.ssim_label.setText(f"SSIM: {metrics.ssim:.4f}")
-        self.ms_ssim_label.setText(f"MS-SSIM: {metrics.ms_ssim:.4f}")
-        self.lpips_label.setText(f"LPIPS: {metrics.lpips:.4f}")
-        self.mse_label.setText(f"MSE: {metrics.mse:.6f}")
-        self.mae_label.setText(f"MAE: {metrics.mae:.6f}")
+        psnr = _format(metrics.psnr, ".2f")
+        self.psnr_label.setText(f"PSNR: {psnr} dB" if metrics.psnr is not None else "PSNR: --")
+        self.ssim_label.setText(f"SSIM: {_format(metrics.ssim, '.4f')}")
+        self.ms_ssim_label.setText(self._ms_ssim_text(metrics))
+        self.lpips_label.setText(f"LPIPS: {_format(metrics.lpips, '.4f')}")
+        self.mse_label.setText(f"MSE: {_format(metrics.mse, '.6f')}")
+        self.mae_label.setText(f"MAE: {_format(metrics.mae, '.6f')}")
+
+    def _ms_ssim_text(self, metrics: SequenceMetrics) -> str:
+        """MS-SSIM label, noting frames that fell back to single-scale SSIM."""
+        text = f"MS-SSIM: {_format(metrics.ms_ssim, '.4f')}"
+        if metrics.ms_ssim is None:
+            return text
+        if metrics.ms_ssim_fallback_frames >= metrics.frame_count > 0:
+            return text + " (ALL SSIM FALLBACK)"
+        if metrics.ms_ssim_fallback_frames:
+            return text + f" ({metrics.ms_ssim_fallback_frames} SSIM FALLBACK)"
+        return text
 
     def _export_csv(self):
         path, _ = QFileDialog.getSaveFileName(
@@ -270,11 +324,12 @@ class MetricsTab(QWidget):
         if path:
             with open(path, 'w', newline='') as f:
                 writer = csv.writer(f)
-                writer.writerow(["frame", "psnr", "ssim", "ms_ssim", "lpips", "mse", "mae"])
+                writer.writerow(["frame", "psnr", "ssim", "ms_ssim", "lpips", "mse", "mae",
+                                 "ms_ssim_fallback"])
                 for fm in self._frame_metrics:
                     writer.writerow([
                         fm.frame_index, fm.psnr, fm.ssim, fm.ms_ssim,
-                        fm.lpips, fm.mse, fm.mae
+                        fm.lpips, fm.mse, fm.mae, int(fm.ms_ssim_fallback)
                     ])
 
     def _export_json(self):
@@ -291,6 +346,8 @@ class MetricsTab(QWidget):
                     "mse": self._sequence_metrics.mse if self._sequence_metrics else 0,
                     "mae": self._sequence_metrics.mae if self._sequence_metrics else 0,
                     "frame_count": self._sequence_metrics.frame_count if self._sequence_metrics else 0,
+                    "ms_ssim_fallback_frames": (self._sequence_metrics.ms_ssim_fallback_frames
+                                                if self._sequence_metrics else 0),
                 },
                 "frames": [
                     {
@@ -301,6 +358,7 @@ class MetricsTab(QWidget):
                         "lpips": fm.lpips,
                         "mse": fm.mse,
                         "mae": fm.mae,
+                        "ms_ssim_fallback": fm.ms_ssim_fallback,
                     }
                     for fm in self._frame_metrics
                 ]
@@ -308,6 +366,10 @@ class MetricsTab(QWidget):
             with open(path, 'w') as f:
                 json.dump(data, f, indent=2)
 
+    def shutdown(self):
+        """Stop the metric worker pool."""
+        self._calculator.shutdown()
+
     def clear(self):
         """Clear all metrics."""
         self._frame_metrics = []
@@ -1,15 +1,25 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QGroupBox,
                              QRadioButton, QButtonGroup, QCheckBox, QSpinBox,
-                             QDoubleSpinBox, QLabel, QPushButton, QColorDialog)
-from PyQt5.QtCore import pyqtSignal
+                             QDoubleSpinBox, QLabel, QPushButton, QColorDialog,
+                             QComboBox, QSlider)
+from PyQt5.QtCore import Qt, pyqtSignal
 from PyQt5.QtGui import QColor
+from typing import Optional
+from src.colormaps import colormap_names
 from src.overlay_engine import OverlayMode
+from src.resize_cache import DEFAULT_RESIZE_FILTER, resize_filter_names
 
 
 class OverlayModePanel(QWidget):
     """Panel for selecting overlay mode."""
 
     mode_changed = pyqtSignal(OverlayMode)
+    colormap_changed = pyqtSignal(object)  # colormap name, or None for default
+    blend_alpha_changed = pyqtSignal(float)
+    ssim_options_changed = pyqtSignal(bool, bool)  # per channel, gaussian window
+    resize_filter_changed = pyqtSignal(str)
+    pre_resize_changed = pyqtSignal(bool)
+    flicker_interval_changed = pyqtSignal(int)  # milliseconds per image
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -35,7 +45,7 @@ class OverlayModePanel(QWidget):
         )
 
         self.blend_radio = QRadioButton("BLEND 50%")
-        self.blend_radio.setToolTip("Blends both frames at 50% opacity each")
+        self.blend_radio.setToolTip("Blends both frames; the slider sets the predicted weight")
 
         self.side_by_side_radio = QRadioButton("SIDE BY SIDE")
         self.side_by_side_radio.setToolTip("Ground truth on left, predicted on right")
@@ -78,6 +88,85 @@ class OverlayModePanel(QWidget):
         group_layout.addLayout(right_layout)
         layout.addWidget(group)
 
+        # Heatmap colormap
+        colormap_layout = QHBoxLayout()
+        colormap_layout.addWidget(QLabel("COLORMAP:"))
+        self.colormap_combo = QComboBox()
+        self.colormap_combo.setToolTip("Colormap for DIFFERENCE and SSIM MAP heatmaps")
+        self.colormap_combo.addItem("DEFAULT", None)
+        for name in colormap_names():
+            self.colormap_combo.addItem(name.replace("_", "-").upper(), name)
+        self.colormap_combo.currentIndexChanged.connect(
+            lambda _: self.colormap_changed.emit(self.get_colormap())
+        )
+        colormap_layout.addWidget(self.colormap_combo)
+        colormap_layout.addStretch()
+        layout.addLayout(colormap_layout)
+
+        # Blend weight of the predicted frame
+        blend_layout = QHBoxLayout()
+        blend_layout.addWidget(QLabel("BLEND:"))
+        self.blend_slider = QSlider(Qt.Horizontal)
+        self.blend_slider.setMinimum(0)
+        self.blend_slider.setMaximum(100)
+        self.blend_slider.setValue(50)
+        self.blend_slider.setToolTip("0% = ground truth only, 100% = predicted only")
+        self.blend_slider.valueChanged.connect(self._on_blend_changed)
+        blend_layout.addWidget(self.blend_slider)
+        layout.addLayout(blend_layout)
+
+        # SSIM map options
+        ssim_layout = QHBoxLayout()
+        self.ssim_rgb_check = QCheckBox("SSIM PER CHANNEL")
+        self.ssim_rgb_check.setToolTip("Average SSIM over R, G and B instead of using luminance")
+        self.ssim_rgb_check.stateChanged.connect(self._on_ssim_options_changed)
+        ssim_layout.addWidget(self.ssim_rgb_check)
+        self.ssim_gaussian_check = QCheckBox("GAUSSIAN WINDOW")
+        self.ssim_gaussian_check.setToolTip("11x11 Gaussian window (sigma 1.5) instead of 7x7 uniform")
+        self.ssim_gaussian_check.stateChanged.connect(self._on_ssim_options_changed)
+        ssim_layout.addWidget(self.ssim_gaussian_check)
+        ssim_layout.addStretch()
+        layout.addLayout(ssim_layout)
+
+        # Flicker rate
+        flicker_layout = QHBoxLayout()
+        flicker_layout.addWidget(QLabel("FLICKER:"))
+        self.flicker_spin = QSpinBox()
+        self.flicker_spin.setMinimum(20)
+        self.flicker_spin.setMaximum(2000)
+        self.flicker_spin.setSingleStep(20)
+        self.flicker_spin.setValue(200)
+        self.flicker_spin.setSuffix(" ms")
+        self.flicker_spin.setToolTip("How long each frame is shown in FLICKER mode")
+        self.flicker_spin.valueChanged.connect(self.flicker_interval_changed.emit)
+        flicker_layout.addWidget(self.flicker_spin)
+        flicker_layout.addStretch()
+        layout.addLayout(flicker_layout)
+
+        # Matching predicted frames of another size to the ground truth
+        resize_layout = QHBoxLayout()
+        resize_layout.addWidget(QLabel("RESIZE:"))
+        self.resize_combo = QComboBox()
+        self.resize_combo.setToolTip(
+            "Filter for resizing predicted frames to the ground truth size.\n"
+            "NEAREST keeps pixels exact, AREA averages when shrinking."
+        )
+        for name in resize_filter_names():
+            self.resize_combo.addItem(name.upper(), name)
+        self.resize_combo.setCurrentIndex(self.resize_combo.findData(DEFAULT_RESIZE_FILTER))
+        self.resize_combo.currentIndexChanged.connect(
+            lambda _: self.resize_filter_changed.emit(self.get_resize_filter())
+        )
+        resize_layout.addWidget(self.resize_combo)
+        self.pre_resize_check = QCheckBox("PRE-RESIZE ON LOAD")
+        self.pre_resize_check.setToolTip("Resize the whole predicted sequence in the background")
+        self.pre_resize_check.stateChanged.connect(
+            lambda _: self.pre_resize_changed.emit(self.pre_resize_check.isChecked())
+        )
+        resize_layout.addWidget(self.pre_resize_check)
+        resize_layout.addStretch()
+        layout.addLayout(resize_layout)
+
         # Button group
         self.button_group = QButtonGroup(self)
         self.button_group.addButton(self.normal_radio, 0)
@@ -107,11 +196,35 @@ class OverlayModePanel(QWidget):
         mode = self._modes.get(mode_id, OverlayMode.BLEND)
         self.mode_changed.emit(mode)
 
+    def _on_blend_changed(self, value: int):
+        self.blend_radio.setText(f"BLEND {value}%")
+        self.blend_alpha_changed.emit(value / 100.0)
+
+    def _on_ssim_options_changed(self):
+        self.ssim_options_changed.emit(self.ssim_rgb_check.isChecked(),
+                                       self.ssim_gaussian_check.isChecked())
+
+    def get_blend_alpha(self) -> float:
+        """Get predicted frame weight for blend mode."""
+        return self.blend_slider.value() / 100.0
+
     def get_mode(self) -> OverlayMode:
         """Get current mode."""
         mode_id = self.button_group.checkedId()
         return self._modes.get(mode_id, OverlayMode.BLEND)
 
+    def get_colormap(self) -> Optional[str]:
+        """Get selected heatmap colormap, None for each mode's default."""
+        return self.colormap_combo.currentData()
+
+    def get_flicker_interval(self) -> int:
+        """Get milliseconds each image is shown in flicker mode."""
+        return self.flicker_spin.value()
+
+    def get_resize_filter(self) -> str:
+        """Get selected resampling filter name."""
+        return self.resize_combo.currentData()
+
 
 class GridOverlayPanel(QWidget):
     """Panel for grid overlay settings."""
@@ -1,6 +1,7 @@
 from PyQt5.QtWidgets import (QWidget, QHBoxLayout, QPushButton, QSlider,
                              QLabel, QComboBox, QSpinBox)
 from PyQt5.QtCore import Qt, QTimer, pyqtSignal
+from typing import Callable, Optional
 
 
 class PlaybackControls(QWidget):
@@ -17,6 +18,10 @@ class PlaybackControls(QWidget):
         self._playing = False
         self._base_interval = 100  # ms
         self._speed = 1.0
+        self._dropped_frames = 0
+        # Optional check that the next frame is rendered; playback holds
+        # the current frame instead of blocking when it isn't
+        self.frame_ready: Optional[Callable[[int], bool]] = None
 
         self._timer = QTimer(self)
         self._timer.timeout.connect(self._on_timer)
@@ -87,12 +92,22 @@ class PlaybackControls(QWidget):
         self.speed_combo.currentTextChanged.connect(self._on_speed_change)
         layout.addWidget(self.speed_combo)
 
+        layout.addSpacing(10)
+
+        self.dropped_label = QLabel("DROPPED: 0")
+        self.dropped_label.setToolTip("Ticks where the next frame was not rendered in time")
+        layout.addWidget(self.dropped_label)
+
         layout.addStretch()
 
     def _on_timer(self):
         try:
             if self._frame_count > 0:
                 next_frame = (self._current_frame + 1) % self._frame_count
+                if self.frame_ready is not None and not self.frame_ready(next_frame):
+                    self._dropped_frames += 1
+                    self.dropped_label.setText(f"DROPPED: {self._dropped_frames}")
+                    return
                 self.set_frame(next_frame)
         except Exception as e:
             print(f"Timer error: {e}")
@@ -138,6 +153,10 @@ class PlaybackControls(QWidget):
         """Get current frame index."""
         return self._current_frame
 
+    def get_dropped_frames(self) -> int:
+        """Number of frames dropped since playback started."""
+        return self._dropped_frames
+
     def toggle_play(self):
         """Toggle playback."""
         if self._playing:
@@ -149,6 +168,8 @@ class PlaybackControls(QWidget):
         """Start playback."""
         if self._frame_count > 0:
             self._playing = True
+            self._dropped_frames = 0
+            self.dropped_label.setText("DROPPED: 0")
             interval = int(self._base_interval / self._speed)
             self._timer.start(max(10, interval))
             self.play_btn.setText("||")
@@ -1,15 +1,107 @@
 from PyQt5.QtWidgets import (QGraphicsView, QGraphicsScene, QGraphicsPixmapItem,
-                             QWidget, QVBoxLayout, QHBoxLayout, QSlider, QLabel,
-                             QPushButton)
-from PyQt5.QtCore import Qt, pyqtSignal
-from PyQt5.QtGui import QPixmap, QImage, QWheelEvent, QMouseEvent
+                             QGraphicsItem, QWidget, QVBoxLayout, QHBoxLayout, QSlider,
+                             QLabel, QPushButton)
+from PyQt5.QtCore import Qt, QRectF, QTimer, pyqtSignal
+from PyQt5.QtGui import QPixmap, QImage, QWheelEvent, QMouseEvent, QColor
+from PyQt5 import sip
+from typing import Optional, Tuple
+import math
 import numpy as np
 
 
+def can_wrap(image: np.ndarray) -> bool:
+    """Whether an array's memory can back a QImage directly."""
+    channels = 1 if image.ndim == 2 else image.shape[-1]
+    if image.dtype != np.uint8 or channels not in (1, 3, 4):
+        return False
+    # Rows may be strided (e.g. a crop), but pixels within a row must be packed
+    if image.ndim == 3 and image.strides[2] != 1:
+        return False
+    return image.strides[1] == channels and image.strides[0] > 0
+
+
+def array_to_qimage(image: np.ndarray) -> QImage:
+    """Wrap a uint8 (H, W), (H, W, 3) or (H, W, 4) array in a QImage.
+
+    No pixels are copied unless the array's layout can't be wrapped. The
+    QImage references the array's memory, so the array is kept alive on
+    the image for as long as it exists.
+    """
+    if not can_wrap(image):
+        image = np.ascontiguousarray(image, dtype=np.uint8)
+
+    h, w = image.shape[:2]
+    if image.ndim == 2:
+        fmt = QImage.Format_Grayscale8
+    elif image.shape[-1] == 4:
+        fmt = QImage.Format_RGBA8888
+    else:
+        fmt = QImage.Format_RGB888
+
+    qimg = QImage(sip.voidptr(image.ctypes.data), w, h, image.strides[0], fmt)
+    qimg._array = image
+    return qimg
+
+
+class GridItem(QGraphicsItem):
+    """Grid lines drawn as vectors over the scene.
+
+    Costs nothing per displayed frame and stays sharp at any zoom. Lines
+    are ``thickness`` scene pixels wide every ``size`` pixels, matching
+    ``GridOverlay`` when it rasterizes the grid into exported frames.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._rect = QRectF()
+        self._size = 32
+        self._thickness = 1
+        self._color = QColor(128, 128, 128, 128)
+        self.setZValue(1)
+        # Needed for option.exposedRect, so only visible lines are drawn
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption)
+
+    def set_rect(self, rect: QRectF):
+        if rect != self._rect:
+            self.prepareGeometryChange()
+            self._rect = QRectF(rect)
+
+    def set_grid(self, size: int, thickness: int, color: Tuple[int, int, int], opacity: float):
+        self._size = max(1, size)
+        self._thickness = max(1, thickness)
+        self._color = QColor(color[0], color[1], color[2], int(round(opacity * 255)))
+        self.update()
+
+    def boundingRect(self) -> QRectF:
+        return self._rect
+
+    def paint(self, painter, option, widget=None):
+        rect = option.exposedRect.intersected(self._rect)
+        if rect.isEmpty():
+            return
+        size, thickness = self._size, self._thickness
+        top, bottom = self._rect.top(), self._rect.bottom()
+        left, right = self._rect.left(), self._rect.right()
+
+        # Vertical lines first, then horizontal ones, blending twice where
+        # they cross as the rasterized grid does
+        x = math.floor(rect.left() / size) * size
+        while x < rect.right():
+            painter.fillRect(QRectF(x, top, thickness, bottom - top).intersected(self._rect),
+                             self._color)
+            x += size
+        y = math.floor(rect.top() / size) * size
+        while y < rect.bottom():
+            painter.fillRect(QRectF(left, y, right - left, thickness).intersected(self._rect),
+                             self._color)
+            y += size
+
+
 class Viewport(QGraphicsView):
     """Main viewport for displaying overlay images with zoom and pan."""
 
     zoom_changed = pyqtSignal(float)
+    visible_rect_changed = pyqtSignal()
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -18,6 +110,17 @@ class Viewport(QGraphicsView):
 
         self._pixmap_item = QGraphicsPixmapItem()
         self._scene.addItem(self._pixmap_item)
+        self._grid_item = GridItem()
+        self._grid_item.setVisible(False)
+        self._scene.addItem(self._grid_item)
+        # Reused staging buffer for images that can't be wrapped as-is
+        self._buffer: Optional[np.ndarray] = None
+        # Flicker: two prepared pixmaps swapped on a timer, nothing re-rendered per tick
+        self._flicker_pixmaps: Optional[Tuple[QPixmap, QPixmap]] = None
+        self._flicker_index = 0
+        self._flicker_timer = QTimer(self)
+        self._flicker_timer.setInterval(200)
+        self._flicker_timer.timeout.connect(self._on_flicker_tick)
 
         self._zoom = 1.0
         self._min_zoom = 0.1
@@ -36,31 +139,93 @@ class Viewport(QGraphicsView):
         self.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
         self.setBackgroundBrush(Qt.black)
 
-    def set_image(self, image: np.ndarray):
-        """Set the displayed image from numpy array."""
+    def set_image(self, image: np.ndarray, offset: Tuple[int, int] = (0, 0),
+                  scene_size: Optional[Tuple[int, int]] = None):
+        """Set the displayed image from numpy array.
+
+        The image may be a region of a larger picture: it is placed at
+        ``offset`` in a scene of ``scene_size`` (width, height), which
+        defaults to the image size.
+        """
         if image is None:
             return
 
-        # Ensure array is contiguous and make a copy to prevent memory issues
-        image = np.ascontiguousarray(image)
+        self._stop_flicker()
+        self._pixmap_item.setPixmap(self._to_pixmap(image))
+        self._place(image, offset, scene_size)
 
-        h, w = image.shape[:2]
-        if len(image.shape) == 2:
-            # Grayscale
-            fmt = QImage.Format_Grayscale8
-            bytes_per_line = w
-        elif image.shape[-1] == 4:
-            fmt = QImage.Format_RGBA8888
-            bytes_per_line = w * 4
-        else:
-            fmt = QImage.Format_RGB888
-            bytes_per_line = w * 3
+    def set_flicker_images(self, first: np.ndarray, second: np.ndarray,
+                           offset: Tuple[int, int] = (0, 0),
+                           scene_size: Optional[Tuple[int, int]] = None):
+        """Alternate between two same-size images at the flicker interval.
+
+        Both are converted to pixmaps once; each tick only swaps which
+        one is shown. Placement works as in ``set_image``.
+        """
+        if first is None or second is None:
+            return
 
-        # Create QImage with explicit bytes per line
-        qimg = QImage(image.tobytes(), w, h, bytes_per_line, fmt)
-        pixmap = QPixmap.fromImage(qimg)
-        self._pixmap_item.setPixmap(pixmap)
-        self._scene.setSceneRect(0, 0, w, h)
+        self._flicker_pixmaps = (self._to_pixmap(first), self._to_pixmap(second))
+        self._pixmap_item.setPixmap(self._flicker_pixmaps[self._flicker_index])
+        self._place(first, offset, scene_size)
+        if not self._flicker_timer.isActive():
+            self._flicker_timer.start()
+
+    def set_flicker_interval(self, interval: int):
+        """Set the time in milliseconds each flicker image is shown."""
+        self._flicker_timer.setInterval(max(1, interval))
+
+    def _on_flicker_tick(self):
+        if self._flicker_pixmaps is None:
+            return
+        self._flicker_index ^= 1
+        self._pixmap_item.setPixmap(self._flicker_pixmaps[self._flicker_index])
+
+    def _stop_flicker(self):
+        self._flicker_timer.stop()
+        self._flicker_pixmaps = None
+        self._flicker_index = 0
+
+    def _to_pixmap(self, image: np.ndarray) -> QPixmap:
+        if not can_wrap(image):
+            if self._buffer is None or self._buffer.shape != image.shape:
+                self._buffer = np.empty(image.shape, dtype=np.uint8)
+            np.copyto(self._buffer, image, casting="unsafe")
+            image = self._buffer
+        # The pixmap takes its own copy, so the array only needs to outlive this call
+        return QPixmap.fromImage(array_to_qimage(image))
+
+    def _place(self, image: np.ndarray, offset: Tuple[int, int],
+               scene_size: Optional[Tuple[int, int]]):
+        h, w = image.shape[:2]
+        self._pixmap_item.setPos(*offset)
+        scene_w, scene_h = scene_size if scene_size is not None else (w, h)
+        if self._scene.sceneRect() != QRectF(0, 0, scene_w, scene_h):
+            self._scene.setSceneRect(0, 0, scene_w, scene_h)
+            self._grid_item.set_rect(self._scene.sceneRect())
+
+    def set_grid(self, enabled: bool, size: int = 32, thickness: int = 1,
+                 color: Tuple[int, int, int] = (128, 128, 128), opacity: float = 0.5):
+        """Show or hide the vector grid over the whole image."""
+        if enabled:
+            self._grid_item.set_grid(size, thickness, color, opacity)
+        self._grid_item.setVisible(enabled)
+
+    def visible_rect(self) -> Tuple[int, int, int, int]:
+        """Part of the scene currently in view, as integer (x, y, width, height)."""
+        rect = self.mapToScene(self.viewport().rect()).boundingRect()
+        rect = rect.intersected(self.sceneRect())
+        x0, y0 = math.floor(rect.left()), math.floor(rect.top())
+        x1, y1 = math.ceil(rect.right()), math.ceil(rect.bottom())
+        return x0, y0, max(0, x1 - x0), max(0, y1 - y0)
+
+    def scrollContentsBy(self, dx: int, dy: int):
+        super().scrollContentsBy(dx, dy)
+        self.visible_rect_changed.emit()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.visible_rect_changed.emit()
 
     def wheelEvent(self, event: QWheelEvent):
         """Handle zoom with mouse wheel."""
@@ -120,11 +285,12 @@ class Viewport(QGraphicsView):
 
     def fit_in_view(self):
         """Fit image to view."""
-        self.fitInView(self._pixmap_item, Qt.KeepAspectRatio)
+        # The scene rect is the full image even when only a region is shown
+        self.fitInView(self.sceneRect(), Qt.KeepAspectRatio)
         # Calculate actual zoom level
-        if self._pixmap_item.pixmap().width() > 0:
+        if self.sceneRect().width() > 0:
             view_width = self.viewport().width()
-            img_width = self._pixmap_item.pixmap().width()
+            img_width = self.sceneRect().width()
             self._zoom = view_width / img_width * self.transform().m11()
             self.zoom_changed.emit(self._zoom)
 
@@ -227,8 +393,21 @@ class ViewportWidget(QWidget):
     def _zoom_out(self):
         self.viewport.set_zoom(self.viewport.get_zoom() / 1.25)
 
-    def set_image(self, image: np.ndarray):
-        self.viewport.set_image(image)
+    def set_image(self, image: np.ndarray, offset: Tuple[int, int] = (0, 0),
+                  scene_size: Optional[Tuple[int, int]] = None):
+        self.viewport.set_image(image, offset, scene_size)
+
+    def set_flicker_images(self, first: np.ndarray, second: np.ndarray,
+                           offset: Tuple[int, int] = (0, 0),
+                           scene_size: Optional[Tuple[int, int]] = None):
+        self.viewport.set_flicker_images(first, second, offset, scene_size)
+
+    def set_flicker_interval(self, interval: int):
+        self.viewport.set_flicker_interval(interval)
+
+    def set_grid(self, enabled: bool, size: int = 32, thickness: int = 1,
+                 color: Tuple[int, int, int] = (128, 128, 128), opacity: float = 0.5):
+        self.viewport.set_grid(enabled, size, thickness, color, opacity)
 
     def set_paths(self, gt_path: str, pred_path: str):
         """Set and display the current file paths."""
@@ -0,0 +1,173 @@
+import threading
+from typing import Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+import numpy as np
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from src.gif_handler import GifHandler, make_thumbnail
+
+
+class GifLoadWorker(QThread):
+    """Loads a GIF into a handler on a background thread, emitting frames as they arrive.
+
+    The handler's storage mode decides what is emitted (see
+    ``GifHandler.iter_load``). Call ``requestInterruption`` to cancel; the worker stops after the
+    frame it is currently decoding.
+    """
+
+    frame_loaded = pyqtSignal(int, object, object, int)  # index, entry, thumbnail, duration
+    load_finished = pyqtSignal(bool)
+
+    def __init__(self, handler: GifHandler, path: str, parent=None):
+        super().__init__(parent)
+        self._handler = handler
+        self._path = path
+
+    def run(self):
+        count = 0
+        try:
+            # Entries go to handler.add_loaded on the GUI thread (None: already stored)
+            for frame, entry, duration in self._handler.iter_load(self._path):
+                if self.isInterruptionRequested():
+                    return
+                # No frame for lazy loads; the strip asks for thumbnails when shown
+                thumbnail = make_thumbnail(frame) if frame is not None else None
+                self.frame_loaded.emit(count, entry, thumbnail, duration)
+                count += 1
+        except Exception as e:
+            print(f"Error loading GIF: {e}")
+        if not self.isInterruptionRequested():
+            self.load_finished.emit(count > 0)
+
+
+class ResizeWorker(QThread):
+    """Resizes a handler's frames into its resize cache in the background."""
+
+    resize_finished = pyqtSignal(int)  # frames cached
+
+    def __init__(self, handler: GifHandler, size: Tuple[int, int], parent=None):
+        super().__init__(parent)
+        self._handler = handler
+        self._size = size
+
+    def run(self):
+        try:
+            count = self._handler.pre_resize(self._size, self.isInterruptionRequested)
+        except Exception as e:
+            print(f"Error resizing frames: {e}")
+            return
+        if not self.isInterruptionRequested():
+            self.resize_finished.emit(count)
+
+
+class PrerenderBuffer:
+    """Thread-safe ring of rendered frames just ahead of the playhead.
+
+    Holds at most ``size`` frames: the ones following the playhead,
+    wrapping around at the end of the sequence. Entries are tagged with
+    the composite cache key they were rendered for, so frames rendered
+    for stale settings or edited frames are never handed out. Frames
+    that failed to render are skipped until the playhead passes them.
+    """
+
+    def __init__(self, size: int = 8):
+        self.size = max(1, size)
+        self._playhead = 0
+        self._entries: Dict[int, Tuple[Hashable, np.ndarray]] = {}
+        self._failed: Set[int] = set()
+        self._cond = threading.Condition()
+
+    def _window(self, frame_count: int) -> List[int]:
+        return [(self._playhead + offset) % frame_count
+                for offset in range(1, min(self.size, frame_count) + 1)]
+
+    def set_playhead(self, index: int, frame_count: int):
+        """Move the playhead, discarding frames that are no longer ahead of it."""
+        with self._cond:
+            self._playhead = index
+            window = set(self._window(frame_count)) if frame_count > 0 else set()
+            for entry_index in list(self._entries):
+                if entry_index not in window:
+                    del self._entries[entry_index]
+            self._failed &= window
+            self._cond.notify_all()
+
+    def next_target(self, frame_count: int, timeout: float = 0.05) -> Optional[int]:
+        """Return the next frame to render, waiting up to ``timeout`` if full."""
+        with self._cond:
+            if frame_count > 0:
+                for index in self._window(frame_count):
+                    if index not in self._entries and index not in self._failed:
+                        return index
+            self._cond.wait(timeout)
+            return None
+
+    def put(self, index: int, key: Hashable, image: np.ndarray, frame_count: int):
+        """Store a rendered frame if it is still ahead of the playhead."""
+        with self._cond:
+            if frame_count > 0 and index in self._window(frame_count):
+                self._entries[index] = (key, image)
+
+    def mark_failed(self, index: int, frame_count: int):
+        """Skip a frame that could not be rendered until the playhead passes it."""
+        with self._cond:
+            if frame_count > 0 and index in self._window(frame_count):
+                self._failed.add(index)
+
+    def is_failed(self, index: int) -> bool:
+        with self._cond:
+            return index in self._failed
+
+    def take(self, index: int, key: Hashable) -> Optional[np.ndarray]:
+        """Return the frame rendered for ``key``; drops it if stale."""
+        with self._cond:
+            entry = self._entries.get(index)
+            if entry is None:
+                return None
+            if entry[0] != key:
+                # Rendered for old settings or an edited frame; re-render
+                del self._entries[index]
+                self._cond.notify_all()
+                return None
+            return entry[1]
+
+    def clear(self):
+        with self._cond:
+            self._entries.clear()
+            self._failed.clear()
+            self._cond.notify_all()
+
+
+class PrerenderWorker(QThread):
+    """Renders composites ahead of the playhead into a PrerenderBuffer.
+
+    ``render`` maps a frame index to (cache key, composite) or None, and
+    must only use state that is safe to read off the GUI thread. Frames
+    it fails on (None or an exception) are marked failed in the buffer
+    and skipped; the worker carries on with the others.
+    """
+
+    def __init__(self, buffer: PrerenderBuffer,
+                 render: Callable[[int], Optional[Tuple[Hashable, np.ndarray]]],
+                 frame_count: Callable[[], int], parent=None):
+        super().__init__(parent)
+        self._buffer = buffer
+        self._render = render
+        self._frame_count = frame_count
+
+    def run(self):
+        while not self.isInterruptionRequested():
+            frame_count = self._frame_count()
+            index = self._buffer.next_target(frame_count)
+            if index is None:
+                continue
+            try:
+                rendered = self._render(index)
+            except Exception as e:
+                print(f"Prerender error on frame {index}: {e}")
+                rendered = None
+            if rendered is None:
+                self._buffer.mark_failed(index, frame_count)
+                continue
+            key, image = rendered
+            self._buffer.put(index, key, image, frame_count)
@@ -0,0 +1,76 @@
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+# Widgets are created without a display
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+
+def make_gif(path, disposal=1, transparency=True, local_palettes=False,
+             count=6, size=(48, 40)):
+    """Write an animated GIF of small squares moving over a noisy first frame.
+
+    Later frames only change a few pixels, so the writer stores them as
+    sub-rectangles and disposal decides what the rest of the canvas shows.
+    Without ``local_palettes`` every frame uses the one global palette.
+    """
+    rng = np.random.default_rng(count)
+    w, h = size
+    base = rng.integers(1, 16, (h, w)).astype(np.uint8)
+    global_palette = rng.integers(0, 256, 256 * 3).astype(np.uint8).tobytes()
+    frames = []
+    for i in range(count):
+        if i == 0:
+            indices = base
+        else:
+            # Index 0 is transparent; opaque frames repeat the first frame
+            indices = np.zeros((h, w), dtype=np.uint8) if transparency else base.copy()
+            y, x = 3 + 4 * i % (h - 12), 2 + 5 * i % (w - 12)
+            indices[y:y + 10, x:x + 10] = rng.integers(1, 16, (10, 10))
+        frame = Image.fromarray(indices, "P")
+        if local_palettes:
+            frame.putpalette(rng.integers(0, 256, 256 * 3).astype(np.uint8).tobytes())
+        else:
+            frame.putpalette(global_palette)
+        frames.append(frame)
+
+    options = dict(save_all=True, append_images=frames[1:], duration=[40 + 10 * i for i in range(count)],
+                   loop=0, disposal=disposal, optimize=False)
+    if not local_palettes:
+        options["palette"] = global_palette
+    if transparency:
+        options["transparency"] = 0
+    frames[0].save(path, **options)
+    return path
+
+
+def pillow_frames(path):
+    """Reference RGBA frames and durations decoded by Pillow."""
+    frames, durations = [], []
+    with Image.open(path) as img:
+        for i in range(img.n_frames):
+            img.seek(i)
+            frames.append(np.array(img.convert("RGBA")))
+            durations.append(img.info.get("duration", 100))
+    return frames, durations
+
+
+GIF_VARIANTS = [
+    pytest.param(dict(disposal=d, transparency=t, local_palettes=p),
+                 id=f"disposal{d}-{'alpha' if t else 'opaque'}-{'local' if p else 'global'}")
+    for d in (0, 1, 2, 3) for t in (True, False) for p in (False, True)
+] + [pytest.param(dict(disposal=[1, 2, 3, 0, 3, 2], transparency=True, local_palettes=True),
+                  id="mixed-disposal")]
+
+
+@pytest.fixture(params=GIF_VARIANTS)
+def gif_path(request, tmp_path):
+    return str(make_gif(tmp_path / "anim.gif", **request.param))
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    from PyQt5.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
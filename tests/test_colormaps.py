@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from src.colormaps import apply_colormap, colormap_names, get_colormap, register_colormap
+from src.overlay_engine import OverlayEngine, OverlayMode
+
+
+@pytest.mark.parametrize("name", colormap_names())
+def test_apply_colormap_matches_lut_lookup(name):
+    lut = get_colormap(name)
+    assert lut.shape == (256, 4) and lut.dtype == np.uint8
+    values = np.random.default_rng(0).integers(0, 256, (2, 9, 7), dtype=np.uint8)
+    assert np.array_equal(apply_colormap(values, name), lut[values])
+
+    out = np.zeros((2, 9, 7, 4), dtype=np.uint8)
+    assert apply_colormap(values, name, out) is out
+    assert np.array_equal(out, lut[values])
+
+
+def test_builtin_ramps():
+    red_green = get_colormap("red_green")
+    assert tuple(red_green[0]) == (255, 0, 0, 255)
+    assert tuple(red_green[255]) == (0, 255, 0, 255)
+    gray = get_colormap("gray")
+    assert np.array_equal(gray[:, 0], np.arange(256)) and np.all(gray[:, 3] == 255)
+
+
+def test_register_colormap():
+    rgb = np.stack([np.arange(256)[::-1]] * 3, axis=1)
+    register_colormap("inverted", rgb)
+    assert "inverted" in colormap_names()
+    lut = get_colormap("inverted")
+    assert np.array_equal(lut[:, :3], rgb) and np.all(lut[:, 3] == 255)
+
+    with pytest.raises(ValueError):
+        register_colormap("short", np.zeros((128, 3)))
+    with pytest.raises(ValueError):
+        get_colormap("missing")
+
+
+def test_heatmap_modes_use_selected_colormap():
+    rng = np.random.default_rng(1)
+    gt = rng.integers(0, 256, (16, 12, 4), dtype=np.uint8)
+    engine = OverlayEngine()
+    engine.set_mode(OverlayMode.DIFFERENCE)
+    assert np.array_equal(engine.composite(gt, gt), np.broadcast_to(get_colormap("heat")[0], gt.shape))
+
+    engine.set_colormap("viridis")
+    pred = rng.integers(0, 256, gt.shape, dtype=np.uint8)
+    result = engine.composite(gt, pred)
+    lut = get_colormap("viridis")
+    # Every pixel is a viridis entry and the largest difference maps to the top
+    assert np.isin(result.view(np.uint32), lut.view(np.uint32)).all()
+    assert (result.view(np.uint32) == lut.view(np.uint32)[255]).any()
@@ -0,0 +1,124 @@
+import os
+import shutil
+
+import numpy as np
+
+from src.decode_cache import DecodeCache
+
+
+def _frames(count=3, size=(20, 30), value=0):
+    return [np.full(size + (4,), value + i, dtype=np.uint8) for i in range(count)]
+
+
+def _source(tmp_path, name, content):
+    path = tmp_path / name
+    path.write_bytes(content)
+    return path
+
+
+def test_miss_store_hit(tmp_path):
+    cache = DecodeCache(tmp_path / "cache")
+    source = _source(tmp_path, "a.gif", b"a" * 100)
+    assert cache.load(source) is None
+
+    assert cache.store(source, _frames(), [10, 20, 30])
+    frames, durations = cache.load(source)
+    assert isinstance(frames, np.memmap)
+    assert durations == [10, 20, 30]
+    assert all(np.array_equal(frame, expected) for frame, expected in zip(frames, _frames()))
+
+
+def test_changed_file_misses(tmp_path):
+    cache = DecodeCache(tmp_path / "cache")
+    source = _source(tmp_path, "a.gif", b"a" * 100)
+    cache.store(source, _frames(), [10, 20, 30])
+    source.write_bytes(b"b" * 100)
+    os.utime(source, (1, 1))
+    assert cache.load(source) is None
+
+
+def test_copied_or_touched_file_hits_by_content(tmp_path):
+    cache = DecodeCache(tmp_path / "cache")
+    source = _source(tmp_path, "a.gif", b"a" * 100)
+    cache.store(source, _frames(), [10, 20, 30])
+
+    os.utime(source, (1, 1))
+    assert cache.load(source) is not None
+    copy = tmp_path / "copy.gif"
+    shutil.copy(source, copy)
+    assert cache.load(copy)[1] == [10, 20, 30]
+    # Both files share one data file
+    assert len(list(cache.directory.glob("*.npy"))) == 1
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    # One sequence plus room for its .npy header
+    entry_bytes = 20 * 30 * 4 * 3 + 1024
+    cache = DecodeCache(tmp_path / "cache", max_bytes=3 * entry_bytes)
+    sources = [_source(tmp_path, f"{i}.gif", bytes([i]) * 100) for i in range(3)]
+    for i, source in enumerate(sources):
+        assert cache.store(source, _frames(value=i), [10, 20, 30])
+        os.utime(next(cache.directory.glob(f"{cache.content_key(source)}.npy")),
+                 (1000 + i, 1000 + i))
+
+    # Loading marks the oldest entry as recently used
+    assert cache.load(sources[0]) is not None
+    cache.set_max_bytes(2 * entry_bytes)
+    assert cache.load(sources[0]) is not None
+    assert cache.load(sources[1]) is None
+    assert cache.load(sources[2]) is not None
+
+
+def test_sequence_larger_than_cap_is_not_stored(tmp_path):
+    cache = DecodeCache(tmp_path / "cache", max_bytes=100)
+    source = _source(tmp_path, "a.gif", b"a" * 100)
+    assert not cache.store(source, _frames(), [10, 20, 30])
+    assert cache.load(source) is None
+
+
+def test_incomplete_writer_leaves_nothing(tmp_path):
+    cache = DecodeCache(tmp_path / "cache")
+    source = _source(tmp_path, "a.gif", b"a" * 100)
+    writer = cache.writer(source, (20, 30, 4), 3)
+    assert writer.write(_frames()[0])
+    assert not writer.commit([10])
+    assert cache.load(source) is None
+    assert list(cache.directory.iterdir()) == []
+
+    writer = cache.writer(source, (20, 30, 4), 3)
+    assert not writer.write(np.zeros((5, 5, 4), dtype=np.uint8))
+    writer.abort()
+    assert list(cache.directory.iterdir()) == []
+
+
+def test_concurrent_writers_of_one_file(tmp_path):
+    cache = DecodeCache(tmp_path / "cache")
+    source = _source(tmp_path, "a.gif", b"a" * 100)
+    frames = _frames()
+    first = cache.writer(source, (20, 30, 4), 3)
+    second = cache.writer(source, (20, 30, 4), 3)
+    for frame in frames:
+        assert first.write(frame)
+        assert second.write(frame)
+
+    # Aborting one doesn't touch the other's file
+    second.abort()
+    assert first.commit([10, 20, 30])
+    loaded, durations = cache.load(source)
+    assert durations == [10, 20, 30]
+    assert all(np.array_equal(frame, expected) for frame, expected in zip(loaded, frames))
+
+    third = cache.writer(source, (20, 30, 4), 3)
+    for frame in frames:
+        third.write(frame)
+    assert third.commit([10, 20, 30])
+    names = sorted(path.name for path in cache.directory.iterdir())
+    assert len(names) == 2 and not any(".tmp" in name for name in names)
+
+
+def test_clear(tmp_path):
+    cache = DecodeCache(tmp_path / "cache")
+    source = _source(tmp_path, "a.gif", b"a" * 100)
+    cache.store(source, _frames(), [10, 20, 30])
+    cache.clear()
+    assert cache.load(source) is None
@@ -0,0 +1,128 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from src.frame_store import FrameStack, PaletteFrameStore, quantize_rgba
+
+
+def _frames(count=5, size=(20, 16), colors=16, seed=0):
+    rng = np.random.default_rng(seed)
+    palette = rng.integers(0, 256, (colors, 4), dtype=np.uint8)
+    return [palette[rng.integers(0, colors, size)] for _ in range(count)]
+
+
+def assert_frames_equal(frames, expected):
+    assert len(frames) == len(expected)
+    for frame, reference in zip(frames, expected):
+        assert np.array_equal(frame, reference)
+
+
+def test_frame_stack_round_trip():
+    frames = _frames(count=7)
+    stack = FrameStack.from_frames(frames, chunk_size=3)
+    assert_frames_equal(list(stack), frames)
+    assert_frames_equal(stack[2:5], frames[2:5])
+
+    array = stack.as_array(allow_copy=False)
+    assert array.shape == (7, 20, 16, 4)
+    assert np.shares_memory(array, stack[0])
+    assert_frames_equal(array, frames)
+
+
+def test_frame_stack_edits():
+    frames = _frames(count=6)
+    extra = _frames(count=2, seed=1)
+    stack = FrameStack((20, 16, 4), capacity=4, chunk_size=2)
+    for frame in frames:
+        stack.append(frame)
+    del stack[1]
+    stack.insert(0, extra[0])
+    stack.insert(3, extra[1])
+    expected = [extra[0], frames[0], frames[2], extra[1], frames[3], frames[4], frames[5]]
+    assert_frames_equal(list(stack), expected)
+
+    # Out of order, so only a gathered copy exists
+    assert stack.as_array(allow_copy=False) is None
+    assert_frames_equal(stack.as_array(), expected)
+
+    with pytest.raises(ValueError):
+        stack.append(np.zeros((3, 3, 4), dtype=np.uint8))
+
+
+def test_frame_stack_wraps_read_only_array(tmp_path):
+    frames = np.stack(_frames(count=4))
+    path = tmp_path / "frames.npy"
+    np.save(path, frames)
+    stack = FrameStack.from_array(np.load(path, mmap_mode="r"))
+    assert np.shares_memory(stack.as_array(allow_copy=False), stack[0])
+
+    new = _frames(count=1, seed=2)[0]
+    del stack[0]
+    stack.append(new)
+    assert_frames_equal(list(stack), list(frames[1:]) + [new])
+
+
+def test_quantize_rgba_is_lossless():
+    frame = _frames(count=1, colors=200)[0]
+    indices, lut = quantize_rgba(frame)
+    assert indices.dtype == np.uint8 and lut.shape == (256, 4)
+    assert np.array_equal(lut[indices], frame)
+
+    # 300 distinct packed RGBA values
+    many_colors = np.arange(300, dtype=np.uint32).view(np.uint8).reshape(20, 15, 4)
+    assert quantize_rgba(many_colors) is None
+
+
+def test_palette_store_round_trip():
+    frames = _frames(count=4)
+    rgba = np.random.default_rng(3).integers(0, 256, (20, 16, 4), dtype=np.uint8)
+    store = PaletteFrameStore(expand_cache=2)
+    for frame in frames:
+        store.append(frame)
+    store.append(rgba)
+    indices, lut = quantize_rgba(frames[0])
+    store.append_indexed(indices, lut)
+    store.append_entry((indices, lut))
+    store.append_entry(rgba)
+
+    expected = frames + [rgba, frames[0], frames[0], rgba]
+    assert_frames_equal(list(store), expected)
+    assert_frames_equal([store[i] for i in reversed(range(len(store)))], expected[::-1])
+    assert store.get_indexed(0) is not None
+    assert store.get_indexed(4) is None
+
+    del store[0]
+    store.insert(1, frames[0])
+    assert_frames_equal(list(store), [frames[1], frames[0]] + expected[2:])
+
+
+def test_palette_store_counts_shared_palettes_once():
+    frames = _frames(count=3)
+    indices, lut = quantize_rgba(frames[0])
+    store = PaletteFrameStore()
+    for _ in range(3):
+        store.append_indexed(indices.copy(), lut)
+    assert store.nbytes() == 3 * indices.nbytes + lut.nbytes
+
+
+def test_palette_store_reads_from_threads():
+    frames = _frames(count=12, size=(4, 4))
+    store = PaletteFrameStore(expand_cache=3)
+    for frame in frames:
+        store.append(frame)
+
+    def read(seed):
+        order = np.random.default_rng(seed).integers(0, len(frames), 3000)
+        return all(np.array_equal(store[int(i)], frames[i]) for i in order)
+
+    # Switch threads often so cache updates interleave
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            assert all(executor.map(read, range(16)))
+    finally:
+        sys.setswitchinterval(interval)
+    assert len(store._expanded) <= 3
@@ -0,0 +1,35 @@
+import numpy as np
+
+from src.widgets.frame_strip import FrameStrip
+
+
+def test_strip_fills_blank_thumbnails_in_view(qapp):
+    strip = FrameStrip("FRAMES")
+    strip.resize(400, 120)
+    requested = []
+
+    def source(index):
+        requested.append(index)
+        return np.full((64, 64, 4), 255, dtype=np.uint8)
+
+    strip.thumbnail_source = source
+    strip.set_thumbnails([None] * 50)
+    strip.show()
+    qapp.processEvents()
+    assert strip.get_frame_count() == 50
+    assert requested and max(requested) < 10
+    assert all(strip._thumbnails[i].has_image for i in requested)
+    assert not strip._thumbnails[30].has_image
+
+    # Scrolling fills the newly visible ones, each only once
+    strip.scroll_area.horizontalScrollBar().setValue(30 * 68)
+    qapp.processEvents()
+    assert strip._thumbnails[30].has_image
+    assert len(requested) == len(set(requested))
+
+    # Thumbnails given up front are never requested
+    requested.clear()
+    strip.add_thumbnail(np.zeros((64, 64, 4), dtype=np.uint8))
+    qapp.processEvents()
+    assert 50 not in requested
+    strip.close()
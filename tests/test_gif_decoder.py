@@ -0,0 +1,114 @@
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src import gif_decoder
+from src.frame_store import PaletteFrameStore
+from src.gif_decoder import (GifDecoder, LazyFrameSequence, decode_frames,
+                             decode_palette_frames, index_gif, is_single_palette,
+                             sequence_lut)
+from tests.conftest import make_gif, pillow_frames
+
+
+def assert_frames_equal(frames, expected):
+    assert len(frames) == len(expected)
+    for i, (frame, reference) in enumerate(zip(frames, expected)):
+        assert np.array_equal(frame, reference), f"frame {i} differs"
+
+
+def test_index_matches_pillow(gif_path):
+    expected, durations = pillow_frames(gif_path)
+    index = index_gif(gif_path)
+    assert len(index.frames) == len(expected)
+    assert index.size == (expected[0].shape[1], expected[0].shape[0])
+    assert index.durations() == durations
+
+
+def test_decode_frames_matches_pillow(gif_path):
+    expected, _ = pillow_frames(gif_path)
+    index = index_gif(gif_path)
+    assert_frames_equal([frame.copy() for frame in decode_frames(index)], expected)
+
+
+def test_parallel_decode_matches_pillow(gif_path):
+    expected, _ = pillow_frames(gif_path)
+    index = index_gif(gif_path)
+    assert_frames_equal([frame.copy() for frame in decode_frames(index, workers=3)], expected)
+
+
+def test_random_access_matches_pillow(gif_path):
+    expected, _ = pillow_frames(gif_path)
+    decoder = GifDecoder(index_gif(gif_path))
+    try:
+        order = [3, 1, 5, 0, 4, 2, 5]
+        assert_frames_equal([decoder.decode(i) for i in order], [expected[i] for i in order])
+    finally:
+        decoder.close()
+
+
+def test_lazy_sequence_matches_pillow(gif_path):
+    expected, _ = pillow_frames(gif_path)
+    frames = LazyFrameSequence(GifDecoder(index_gif(gif_path)), cache_size=2, prefetch=1)
+    try:
+        assert_frames_equal([frames[i] for i in reversed(range(len(frames)))], expected[::-1])
+        assert_frames_equal(list(frames), expected)
+    finally:
+        frames.close()
+
+
+def test_lazy_sequence_reads_from_threads(tmp_path, monkeypatch):
+    path = str(make_gif(tmp_path / "anim.gif", count=24, disposal=[1, 2, 3, 0] * 6))
+    expected, _ = pillow_frames(path)
+    executors = []
+
+    class CountingExecutor(ThreadPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            # Slow to start, so unguarded lazy creation would race
+            time.sleep(0.01)
+            super().__init__(*args, **kwargs)
+            executors.append(self)
+
+    monkeypatch.setattr(gif_decoder, "ThreadPoolExecutor", CountingExecutor)
+    frames = LazyFrameSequence(GifDecoder(index_gif(path)), cache_size=4, prefetch=3)
+    assert np.array_equal(frames[5], expected[5])
+    barrier = threading.Barrier(6)
+
+    def read(start):
+        # Every thread first makes the same sequential step, then runs from its own start
+        barrier.wait()
+        order = [6] + [(start + i) % len(expected) for i in range(40)]
+        return all(np.array_equal(frames[i], expected[i]) for i in order)
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            assert all(executor.map(read, range(0, 24, 4)))
+    finally:
+        sys.setswitchinterval(interval)
+        frames.close()
+    assert len(executors) == 1
+    assert frames._executor is None
+
+
+def test_palette_frames_match_pillow(gif_path):
+    expected, _ = pillow_frames(gif_path)
+    store = PaletteFrameStore()
+    canvases = []
+    for canvas, entry in decode_palette_frames(index_gif(gif_path)):
+        canvases.append(canvas.copy())
+        store.append_entry(entry)
+    assert_frames_equal(canvases, expected)
+    assert_frames_equal(list(store), expected)
+
+
+def test_indexed_decode_matches_pillow(gif_path):
+    index = index_gif(gif_path)
+    if not is_single_palette(index):
+        return
+    expected, _ = pillow_frames(gif_path)
+    lut = sequence_lut(index)
+    assert_frames_equal([lut[indices] for indices in decode_frames(index, indexed=True)], expected)
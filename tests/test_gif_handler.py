@@ -0,0 +1,149 @@
+import numpy as np
+import pytest
+
+from src.decode_cache import DecodeCache
+from src.frame_store import FrameStack, PaletteFrameStore
+from src.gif_decoder import LazyFrameSequence
+from src.gif_handler import GifHandler
+from tests.conftest import make_gif, pillow_frames
+
+STORAGE = {
+    "list": list,
+    "stack": FrameStack,
+    "palette": PaletteFrameStore,
+    "lazy": LazyFrameSequence,
+}
+
+
+def _handler(mode, cache=None):
+    lazy = mode == "lazy"
+    return GifHandler(lazy=lazy, storage="list" if lazy else mode, decode_cache=cache)
+
+
+def _progressive_load(handler, path):
+    for _, entry, duration in handler.iter_load(path):
+        if entry is not None:
+            handler.add_loaded(entry, duration)
+
+
+def _assert_loaded(handler, path):
+    expected, durations = pillow_frames(path)
+    assert handler.get_frame_count() == len(expected)
+    assert handler.durations == durations
+    assert len(set(handler.get_frame_id(i) for i in range(len(expected)))) == len(expected)
+    for i, reference in enumerate(expected):
+        assert np.array_equal(handler.get_frame(i), reference), f"frame {i} differs"
+
+
+@pytest.mark.parametrize("mode", list(STORAGE))
+def test_load_modes_match_pillow(gif_path, mode):
+    handler = _handler(mode)
+    assert handler.load(gif_path)
+    assert isinstance(handler.frames, STORAGE[mode])
+    _assert_loaded(handler, gif_path)
+    handler.close()
+
+
+@pytest.mark.parametrize("mode", list(STORAGE))
+def test_progressive_load_fills_mode_container(tmp_path, mode):
+    path = str(make_gif(tmp_path / "anim.gif", disposal=[1, 2, 3, 0, 3, 2]))
+    handler = _handler(mode)
+    _progressive_load(handler, path)
+    assert isinstance(handler.frames, STORAGE[mode])
+    _assert_loaded(handler, path)
+    handler.close()
+
+
+@pytest.mark.parametrize("mode", ["list", "stack", "palette"])
+def test_parallel_load_matches_pillow(gif_path, mode):
+    handler = GifHandler(storage=mode, decode_workers=3)
+    assert handler.load(gif_path)
+    assert isinstance(handler.frames, STORAGE[mode])
+    _assert_loaded(handler, gif_path)
+    handler.close()
+
+
+@pytest.mark.parametrize("mode", list(STORAGE))
+def test_progressive_load_through_decode_cache(tmp_path, mode):
+    path = str(make_gif(tmp_path / "anim.gif", disposal=2))
+    cache = DecodeCache(tmp_path / "cache")
+
+    handler = _handler(mode, cache)
+    _progressive_load(handler, path)
+    _assert_loaded(handler, path)
+    handler.close()
+    assert cache.load(path) is not None
+
+    # Reloads map the cached stack whatever the mode
+    handler = _handler(mode, cache)
+    _progressive_load(handler, path)
+    assert isinstance(handler.frames, FrameStack)
+    assert isinstance(handler.get_stack(allow_copy=False), np.memmap)
+    _assert_loaded(handler, path)
+    handler.close()
+
+
+def test_lazy_load_without_cache_decodes_nothing(tmp_path):
+    path = str(make_gif(tmp_path / "anim.gif"))
+    _, durations = pillow_frames(path)
+    handler = _handler("lazy")
+    items = list(handler.iter_load(path))
+    assert items == [(None, None, duration) for duration in durations]
+    assert handler.frames._decoder.position == -1
+    _assert_loaded(handler, path)
+    handler.close()
+
+
+def test_lazy_frames_survive_edits(tmp_path):
+    path = str(make_gif(tmp_path / "anim.gif", disposal=3))
+    expected, _ = pillow_frames(path)
+    handler = _handler("lazy")
+    assert handler.load(path)
+    extra = np.zeros_like(expected[0])
+    handler.delete_frame(1)
+    handler.insert_frame(2, extra)
+    for i, reference in enumerate([expected[0], expected[2], extra] + expected[3:]):
+        assert np.array_equal(handler.get_frame(i), reference)
+    handler.close()
+
+
+def test_get_stack_view_only_for_ordered_stack(tmp_path):
+    path = str(make_gif(tmp_path / "anim.gif"))
+    handler = _handler("stack")
+    _progressive_load(handler, path)
+    stack = handler.get_stack(allow_copy=False)
+    assert np.shares_memory(stack, handler.get_frame(0))
+    handler.delete_frame(0)
+    assert handler.get_stack(allow_copy=False) is None
+    assert handler.get_stack().shape[0] == handler.get_frame_count()
+
+    handler = _handler("list")
+    _progressive_load(handler, path)
+    assert handler.get_stack(allow_copy=False) is None
+    assert np.array_equal(handler.get_stack(), np.stack(pillow_frames(path)[0]))
+
+
+def test_iter_frames_streams_file_without_loading(tmp_path):
+    path = str(make_gif(tmp_path / "anim.gif", disposal=[1, 2, 3, 0, 3, 2]))
+    expected, durations = pillow_frames(path)
+    handler = GifHandler()
+    streamed = [(frame.copy(), duration) for frame, duration in handler.iter_timed_frames(path)]
+    assert handler.get_frame_count() == 0
+    assert [duration for _, duration in streamed] == durations
+    for (frame, _), reference in zip(streamed, expected):
+        assert np.array_equal(frame, reference)
+
+    assert handler.load(path)
+    for frame, reference in zip(handler.iter_frames(), expected):
+        assert np.array_equal(frame, reference)
+
+
+def test_iter_frame_pairs_stops_at_shorter_file(tmp_path):
+    gt_path = str(make_gif(tmp_path / "gt.gif", count=6))
+    pred_path = str(make_gif(tmp_path / "pred.gif", count=4))
+    gt, _ = pillow_frames(gt_path)
+    pred, _ = pillow_frames(pred_path)
+    pairs = [(a.copy(), b.copy()) for a, b in GifHandler().iter_frame_pairs(gt_path, pred_path)]
+    assert len(pairs) == 4
+    for (a, b), ref_a, ref_b in zip(pairs, gt, pred):
+        assert np.array_equal(a, ref_a) and np.array_equal(b, ref_b)
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from src.metrics import PARALLEL_CHUNK, MetricsCalculator
+
+METRICS = ["psnr", "ssim", "mse", "mae"]
+
+
+def _pairs(count=2 * PARALLEL_CHUNK + 3, size=(48, 64)):
+    rng = np.random.default_rng(0)
+    gt = [rng.integers(0, 256, size + (4,), dtype=np.uint8) for _ in range(count)]
+    # Increasing noise, so every frame has distinct values and order shows
+    pred = [np.clip(frame.astype(np.int16) + rng.integers(-i - 1, i + 2, frame.shape), 0, 255)
+            .astype(np.uint8) for i, frame in enumerate(gt)]
+    return gt, pred
+
+
+def _values(frame_metrics):
+    return [(m.frame_index, m.psnr, m.ssim, m.mse, m.mae) for m in frame_metrics]
+
+
+@pytest.fixture(scope="module")
+def serial():
+    gt, pred = _pairs()
+    return MetricsCalculator().calculate_sequence_metrics(gt, pred, METRICS)
+
+
+def test_stream_matches_sequence(serial):
+    gt, pred = _pairs()
+    sequence, frame_metrics = MetricsCalculator().calculate_stream_metrics(
+        (pair for pair in zip(gt, pred)), METRICS)
+    assert _values(frame_metrics) == _values(serial[1])
+    assert sequence == serial[0]
+
+
+@pytest.mark.parametrize("processes", [False, True], ids=["threads", "processes"])
+def test_parallel_matches_serial(serial, processes):
+    gt, pred = _pairs()
+    calculator = MetricsCalculator(workers=3, processes=processes)
+    try:
+        sequence, frame_metrics = calculator.calculate_sequence_metrics(gt, pred, METRICS)
+    finally:
+        calculator.shutdown()
+
+    serial_sequence, serial_frames = serial
+    assert [m.frame_index for m in frame_metrics] == list(range(len(gt)))
+    assert _values(frame_metrics) == _values(serial_frames)
+    assert sequence == serial_sequence
+
+
+def test_streamed_pairs_match_serial(serial):
+    gt, pred = _pairs()
+    calculator = MetricsCalculator(workers=2)
+    try:
+        _, frame_metrics = calculator.calculate_stream_metrics(iter(zip(gt, pred)), METRICS)
+    finally:
+        calculator.shutdown()
+    assert _values(frame_metrics) == _values(serial[1])
+
+
+def test_unselected_metrics_are_skipped():
+    gt, pred = _pairs(count=3)
+    sequence, frame_metrics = MetricsCalculator().calculate_sequence_metrics(gt, pred, ["psnr"])
+    assert all(m.psnr is not None and m.ssim is None and m.lpips is None for m in frame_metrics)
+    assert sequence.psnr is not None and sequence.ssim is None
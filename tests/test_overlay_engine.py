@@ -0,0 +1,376 @@
+import numpy as np
+import pytest
+
+from src import overlay_engine
+from src.gif_handler import GifHandler
+from src.overlay_engine import (CompositeCache, GridOverlay, OverlayEngine, OverlayMode,
+                                OverlayRenderer, clip_region, get_overlay_renderer,
+                                overlay_modes, register_overlay_mode)
+
+
+def _frames(count=None, size=(37, 50), seed=0):
+    rng = np.random.default_rng(seed)
+    shape = size + (4,) if count is None else (count,) + size + (4,)
+    return rng.integers(0, 256, shape, dtype=np.uint8), rng.integers(0, 256, shape, dtype=np.uint8)
+
+
+def _image(nbytes, value=0):
+    return np.full(nbytes, value, dtype=np.uint8)
+
+
+def test_composite_cache_evicts_least_recent_within_budget():
+    cache = CompositeCache(max_bytes=300)
+    for key in "abc":
+        cache.put(key, _image(100))
+    assert cache.get("a") is not None
+
+    # "b" is now the least recently used
+    cache.put("d", _image(100))
+    assert cache.get("b") is None
+    assert all(cache.get(key) is not None for key in "acd")
+
+    cache.put("e", _image(250))
+    assert cache.get("e") is not None
+    assert all(cache.get(key) is None for key in "acd")
+
+
+def test_composite_cache_replaces_and_skips_oversized():
+    cache = CompositeCache(max_bytes=300)
+    cache.put("a", _image(200))
+    cache.put("a", _image(100, 7))
+    cache.put("b", _image(200))
+    assert cache.get("a")[0] == 7 and cache.get("b") is not None
+
+    cache.put("huge", _image(301))
+    assert cache.get("huge") is None and cache.get("b") is not None
+
+    cache.clear()
+    assert cache.get("a") is None and cache.get("b") is None
+
+
+def test_cache_key_follows_settings():
+    engine = OverlayEngine()
+    keys = set()
+
+    def changes(update):
+        update()
+        key = engine.cache_key()
+        assert key not in keys
+        keys.add(key)
+
+    changes(lambda: None)
+    changes(lambda: engine.set_mode(OverlayMode.BLEND))
+    changes(lambda: engine.set_blend_alpha(0.25))
+    changes(lambda: setattr(engine, "resize_filter", "nearest"))
+    changes(lambda: engine.set_mode(OverlayMode.DIFFERENCE))
+    changes(lambda: engine.set_colormap("viridis"))
+    changes(lambda: engine.set_mode(OverlayMode.FLICKER))
+    changes(engine.toggle_flicker)
+
+    # Settings of other modes don't invalidate
+    key = engine.cache_key()
+    engine.set_blend_alpha(0.75)
+    engine.checker_size = 8
+    assert engine.cache_key() == key
+
+
+def _checkerboard_reference(gt, pred, size, thickness):
+    """Per-tile loops of the original checkerboard."""
+    h, w = gt.shape[:2]
+    yy, xx = np.meshgrid(np.arange(h) // size, np.arange(w) // size, indexing="ij")
+    result = np.where(((yy + xx) % 2 == 0)[..., None], gt, pred)
+    grid_color = np.array([80, 80, 80, 255], dtype=np.uint8)
+    for x in range(0, w, size):
+        result[:, x:x + thickness] = grid_color
+    for y in range(0, h, size):
+        result[y:y + thickness] = grid_color
+    dot_size = max(3, size // 10)
+    for ty in range(-(-h // size)):
+        for tx in range(-(-w // size)):
+            if (ty + tx) % 2 == 1:
+                y, x = ty * size + 2, tx * size + 2
+                result[y:y + dot_size, x:x + dot_size] = (255, 80, 255, 255)
+    return result
+
+
+@pytest.mark.parametrize("size,thickness", [(32, 1), (8, 2), (5, 1)])
+def test_checkerboard_matches_reference(size, thickness):
+    engine = OverlayEngine()
+    engine.set_mode(OverlayMode.CHECKERBOARD)
+    engine.checker_size = size
+    engine.grid_thickness = thickness
+    gt, pred = _frames(count=3)
+    expected = np.stack([_checkerboard_reference(a, b, size, thickness) for a, b in zip(gt, pred)])
+
+    for i in range(3):
+        assert np.array_equal(engine.composite(gt[i], pred[i]), expected[i])
+    # Whole stacks render in one call with the same masks
+    assert np.array_equal(engine._render(gt, pred), expected)
+
+
+def _float_luma(frame):
+    return 0.299 * frame[..., 0] + 0.587 * frame[..., 1] + 0.114 * frame[..., 2]
+
+
+def _within_one(result, expected):
+    return np.abs(result.astype(np.int16) - np.round(expected)).max() <= 1
+
+
+def test_luminance_within_one_of_float():
+    rgba = np.random.default_rng(0).integers(0, 256, (256, 256, 4), dtype=np.uint8)
+    luma = OverlayEngine()._luminance(rgba)
+    assert luma.dtype == np.uint8
+    assert _within_one(luma, _float_luma(rgba.astype(np.float64)))
+
+
+@pytest.mark.parametrize("alpha", [0.0, 0.3, 0.5, 0.77, 1.0])
+def test_blend_within_one_of_float(alpha):
+    gt, pred = _frames(count=2)
+    engine = OverlayEngine()
+    engine.set_mode(OverlayMode.BLEND)
+    engine.set_blend_alpha(alpha)
+    out = np.empty_like(gt[0])
+    result = engine.composite(gt[0], pred[0], out=out)
+    assert result is out
+    expected = gt[0] * (1 - alpha) + pred[0] * alpha
+    assert _within_one(result[..., :3], expected[..., :3])
+    assert np.all(result[..., 3] == 255)
+    assert np.array_equal(engine._render(gt, pred)[1], engine.composite(gt[1], pred[1]))
+
+
+@pytest.mark.parametrize("colors", [((0, 255, 0), (255, 0, 255)),
+                                    ((128, 37, 200), (129, 255, 1)),
+                                    ((255, 255, 255), (255, 255, 255))])
+def test_dual_color_within_one_of_float(colors):
+    engine = OverlayEngine()
+    engine.gt_color, engine.pred_color = colors
+    levels = np.arange(256, dtype=np.uint8)
+    gt_gray, pred_gray = [a.astype(np.uint8) for a in np.meshgrid(levels, levels)]
+    result = engine._composite_dual_color(gt_gray, pred_gray)
+    for i in range(3):
+        expected = np.clip(gt_gray * (colors[0][i] / 255) + pred_gray * (colors[1][i] / 255), 0, 255)
+        assert _within_one(result[..., i], expected), f"channel {i}"
+    assert np.all(result[..., 3] == 255)
+
+    # The full path tints the fixed-point luma of each frame
+    gt, pred = _frames()
+    engine.set_mode(OverlayMode.DUAL_COLOR)
+    expected = engine._composite_dual_color(engine._luminance(gt), engine._luminance(pred))
+    assert np.array_equal(engine.composite(gt, pred), expected)
+
+
+def _grid():
+    grid = GridOverlay()
+    grid.set_enabled(True)
+    grid.set_size(8)
+    return grid
+
+
+@pytest.mark.parametrize("mode", overlay_modes())
+@pytest.mark.parametrize("workers", [0, 3])
+def test_composite_sequence_matches_per_frame(mode, workers):
+    engine = OverlayEngine()
+    engine.set_mode(mode)
+    gt, pred = _frames(count=7)
+    grid = _grid()
+    # A list of frames, pred longer than gt
+    pred_frames = list(pred) + [pred[0]]
+    chunks = [chunk.copy() for chunk in engine.composite_sequence(gt, pred_frames, chunk=3,
+                                                                  workers=workers, grid=grid)]
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+    frames = np.concatenate(chunks)
+    for i in range(len(gt)):
+        expected = grid.apply(engine.composite(gt[i], pred[i]))
+        assert np.array_equal(frames[i], expected), f"frame {i}"
+
+
+def test_composite_sequence_resizes_predicted_frames():
+    engine = OverlayEngine()
+    engine.set_mode(OverlayMode.BLEND)
+    gt, _ = _frames(count=2)
+    _, pred = _frames(count=2, size=(20, 25), seed=1)
+    frames = np.concatenate(list(engine.composite_sequence(gt, pred)))
+    assert frames.shape == (2,) + gt.shape[1:]
+    assert np.array_equal(frames[1], engine.composite(gt[1], pred[1]))
+
+
+def test_unpaired_frames_export_at_composite_size(tmp_path):
+    # GT longer than predicted and twice its size
+    engine = OverlayEngine()
+    engine.set_mode(OverlayMode.SIDE_BY_SIDE)
+    gt, _ = _frames(count=5, size=(36, 40))
+    _, pred = _frames(count=3, size=(18, 20), seed=1)
+    frames = [frame.copy() for chunk in engine.composite_sequence(gt, pred) for frame in chunk]
+    frames += [engine.single_frame(gt[i], (40, 36)) for i in range(3, 5)]
+    assert all(frame.shape == (36, 80, 4) for frame in frames)
+    assert np.array_equal(frames[3][:, :40], gt[3]) and not frames[3][:, 40:].any()
+    assert GifHandler().save(str(tmp_path / "out.gif"), frames, [50] * len(frames))
+
+    # Predicted frames alone go to their side, resized to the GT size
+    single = engine.single_frame(pred[0], (40, 36), is_gt=False)
+    assert not single[:, :40].any()
+    assert np.array_equal(single[:, 40:], engine._resize(pred[0], 36, 40))
+
+    engine.set_mode(OverlayMode.BLEND)
+    assert np.array_equal(engine.single_frame(gt[0], (40, 36), is_gt=False), gt[0])
+
+
+@pytest.mark.parametrize("mode", overlay_modes())
+@pytest.mark.parametrize("roi", [(0, 0, 20, 15), (13, 9, 21, 17), (30, 20, 40, 40), (45, 2, 30, 30)])
+def test_region_matches_crop_of_full_render(mode, roi):
+    engine = OverlayEngine()
+    engine.set_mode(mode)
+    engine.checker_size = 8
+    gt, pred = _frames()
+    # Smooth-ish frames so SSIM values vary across the region
+    pred = np.where(np.random.default_rng(2).random(gt.shape[:2] + (1,)) < 0.7, gt, pred)
+    full = engine.composite(gt, pred)
+    x, y, w, h = clip_region(roi, full.shape[1], full.shape[0])
+    region = engine.composite(gt, pred, roi=roi, gt_key="gt", pred_key="pred")
+    assert np.array_equal(region, full[y:y + h, x:x + w])
+
+    out = np.empty((h, w, 4), dtype=np.uint8)
+    assert engine.composite(gt, pred, out=out, roi=roi) is out
+    assert np.array_equal(out, full[y:y + h, x:x + w])
+
+
+def test_clip_region():
+    assert clip_region((-5, -5, 20, 20), 10, 8) == (0, 0, 10, 8)
+    assert clip_region((4, 3, 2, 2), 10, 8) == (4, 3, 2, 2)
+    assert clip_region((12, 9, 5, 5), 10, 8) == (10, 8, 0, 0)
+
+
+def _grid_reference(frame, size, thickness, color, opacity, origin=(0, 0)):
+    h, w = frame.shape[:2]
+    on_row = (np.arange(h) + origin[1]) % size < thickness
+    on_col = (np.arange(w) + origin[0]) % size < thickness
+    alpha = np.where(on_row[:, None] & on_col[None, :], 1 - (1 - opacity) ** 2,
+                     np.where(on_row[:, None] | on_col[None, :], opacity, 0.0))[..., None]
+    result = frame.astype(np.float64)
+    result[..., :3] = result[..., :3] * (1 - alpha) + np.array(color) * alpha
+    return result
+
+
+@pytest.mark.parametrize("size,thickness,opacity", [(8, 1, 0.5), (10, 3, 0.3), (32, 2, 1.0)])
+def test_grid_within_one_of_float(size, thickness, opacity):
+    grid = _grid()
+    grid.set_size(size)
+    grid.set_thickness(thickness)
+    grid.set_opacity(opacity)
+    grid.set_color((200, 30, 90))
+    frame, _ = _frames()
+    result = grid.apply(frame)
+    expected = _grid_reference(frame, size, thickness, (200, 30, 90), opacity)
+    assert np.abs(result.astype(np.int16) - np.round(expected)).max() <= 1
+    assert np.array_equal(result[..., 3], frame[..., 3])
+
+
+def test_grid_region_aligns_with_full_frame():
+    grid = _grid()
+    grid.set_thickness(2)
+    frame, _ = _frames()
+    full = grid.apply(frame)
+    region = frame[5:30, 11:43]
+    assert np.array_equal(grid.apply(region, origin=(11, 5)), full[5:30, 11:43])
+
+    # Drawn in place, including into a strided region of a larger frame
+    copy = frame.copy()
+    view = copy[5:30, 11:43]
+    assert grid.apply(view, origin=(11, 5), out=view) is view
+    expected = frame.copy()
+    expected[5:30, 11:43] = full[5:30, 11:43]
+    assert np.array_equal(copy, expected)
+
+
+def test_grid_applies_to_stacks_and_respects_enabled():
+    grid = _grid()
+    frames, _ = _frames(count=3)
+    stack = grid.apply(frames)
+    for i in range(3):
+        assert np.array_equal(stack[i], grid.apply(frames[i]))
+    out = frames.copy()
+    assert grid.apply(out, out=out) is out
+    assert np.array_equal(out, stack)
+
+    key = grid.cache_key()
+    grid.set_opacity(0.25)
+    assert grid.cache_key() != key
+    grid.set_enabled(False)
+    assert grid.cache_key() == (False,)
+    assert grid.apply(frames) is frames
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """Register modes for one test only."""
+    monkeypatch.setattr(overlay_engine, "_RENDERERS", dict(overlay_engine._RENDERERS))
+
+
+def test_registered_mode_renders_with_requested_inputs(registry):
+    seen = []
+
+    def render(engine, gt, pred, out, gt_key):
+        seen.append((gt.dtype, gt.shape, gt_key))
+        result = engine._output(gt.shape[:-1] + (gt.shape[-1] * 2, 4), out)
+        result[..., :gt.shape[-1], :] = gt[..., None]
+        result[..., gt.shape[-1]:, :] = pred[..., None]
+        return result
+
+    register_overlay_mode("stripes", OverlayRenderer(render, inputs="gray", width_factor=2,
+                                                     settings=lambda engine: ("s",)))
+    assert "stripes" in overlay_modes()
+    engine = OverlayEngine()
+    engine.set_mode("stripes")
+    assert engine.output_shape(37, 50) == (37, 100, 4)
+    assert engine.cache_key()[1] == ("s",)
+
+    gt, pred = _frames()
+    result = engine.composite(gt, pred, gt_key="gt")
+    assert seen == [(np.uint8, (37, 50), "gt")]
+    assert np.array_equal(result[:, :50, 0], engine._luminance(gt))
+    assert np.array_equal(result[:, 50:, 0], engine._luminance(pred))
+
+
+def test_keyed_inputs_are_converted_once(registry):
+    converted = []
+    register_overlay_mode("float", OverlayRenderer(
+        lambda engine, gt, pred, out, gt_key: converted.append(gt) or engine._output(gt.shape, out),
+        inputs="float"))
+    engine = OverlayEngine()
+    engine.set_mode("float")
+    gt, pred = _frames()
+    for _ in range(2):
+        engine.composite(gt, pred, gt_key="gt", pred_key="pred")
+    assert converted[0] is converted[1]
+    assert converted[0].dtype == np.float32
+    assert np.allclose(converted[0], gt / 255)
+
+    engine.composite(gt, pred)
+    assert converted[2] is not converted[0]
+
+
+def test_unknown_modes_and_input_kinds_are_rejected(registry):
+    engine = OverlayEngine()
+    with pytest.raises(ValueError):
+        engine.set_mode("missing")
+    with pytest.raises(ValueError):
+        get_overlay_renderer("missing")
+    with pytest.raises(ValueError):
+        register_overlay_mode("bad", OverlayRenderer(lambda *args: None, inputs="hsv"))
+    assert "bad" not in overlay_modes()
+    assert engine.mode == OverlayMode.SIDE_BY_SIDE
+
+
+def test_flicker_alternates_frames_without_copies():
+    engine = OverlayEngine()
+    engine.set_mode(OverlayMode.FLICKER)
+    gt, pred = _frames()
+    assert engine.composite(gt, pred) is pred
+    key = engine.cache_key()
+    engine.toggle_flicker()
+    assert engine.composite(gt, pred) is gt
+    assert engine.cache_key() != key
+
+    out = np.empty_like(gt)
+    assert engine.composite(gt, pred, out=out) is out
+    assert np.array_equal(out, gt)
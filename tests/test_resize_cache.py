@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from src.gif_handler import GifHandler
+from src.resize_cache import ResizeCache, resize_filter_names, resize_frame
+
+
+def _frame(size=(30, 20), seed=0):
+    w, h = size
+    return np.random.default_rng(seed).integers(0, 256, (h, w, 4), dtype=np.uint8)
+
+
+@pytest.mark.parametrize("method", resize_filter_names())
+def test_get_resizes_once_per_frame(method):
+    frame = _frame()
+    cache = ResizeCache(method)
+    resized = cache.get(1, frame, (15, 10))
+    assert resized.shape == (10, 15, 4)
+    assert np.array_equal(resized, resize_frame(frame, (15, 10), method))
+    assert not resized.flags.writeable
+    assert cache.get(1, frame, (15, 10)) is resized
+
+    # Another id or size is a separate entry
+    assert cache.get(2, frame, (15, 10)) is not resized
+    assert cache.get(1, frame, (10, 10)).shape == (10, 10, 4)
+
+
+def test_matching_size_returns_frame_itself():
+    frame = _frame()
+    cache = ResizeCache()
+    assert cache.get(1, frame, (30, 20)) is frame
+    assert cache.has_room(cache.max_bytes)
+
+
+def test_filter_change_drops_entries():
+    frame = _frame()
+    cache = ResizeCache("lanczos")
+    lanczos = cache.get(1, frame, (12, 8))
+    cache.set_method("lanczos")
+    assert cache.get(1, frame, (12, 8)) is lanczos
+
+    cache.set_method("nearest")
+    nearest = cache.get(1, frame, (12, 8))
+    assert nearest is not lanczos
+    assert np.array_equal(nearest, resize_frame(frame, (12, 8), "nearest"))
+
+    with pytest.raises(ValueError):
+        cache.set_method("bicubic")
+    with pytest.raises(ValueError):
+        ResizeCache("bicubic")
+
+
+def test_cache_stays_within_budget():
+    frame_bytes = 10 * 10 * 4
+    cache = ResizeCache(max_bytes=3 * frame_bytes)
+    frames = [_frame(seed=i) for i in range(4)]
+    first = [cache.get(i, frame, (10, 10)) for i, frame in enumerate(frames)]
+    assert not cache.has_room(1)
+
+    # Frame 0 was evicted, the three most recent are still cached
+    assert all(cache.get(i, frames[i], (10, 10)) is first[i] for i in range(1, 4))
+    assert cache.get(0, frames[0], (10, 10)) is not first[0]
+
+    cache.clear()
+    assert cache.has_room(3 * frame_bytes)
+
+
+def test_handler_resizes_through_cache():
+    handler = GifHandler()
+    for seed in range(3):
+        handler.add_frame(_frame(seed=seed))
+    resized = handler.resized_frames((15, 10))
+    assert len(resized) == 3
+    assert resized[1] is handler.get_resized_frame(1, (15, 10))
+    assert handler.pre_resize((15, 10)) == 3
+
+    # Edited frames get new ids, so nothing stale is returned
+    handler.delete_frame(0)
+    handler.insert_frame(0, _frame(seed=9))
+    assert np.array_equal(resized[0], resize_frame(_frame(seed=9), (15, 10)))
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+from skimage.metrics import structural_similarity
+
+from src.metrics import MetricsCalculator
+from src.ssim_map import GAUSSIAN_WINDOW, UNIFORM_WINDOW, SSIMMapKernel, to_planes
+
+
+def _planes(rng, h, w):
+    return (rng.random((1, h, w), dtype=np.float32) * 255).round()
+
+
+@pytest.mark.parametrize("gaussian, window", [(False, UNIFORM_WINDOW), (True, GAUSSIAN_WINDOW)])
+def test_mean_ssim_rejects_planes_smaller_than_window(gaussian, window):
+    rng = np.random.default_rng(0)
+    kernel = SSIMMapKernel()
+    for h, w in [(window - 1, 32), (32, window - 1), (2, 2)]:
+        with pytest.raises(ValueError):
+            kernel.mean_ssim(_planes(rng, h, w), _planes(rng, h, w), gaussian)
+
+    value = kernel.mean_ssim(_planes(rng, window, window), _planes(rng, window, window), gaussian)
+    assert np.isfinite(value)
+
+
+def _frames(seed=0, size=(40, 50)):
+    rng = np.random.default_rng(seed)
+    gt = rng.integers(0, 256, size + (4,), dtype=np.uint8)
+    noise = rng.integers(-40, 41, gt.shape)
+    pred = np.clip(gt.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+    return gt, pred
+
+
+def _skimage_map(gt_plane, pred_plane, gaussian):
+    _, full = structural_similarity(gt_plane.astype(np.float64), pred_plane.astype(np.float64),
+                                    data_range=255, full=True, gaussian_weights=gaussian)
+    return full
+
+
+@pytest.mark.parametrize("gaussian", [False, True], ids=["uniform", "gaussian"])
+@pytest.mark.parametrize("per_channel", [False, True], ids=["luma", "rgb"])
+def test_ssim_map_matches_skimage(gaussian, per_channel):
+    gt, pred = _frames()
+    gt_planes, pred_planes = to_planes(gt, per_channel), to_planes(pred, per_channel)
+    expected = np.mean([_skimage_map(a, b, gaussian) for a, b in zip(gt_planes, pred_planes)], axis=0)
+    result = SSIMMapKernel().ssim_map(gt, pred, per_channel, gaussian)
+    assert result.shape == gt.shape[:2] and result.dtype == np.float32
+    assert np.allclose(result, expected, atol=1e-4)
+
+
+def test_ssim_map_reuses_ground_truth_moments():
+    gt, pred = _frames()
+    _, other = _frames(seed=1)
+    kernel = SSIMMapKernel(cache_size=2)
+    first = kernel.ssim_map(gt, pred, gt_key="gt")
+    assert len(kernel._moments) == 1
+    assert np.array_equal(kernel.ssim_map(gt, pred, gt_key="gt"), first)
+    assert np.array_equal(kernel.ssim_map(gt, other, gt_key="gt"), kernel.ssim_map(gt, other))
+    assert len(kernel._moments) == 1
+
+    kernel.ssim_map(gt, pred, gaussian=True, gt_key="gt")
+    kernel.ssim_map(other, pred, gt_key="other")
+    assert len(kernel._moments) == 2
+    kernel.clear()
+    assert len(kernel._moments) == 0
+
+
+def test_mean_ssim_matches_skimage():
+    rng = np.random.default_rng(1)
+    gt, pred = _planes(rng, 40, 50), _planes(rng, 40, 50)
+    expected = structural_similarity(gt[0], pred[0], data_range=255)
+    assert SSIMMapKernel().mean_ssim(gt, pred) == pytest.approx(expected, abs=1e-4)
+
+
+def test_tiny_frame_ssim_is_zero():
+    frame = np.zeros((4, 4, 4), dtype=np.uint8)
+    calculator = MetricsCalculator()
+    assert calculator.calculate_ssim(frame, frame) == 0.0
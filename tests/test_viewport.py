@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from src.widgets.viewport import Viewport, array_to_qimage, can_wrap
+
+
+def _rgba(h=12, w=10, seed=0):
+    return np.random.default_rng(seed).integers(0, 256, (h, w, 4), dtype=np.uint8)
+
+
+def _pixels(qimage):
+    """RGBA pixels of a QImage as an array."""
+    return np.array([[qimage.pixelColor(x, y).getRgb() for x in range(qimage.width())]
+                     for y in range(qimage.height())], dtype=np.uint8)
+
+
+@pytest.mark.parametrize("crop", [False, True], ids=["frame", "region"])
+def test_qimage_wraps_array_memory(crop):
+    image = _rgba()
+    image[..., 3] = 255
+    if crop:
+        # A region keeps its row stride and is still wrapped
+        image = image[2:9, 3:8]
+    assert can_wrap(image)
+    qimg = array_to_qimage(image)
+    assert int(qimg.constBits()) == image.ctypes.data
+    assert qimg.bytesPerLine() == image.strides[0]
+    assert qimg._array is image
+    assert np.array_equal(_pixels(qimg), image)
+
+
+def test_qimage_copies_unwrappable_layouts():
+    rgb = _rgba()[..., :3]
+    assert not can_wrap(rgb)
+    qimg = array_to_qimage(rgb)
+    assert int(qimg.constBits()) != rgb.ctypes.data
+    assert np.array_equal(_pixels(qimg)[..., :3], rgb)
+
+    gray = _rgba()[..., 0].copy()
+    assert np.array_equal(_pixels(array_to_qimage(gray))[..., 0], gray)
+
+
+def test_viewport_shows_region_in_scene(qapp):
+    viewport = Viewport()
+    image = _rgba()
+    image[..., 3] = 255
+    viewport.set_image(image[..., :3], offset=(4, 6), scene_size=(40, 30))
+    pixmap = viewport._pixmap_item.pixmap()
+    assert np.array_equal(_pixels(pixmap.toImage())[..., :3], image[..., :3])
+    assert viewport._pixmap_item.pos().x() == 4 and viewport._pixmap_item.pos().y() == 6
+    assert viewport._scene.sceneRect().width() == 40
+
+
+def test_viewport_flicker_swaps_prepared_pixmaps(qapp):
+    viewport = Viewport()
+    first, second = _rgba(seed=1), _rgba(seed=2)
+    # Opaque, so pixmaps hand back the exact pixels
+    first[..., 3] = second[..., 3] = 255
+    viewport.set_flicker_interval(1000)
+    viewport.set_flicker_images(first, second, offset=(2, 3), scene_size=(20, 20))
+    pixmaps = viewport._flicker_pixmaps
+    assert viewport._flicker_timer.isActive()
+    assert viewport._flicker_timer.interval() == 1000
+    assert viewport._pixmap_item.pixmap().cacheKey() == pixmaps[0].cacheKey()
+
+    viewport._on_flicker_tick()
+    assert viewport._pixmap_item.pixmap().cacheKey() == pixmaps[1].cacheKey()
+    viewport._on_flicker_tick()
+    assert viewport._pixmap_item.pixmap().cacheKey() == pixmaps[0].cacheKey()
+    assert np.array_equal(_pixels(pixmaps[1].toImage()), second)
+
+    # New images keep the phase; a plain image stops flickering
+    viewport._on_flicker_tick()
+    viewport.set_flicker_images(second, first)
+    assert np.array_equal(_pixels(viewport._pixmap_item.pixmap().toImage()), first)
+    viewport.set_image(first)
+    assert not viewport._flicker_timer.isActive()
+    assert viewport._flicker_pixmaps is None
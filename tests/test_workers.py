@@ -0,0 +1,114 @@
+import time
+
+import numpy as np
+
+from src.workers import PrerenderBuffer, PrerenderWorker
+
+
+def _image(index):
+    return np.full((2, 2, 4), index, dtype=np.uint8)
+
+
+def _fill(buffer, count, key="k"):
+    while True:
+        index = buffer.next_target(count, timeout=0)
+        if index is None:
+            return
+        buffer.put(index, key, _image(index), count)
+
+
+def test_buffer_window_wraps_around_playhead():
+    buffer = PrerenderBuffer(size=3)
+    buffer.set_playhead(8, 10)
+    targets = []
+    while True:
+        index = buffer.next_target(10, timeout=0)
+        if index is None:
+            break
+        targets.append(index)
+        buffer.put(index, "k", _image(index), 10)
+    assert targets == [9, 0, 1]
+
+    # Frames outside the window are not stored
+    buffer.put(5, "k", _image(5), 10)
+    assert buffer.take(5, "k") is None
+    assert buffer.take(0, "k")[0, 0, 0] == 0
+
+
+def test_buffer_drops_frames_behind_playhead():
+    buffer = PrerenderBuffer(size=3)
+    _fill(buffer, 10)
+    buffer.set_playhead(2, 10)
+    assert buffer.take(1, "k") is None
+    assert buffer.take(3, "k") is not None
+    assert buffer.next_target(10, timeout=0) == 4
+
+    # Shorter sequences shrink the window to the whole sequence
+    buffer.set_playhead(0, 2)
+    assert buffer.take(3, "k") is None
+    _fill(buffer, 2)
+    assert buffer.take(1, "k") is not None
+    assert buffer.take(0, "k") is not None
+
+
+def test_buffer_invalidates_stale_keys():
+    buffer = PrerenderBuffer(size=2)
+    _fill(buffer, 10, key="old")
+    assert buffer.next_target(10, timeout=0) is None
+    assert buffer.take(1, "new") is None
+    assert buffer.take(1, "old") is None
+    assert buffer.next_target(10, timeout=0) == 1
+
+    buffer.clear()
+    assert buffer.take(2, "old") is None
+    assert buffer.next_target(10, timeout=0) == 1
+
+
+def test_buffer_skips_failed_until_playhead_passes():
+    buffer = PrerenderBuffer(size=3)
+    buffer.mark_failed(1, 10)
+    assert buffer.is_failed(1)
+    assert buffer.next_target(10, timeout=0) == 2
+
+    buffer.set_playhead(1, 10)
+    assert not buffer.is_failed(1)
+    buffer.set_playhead(0, 10)
+    assert buffer.next_target(10, timeout=0) == 1
+
+
+def _run(worker, done, timeout=5.0):
+    worker.start()
+    deadline = time.monotonic() + timeout
+    while not done() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    worker.requestInterruption()
+    worker.wait()
+
+
+def test_worker_fills_window_ahead_of_playhead():
+    buffer = PrerenderBuffer(size=4)
+    buffer.set_playhead(5, 8)
+    worker = PrerenderWorker(buffer, lambda index: ("k", _image(index)), lambda: 8)
+    expected = [6, 7, 0, 1]
+    _run(worker, lambda: buffer.next_target(8, timeout=0) is None)
+    for index in expected:
+        assert buffer.take(index, "k")[0, 0, 0] == index
+
+
+def test_worker_skips_frames_that_fail_to_render():
+    buffer = PrerenderBuffer(size=4)
+    calls = []
+
+    def render(index):
+        calls.append(index)
+        if index == 1:
+            raise RuntimeError("broken frame")
+        if index == 3:
+            return None
+        return "k", _image(index)
+
+    worker = PrerenderWorker(buffer, render, lambda: 6)
+    _run(worker, lambda: buffer.next_target(6, timeout=0) is None)
+    assert buffer.is_failed(1) and buffer.is_failed(3)
+    assert buffer.take(2, "k") is not None and buffer.take(4, "k") is not None
+    assert calls.count(1) == 1 and calls.count(3) == 1